@@ -2,12 +2,14 @@
 from flask import Blueprint, current_app, request
 
 # IMPORT SERVICES ONLY (NO ROUTE IMPORTS)
-from NutritionGuidance.services.profile_store import get_profile, save_profile
-from NutritionGuidance.services.food_search import search_foods
-from NutritionGuidance.services.intake_store import add_intake, get_summary
+from NutritionGuidance.services.profile_store import save_profile
+from NutritionGuidance.services.compute_graph import CACHE_HEADER, cache_trace, forecast_node, profile_node, risk_node, summary_node
+from NutritionGuidance.services.food_search import get_autocomplete_index, search_foods
+from NutritionGuidance.services.intake_store import add_intake
 from NutritionGuidance.services.report_service import build_report
 from NutritionGuidance.services.dataset_loader import get_datasets
-from NutritionGuidance.services.ml_risk_service import predict_risk
+from NutritionGuidance.services.risk_cohort_service import cohort_summary, score_users
+from NutritionGuidance.services.dashboard_service import build_dashboard
 
 # trained 2-week report (4 nutrients only)
 from NutritionGuidance.services.trained_report_service import build_trained_two_week_report
@@ -25,6 +27,16 @@ def handle_preflight():
     if request.method == "OPTIONS":
         return ("", 200)
 
+# --------------------------------------------------
+# DEBUG: which shared nodes (profile/summary/requirements/risk) were cache hits
+# --------------------------------------------------
+@nutrition_bp.after_request
+def add_cache_header(response):
+    trace = cache_trace()
+    if trace:
+        response.headers[CACHE_HEADER] = trace
+    return response
+
 # --------------------------------------------------
 # HEALTH
 # --------------------------------------------------
@@ -51,7 +63,7 @@ def conditions():
 @nutrition_bp.route("/profile", methods=["GET"])
 def profile_get():
     user_id = request.args.get("user_id", "demo")
-    return {"profile": get_profile(current_app, user_id)}
+    return {"profile": profile_node(current_app, user_id)}
 
 @nutrition_bp.route("/profile", methods=["POST"])
 def profile_post():
@@ -73,8 +85,15 @@ def profile_post():
 @nutrition_bp.route("/foods/search", methods=["GET"])
 def foods_search():
     q = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", 15))
+    except Exception:
+        limit = 15
+
+    limit = max(1, min(limit, 50))  # safety clamp
+
     food_df, _, _ = get_datasets(current_app)
-    items = search_foods(food_df, q)
+    items = search_foods(food_df, q, limit, index=get_autocomplete_index(current_app))
     return {"items": items}
 
 # --------------------------------------------------
@@ -102,7 +121,7 @@ def intake_add():
 # --------------------------------------------------
 @nutrition_bp.route("/intake/summary", methods=["GET"])
 def intake_summary():
-    return get_summary(
+    return summary_node(
         current_app,
         request.args.get("user_id", "demo"),
         request.args.get("period", "weekly"),
@@ -135,6 +154,21 @@ def trained_report():
 
     return build_trained_two_week_report(current_app, user_id, period, days)
 
+# --------------------------------------------------
+# NUTRIENT FORECAST (all nutrients, with confidence intervals)
+# --------------------------------------------------
+@nutrition_bp.route("/forecast", methods=["GET"])
+def forecast():
+    user_id = request.args.get("user_id", "demo")
+    try:
+        days = int(request.args.get("days", 14))
+    except Exception:
+        days = 14
+
+    days = max(1, min(days, 60))  # safety clamp
+
+    return forecast_node(current_app, user_id, days)
+
 # --------------------------------------------------
 # ML DEFICIENCY RISK
 # --------------------------------------------------
@@ -143,35 +177,49 @@ def ml_risk():
     user_id = request.args.get("user_id", "demo")
     period = request.args.get("period", "monthly")
 
-    profile = get_profile(current_app, user_id) or {}
+    item = risk_node(current_app, user_id, period)
+    return {"period": period, **item}
 
-    # Safe age parsing
+# --------------------------------------------------
+# ML DEFICIENCY RISK (BATCH / COHORT)
+# --------------------------------------------------
+MAX_BATCH_USERS = 1000
+
+@nutrition_bp.route("/ml-risk/batch", methods=["POST"])
+def ml_risk_batch():
+    data = request.get_json(force=True) or {}
+    period = data.get("period", "monthly")
+
+    user_ids = data.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        return {"error": "user_ids must be a non-empty list"}, 400
+
+    # de-duplicate, keep request order
+    user_ids = list(dict.fromkeys(str(u).strip() for u in user_ids if str(u).strip()))
+    if len(user_ids) > MAX_BATCH_USERS:
+        return {"error": f"At most {MAX_BATCH_USERS} user_ids per request"}, 400
+
+    return cohort_summary(score_users(current_app, user_ids, period), period)
+
+# --------------------------------------------------
+# DASHBOARD (summary + report + trained + risk in one call)
+# --------------------------------------------------
+@nutrition_bp.route("/dashboard", methods=["GET"])
+def dashboard():
     try:
-        age = int(profile.get("age") or 22)
+        days = int(request.args.get("days", 14))
     except Exception:
-        age = 22
-
-    # Summary + avg fallback
-    summary = get_summary(current_app, user_id, period) or {}
-    # Keep both keys compatibility
-    avg = summary.get("daily_average_over_period") or summary.get("daily_average") or summary.get("daily_average_logged_days") or {}
-
-    # Condition: pick first (you can enhance later to support multiple)
-    conditions = profile.get("conditions") or []
-    condition = conditions[0] if isinstance(conditions, list) and len(conditions) > 0 else None
-
-    risk = predict_risk(age, avg, condition=condition)
-
-    return {
-        "user_id": user_id,
-        "period": period,
-        "ml_deficiency_risk": risk,
-        "age": age,
-        "condition": condition,
-        "inputs_used": {
-            "energy_kcal": float(avg.get("energy_kcal", 0) or 0),
-            "protein_g": float(avg.get("protein_g", 0) or 0),
-            "calcium_mg": float(avg.get("calcium_mg", 0) or 0),
-            "iron_mg": float(avg.get("iron_mg", 0) or 0),
-        },
-    }
+        days = 14
+
+    days = max(1, min(days, 60))  # safety clamp
+
+    try:
+        return build_dashboard(
+            current_app,
+            request.args.get("user_id", "demo"),
+            request.args.get("period", "monthly"),
+            request.args.get("fields"),
+            days,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
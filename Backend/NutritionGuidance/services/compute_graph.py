@@ -0,0 +1,144 @@
+# backend/NutritionGuidance/services/compute_graph.py
+
+"""
+Shared computation nodes for the nutrition endpoints.
+
+/intake/summary, /report, /report/trained and /ml-risk all need the same
+profile, intake summary, requirements and risk for a user. Each of those is a
+lazily computed node cached for the whole process, keyed by everything it
+depends on:
+
+    profile       profile file version
+    summary       intake log version + today's date + datasets version
+    requirements  (age, group, conditions) + datasets version
+    risk          profile version + intake log version + today + datasets version
+    forecast      intake log version + today + datasets version
+
+so a new intake log or profile save produces new keys and stale entries just
+age out of the LRU. Callers always get their own deep copy.
+
+Per request, every node lookup is recorded as hit/miss and returned in the
+X-Nutrition-Cache response header (see routes.py).
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from flask import g, has_request_context
+
+from NutritionGuidance.services.dataset_loader import datasets_version, get_requirement_index
+from NutritionGuidance.services.intake_store import get_summary, intake_log_version
+from NutritionGuidance.services.profile_store import get_profile, profile_version
+
+CACHE_HEADER = "X-Nutrition-Cache"
+MAX_NODES = 4096
+
+_NODES = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _store_key(app) -> str:
+    return os.path.abspath(app.config.get("STORE_DIR") or os.path.join(os.getcwd(), "store"))
+
+
+def _record(name: str, hit: bool) -> None:
+    if not has_request_context():
+        return
+    trace = g.setdefault("nutrition_cache", [])
+    trace.append(f"{name}={'hit' if hit else 'miss'}")
+
+
+def _node(app, name: str, key: tuple, compute):
+    full_key = (_store_key(app), name) + key
+
+    with _LOCK:
+        value = _NODES.get(full_key)
+        if value is not None:
+            _NODES.move_to_end(full_key)
+
+    if value is not None:
+        _record(name, True)
+        return copy.deepcopy(value)
+
+    value = compute()
+    with _LOCK:
+        _NODES[full_key] = copy.deepcopy(value)
+        while len(_NODES) > MAX_NODES:
+            _NODES.popitem(last=False)
+
+    _record(name, False)
+    return value
+
+
+# --------------------------------------------------
+# nodes
+# --------------------------------------------------
+def profile_node(app, user_id: str) -> dict:
+    user_id = (user_id or "demo").strip() or "demo"
+    return _node(app, "profile", (user_id, profile_version(app, user_id)), lambda: get_profile(app, user_id))
+
+
+def summary_node(app, user_id: str, period: str) -> dict:
+    user_id = (user_id or "demo").strip() or "demo"
+    period = (period or "weekly").lower()
+    key = (user_id, period, intake_log_version(app, user_id), date.today().isoformat(), datasets_version(app))
+    return _node(app, "summary", key, lambda: get_summary(app, user_id, period))
+
+
+def requirements_node(app, age, group, conditions):
+    """
+    (condition-adjusted requirements, condition notes) for a profile.
+    """
+    index = get_requirement_index(app)
+    key = (int(age), str(group or "").strip().lower(), index.engine.normalize_conditions(conditions), datasets_version(app))
+    return _node(app, "requirements", key, lambda: index.resolve(age, group, conditions))
+
+
+def risk_node(app, user_id: str, period: str) -> dict:
+    """
+    GET /ml-risk item for a user (see risk_cohort_service.score_users).
+    """
+    from NutritionGuidance.services.risk_cohort_service import score_users
+
+    user_id = (user_id or "demo").strip() or "demo"
+    period = (period or "monthly").lower()
+    key = (
+        user_id,
+        period,
+        profile_version(app, user_id),
+        intake_log_version(app, user_id),
+        date.today().isoformat(),
+        datasets_version(app),
+    )
+    return _node(app, "risk", key, lambda: score_users(app, [user_id], period)[0])
+
+
+def forecast_node(app, user_id: str, days: int) -> dict:
+    """
+    forecast_service.forecast_user, recomputed only after the next intake write (or a new day).
+    """
+    from NutritionGuidance.services.forecast_service import forecast_user
+
+    user_id = (user_id or "demo").strip() or "demo"
+    key = (user_id, int(days), intake_log_version(app, user_id), date.today().isoformat(), datasets_version(app))
+    return _node(app, "forecast", key, lambda: forecast_user(app, user_id, days))
+
+
+# --------------------------------------------------
+# debug header
+# --------------------------------------------------
+def cache_trace() -> str:
+    """
+    "profile=hit, summary=miss, ..." for the current request ("" if nothing was looked up).
+    """
+    if not has_request_context():
+        return ""
+    return ", ".join(g.get("nutrition_cache", []))
+
+
+def clear() -> None:
+    with _LOCK:
+        _NODES.clear()
@@ -1,91 +1,232 @@
-def apply_condition_rules(base_req: dict, cond_df, conditions: list):
+import math
+
+import numpy as np
+
+# rule_type -> slot in the compiled per-condition vectors
+RULE_SLOTS = {
+    "multiplier": "mult",    # req *= value
+    "add": "add",            # req += value
+    "upper_limit": "max",    # req = min(req, value)
+    "set_max": "max",        # (alias)
+    "lower_limit": "min",    # req = max(req, value)
+    "set_min": "min",        # (alias)
+}
+
+# requirement columns that are not nutrients
+NON_NUTRIENT_COLS = {"age_min", "age_max", "group"}
+
+# mcg aliases -> canonical *_ug keys
+CANONICAL_KEY = {
+    "vitamin_a_mcg": "vitamin_a_ug",
+    "vitamin_d_mcg": "vitamin_d_ug",
+    "vitamin_b12_mcg": "vitamin_b12_ug",
+    "folate_mcg": "folate_ug",
+}
+
+
+def _to_float(x):
+    try:
+        v = float(x)
+    except Exception:
+        return None
+    return v if math.isfinite(v) else None
+
+
+def requirement_nutrients(req_df) -> list:
     """
-    Applies rule_type to base requirements.
+    Canonical nutrient order of the requirements table (CSV order, aliases merged).
+    """
+    out = []
+    for c in req_df.columns:
+        c = CANONICAL_KEY.get(str(c).strip(), str(c).strip())
+        if c in NON_NUTRIENT_COLS or c in out:
+            continue
+        out.append(c)
+    return out
 
-    Your CSV columns:
-      condition, nutrient, rule_type, value, note
 
-    Supported rule_type:
-      - multiplier  (req *= value)
-      - add         (req += value)
-      - upper_limit (req = min(req, value))  (same as set_max)
-      - lower_limit (req = max(req, value))  (same as set_min)
-      - set_max     (alias)
-      - set_min     (alias)
+class ConditionRuleEngine:
     """
-    req = dict(base_req)
-    conditions = [str(c).strip().lower() for c in (conditions or []) if str(c).strip()]
+    Health_Condition_Nutrient_Adjustments.csv compiled once into per-condition
+    vectors aligned to the requirement nutrient order:
 
-    if cond_df is None or cond_df.empty or not conditions:
-        return req, []
+        mult (1.0), add (0.0), min (-inf), max (+inf)
 
-    cdf = cond_df.copy()
+    Applying a set of conditions combines their vectors (multipliers multiply,
+    adds sum, the tightest limits win) and evaluates
 
-    # normalize columns
-    cdf.columns = [c.strip().lower() for c in cdf.columns]
+        clip(req * mult + add, min, max)
 
-    if not {"condition", "nutrient", "rule_type", "value"}.issubset(set(cdf.columns)):
-        return req, []
+    with NumPy, so the result does not depend on the order conditions are listed.
+    Limit rules on a nutrient that only exists as "<nutrient>_upper" in the
+    requirements (sodium_mg -> sodium_mg_upper) are applied to that key.
+    """
 
-    cdf["condition"] = cdf["condition"].astype(str).str.strip().str.lower()
-    cdf["nutrient"] = cdf["nutrient"].astype(str).str.strip()
-    cdf["rule_type"] = cdf["rule_type"].astype(str).str.strip().str.lower()
+    MEMO_SIZE = 1024
 
-    notes = []
+    def __init__(self, cond_df, nutrients: list):
+        self.nutrients = list(nutrients)
+        self.index = {k: i for i, k in enumerate(self.nutrients)}
+        self.vectors = {}
+        self.notes = {}
+        self._memo = {}
 
-    for cond in conditions:
-        rules = cdf[cdf["condition"] == cond]
-        if rules.empty:
-            continue
+        if cond_df is None or cond_df.empty:
+            return
+
+        df = cond_df.copy()
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        if not {"condition", "nutrient", "rule_type", "value"}.issubset(set(df.columns)):
+            return
 
-        for _, r in rules.iterrows():
-            nutrient = r.get("nutrient")
-            rule_type = r.get("rule_type")
-            note = r.get("note", "") if "note" in r else ""
+        n = len(self.nutrients)
+        for r in df.to_dict(orient="records"):
+            cond = str(r.get("condition", "")).strip().lower()
+            if not cond:
+                continue
+
+            nutrient = CANONICAL_KEY.get(str(r.get("nutrient", "")).strip(), str(r.get("nutrient", "")).strip())
+            rule_type = str(r.get("rule_type", "")).strip().lower()
+            raw_value = r.get("value")
+            value = _to_float(raw_value)
+            note = r.get("note", "")
+            note = "" if note is None or str(note) == "nan" else str(note)
+
+            vec = self.vectors.setdefault(
+                cond,
+                {
+                    "mult": np.ones(n),
+                    "add": np.zeros(n),
+                    "min": np.full(n, -np.inf),
+                    "max": np.full(n, np.inf),
+                },
+            )
+
+            slot = RULE_SLOTS.get(rule_type)
+            target = nutrient
+            if slot in ("min", "max") and target not in self.index and f"{target}_upper" in self.index:
+                target = f"{target}_upper"
+
+            if slot and value is not None and target in self.index:
+                j = self.index[target]
+                if slot == "mult":
+                    vec["mult"][j] *= value
+                elif slot == "add":
+                    vec["add"][j] += value
+                elif slot == "min":
+                    vec["min"][j] = max(vec["min"][j], value)
+                else:
+                    vec["max"][j] = min(vec["max"][j], value)
 
-            # only apply if nutrient exists in requirements
-            if nutrient not in req:
-                # still record note, because useful to show user what was ignored
-                if note:
-                    notes.append({
+            if note:
+                self.notes.setdefault(cond, []).append(
+                    {
                         "condition": cond,
                         "nutrient": nutrient,
                         "note": note,
                         "rule_type": rule_type,
-                        "value": r.get("value")
-                    })
+                        "value": value if value is not None else raw_value,
+                    }
+                )
+
+    @staticmethod
+    def normalize_conditions(conditions) -> tuple:
+        if isinstance(conditions, str):
+            conditions = [conditions]
+        return tuple(sorted({str(c).strip().lower() for c in (conditions or []) if str(c).strip()}))
+
+    def has_condition(self, condition) -> bool:
+        return str(condition or "").strip().lower() in self.vectors
+
+    def condition_notes(self, conditions) -> list:
+        out = []
+        for c in self.normalize_conditions(conditions):
+            out.extend(dict(n) for n in self.notes.get(c, []))
+        return out
+
+    def to_vector(self, req: dict) -> np.ndarray:
+        """
+        Requirement dict -> vector in nutrient order (NaN where missing / non-numeric).
+        """
+        vec = np.full(len(self.nutrients), np.nan)
+        for k, v in (req or {}).items():
+            j = self.index.get(CANONICAL_KEY.get(k, k))
+            if j is None:
                 continue
-
-            try:
-                base_val = float(req[nutrient])
-            except Exception:
+            f = _to_float(v)
+            if f is not None:
+                vec[j] = f
+        return vec
+
+    def apply_vector(self, base: np.ndarray, conditions, key=None) -> np.ndarray:
+        """
+        Adjusted requirement vector. When `key` identifies the base vector
+        (e.g. (age_min, age_max, group)), results are memoized per
+        (key, sorted conditions).
+        """
+        conds = tuple(c for c in self.normalize_conditions(conditions) if c in self.vectors)
+        if not conds:
+            return base.copy()
+
+        memo_key = (key, conds) if key is not None else None
+        if memo_key is not None and memo_key in self._memo:
+            return self._memo[memo_key].copy()
+
+        mult = np.prod([self.vectors[c]["mult"] for c in conds], axis=0)
+        add = np.sum([self.vectors[c]["add"] for c in conds], axis=0)
+        lo = np.max([self.vectors[c]["min"] for c in conds], axis=0)
+        hi = np.min([self.vectors[c]["max"] for c in conds], axis=0)
+
+        out = np.minimum(np.maximum(base * mult + add, lo), hi)
+        out = np.where(np.isnan(base), np.nan, out)
+
+        if memo_key is not None:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = out
+            return out.copy()
+        return out
+
+    def apply(self, base_req: dict, conditions, key=None):
+        """
+        Dict in, dict out: only numeric nutrient keys of base_req are adjusted,
+        everything else is passed through. Returns (requirements, condition_notes).
+        """
+        req = dict(base_req or {})
+        conds = self.normalize_conditions(conditions)
+        if not conds:
+            return req, []
+
+        adjusted = self.apply_vector(self.to_vector(req), conds, key=key)
+        for k in list(req.keys()):
+            j = self.index.get(CANONICAL_KEY.get(k, k))
+            if j is None or np.isnan(adjusted[j]) or _to_float(req[k]) is None:
                 continue
+            req[k] = float(adjusted[j])
 
-            try:
-                v = float(r.get("value"))
-            except Exception:
-                continue
+        return req, self.condition_notes(conds)
 
-            # Apply rules
-            if rule_type == "multiplier":
-                req[nutrient] = base_val * v
-            elif rule_type == "add":
-                req[nutrient] = base_val + v
-            elif rule_type in ("upper_limit", "set_max"):
-                req[nutrient] = min(base_val, v)
-            elif rule_type in ("lower_limit", "set_min"):
-                req[nutrient] = max(base_val, v)
-            else:
-                # unknown rule types ignored
-                continue
 
-            if note:
-                notes.append({
-                    "condition": cond,
-                    "nutrient": nutrient,
-                    "note": note,
-                    "rule_type": rule_type,
-                    "value": v
-                })
-
-    return req, notes
+def apply_condition_rules(base_req: dict, rules, conditions: list):
+    """
+    Applies rule_type to base requirements.
+
+    `rules` is a ConditionRuleEngine (see dataset_loader.get_rule_engine)
+    or the raw condition DataFrame (compiled on the fly).
+
+    Your CSV columns:
+      condition, nutrient, rule_type, value, note
+
+    Supported rule_type:
+      - multiplier  (req *= value)
+      - add         (req += value)
+      - upper_limit (req = min(req, value))  (same as set_max)
+      - lower_limit (req = max(req, value))  (same as set_min)
+      - set_max     (alias)
+      - set_min     (alias)
+    """
+    if not isinstance(rules, ConditionRuleEngine):
+        nutrients = [CANONICAL_KEY.get(k, k) for k in (base_req or {}) if k not in NON_NUTRIENT_COLS]
+        rules = ConditionRuleEngine(rules, list(dict.fromkeys(nutrients)))
+
+    return rules.apply(base_req, conditions)
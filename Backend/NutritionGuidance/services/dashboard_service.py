@@ -0,0 +1,59 @@
+# backend/NutritionGuidance/services/dashboard_service.py
+
+from typing import Dict, List
+
+from NutritionGuidance.services.compute_graph import profile_node, risk_node, summary_node
+from NutritionGuidance.services.report_service import build_report
+from NutritionGuidance.services.trained_report_service import build_trained_two_week_report
+
+# sections the dashboard can return (in build order: shared nodes first)
+DASHBOARD_FIELDS = ["profile", "summary", "report", "trained", "risk"]
+
+
+def parse_fields(raw) -> List[str]:
+    """
+    "summary,risk" / ["summary", "risk"] / None (= everything) -> ordered list of sections.
+    Raises ValueError on unknown sections.
+    """
+    if raw is None or raw == "" or raw == []:
+        return list(DASHBOARD_FIELDS)
+
+    if isinstance(raw, str):
+        raw = raw.split(",")
+
+    wanted = {str(f).strip().lower() for f in raw if str(f).strip()}
+    unknown = sorted(wanted - set(DASHBOARD_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown dashboard fields: {unknown}. Allowed: {DASHBOARD_FIELDS}")
+
+    return [f for f in DASHBOARD_FIELDS if f in wanted]
+
+
+def build_dashboard(app, user_id: str, period: str = "monthly", fields=None, days: int = 14) -> Dict:
+    """
+    GET /api/nutrition/dashboard?user_id=demo&period=monthly&fields=summary,report,risk
+
+    Everything the nutrition screen needs in one response. Profile, intake
+    summary, requirements and risk are compute_graph nodes, so the intake
+    data is summarized once and every section reuses it.
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    period = (period or "monthly").strip().lower()
+    fields = parse_fields(fields)
+
+    # warm the shared nodes once, every section below hits them
+    profile = profile_node(app, user_id)
+    summary = summary_node(app, user_id, period)
+
+    builders = {
+        "profile": lambda: profile,
+        "summary": lambda: summary,
+        "report": lambda: build_report(app, user_id, period),
+        "trained": lambda: build_trained_two_week_report(app, user_id, period, days),
+        "risk": lambda: {"period": period, **risk_node(app, user_id, period)},
+    }
+
+    out = {"user_id": user_id, "period": period, "fields": fields}
+    for f in fields:
+        out[f] = builders[f]()
+    return out
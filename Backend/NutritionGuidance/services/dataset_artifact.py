@@ -0,0 +1,116 @@
+# backend/NutritionGuidance/services/dataset_artifact.py
+
+"""
+Pre-normalized binary copy of the nutrition CSVs (built by
+scripts/build_nutrition_datasets.py).
+
+    nutrition_datasets.bin          every column as a raw, 64-byte aligned array
+    nutrition_datasets.schema.json  per dataset: source sha256, row count and
+                                    per column (name, dtype, offset)
+
+Columns are float64 / int64 / bool / fixed-width unicode, so the .bin file is
+memory-mapped and numeric columns are used without parsing or copying.
+A dataset is only taken from the artifact when its recorded source sha256
+matches the CSV on disk; otherwise dataset_loader falls back to the CSV.
+"""
+
+import json
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_BIN = "nutrition_datasets.bin"
+ARTIFACT_SCHEMA = "nutrition_datasets.schema.json"
+FORMAT_VERSION = 1
+
+_ALIGN = 64
+
+
+def _column_array(s: pd.Series) -> np.ndarray:
+    kind = s.dtype.kind
+    if kind in "iu":
+        return s.to_numpy(dtype=np.int64)
+    if kind == "f":
+        return s.to_numpy(dtype=np.float64)
+    if kind == "b":
+        return s.to_numpy(dtype=np.bool_)
+    values = s.astype(str).tolist()
+    width = max([len(v) for v in values] + [1])
+    return np.asarray(values, dtype=f"<U{width}")
+
+
+def build_artifact(data_dir: str, frames: Dict[str, pd.DataFrame], signatures: Dict[str, str]) -> str:
+    """
+    Write the artifact for already-normalized frames.
+    signatures: dataset name -> sha256 of the CSV the frame was loaded from.
+    Returns the schema path. Both files are replaced atomically.
+    """
+    bin_path = os.path.join(data_dir, ARTIFACT_BIN)
+    schema_path = os.path.join(data_dir, ARTIFACT_SCHEMA)
+
+    schema = {"format": FORMAT_VERSION, "bin": ARTIFACT_BIN, "datasets": {}}
+    offset = 0
+
+    with open(bin_path + ".tmp", "wb") as f:
+        for name, df in frames.items():
+            cols = []
+            for c in df.columns:
+                arr = np.ascontiguousarray(_column_array(df[c]))
+                pad = (-offset) % _ALIGN
+                f.write(b"\0" * pad)
+                offset += pad
+                f.write(arr.tobytes())
+                cols.append({"name": str(c), "dtype": arr.dtype.str, "offset": offset})
+                offset += arr.nbytes
+            schema["datasets"][name] = {"source_sha256": signatures[name], "rows": int(len(df)), "columns": cols}
+
+    schema["bytes"] = offset
+    with open(schema_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+
+    os.replace(bin_path + ".tmp", bin_path)
+    os.replace(schema_path + ".tmp", schema_path)
+    return schema_path
+
+
+def load_artifact(data_dir: str, signatures: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    """
+    Frames whose source sha256 matches `signatures` (name -> sha256 of the CSV
+    on disk). Missing / stale / unreadable artifact -> {} (caller reads CSVs).
+    """
+    schema_path = os.path.join(data_dir, ARTIFACT_SCHEMA)
+    bin_path = os.path.join(data_dir, ARTIFACT_BIN)
+    if not os.path.exists(schema_path) or not os.path.exists(bin_path):
+        return {}
+
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        if schema.get("format") != FORMAT_VERSION or os.path.getsize(bin_path) != schema.get("bytes"):
+            return {}
+
+        wanted = {
+            name: spec
+            for name, spec in (schema.get("datasets") or {}).items()
+            if name in signatures and spec.get("source_sha256") == signatures[name]
+        }
+        if not wanted:
+            return {}
+
+        buf = np.memmap(bin_path, dtype=np.uint8, mode="r")
+        out = {}
+        for name, spec in wanted.items():
+            rows = spec["rows"]
+            data = {}
+            for col in spec["columns"]:
+                dtype = np.dtype(col["dtype"])
+                arr = np.ndarray((rows,), dtype=dtype, buffer=buf, offset=col["offset"])
+                # text columns become Python strings like pd.read_csv gives
+                data[col["name"]] = arr.astype(object) if dtype.kind == "U" else arr
+            out[name] = pd.DataFrame(data, copy=False)
+        return out
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable dataset artifact in {data_dir}: {e}")
+        return {}
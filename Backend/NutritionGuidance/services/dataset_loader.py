@@ -1,8 +1,31 @@
+import hashlib
+import itertools
 import os
+import threading
+import time
 import pandas as pd
 
+from NutritionGuidance.services.dataset_artifact import build_artifact, load_artifact
+from NutritionGuidance.services.condition_rules import ConditionRuleEngine, requirement_nutrients
+from NutritionGuidance.services.food_autocomplete import FoodAutocomplete
+from NutritionGuidance.services.food_recommender import FoodRecommender
+from NutritionGuidance.services.nutrient_matrix import NutrientMatrix
+from NutritionGuidance.services.requirement_index import RequirementIndex
+
+# backend/data/ (used when there is no app / no DATA_DIR configured)
+DEFAULT_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
 _CACHE = {}
 
+# data_dir -> {"datasets", "files", "checked_at", "version"} (see get_datasets)
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_BUILD_LOCK = threading.RLock()
+_version_counter = itertools.count(1)
+
+# seconds between mtime checks of the CSVs (app.config["DATASET_RELOAD_SECONDS"], <= 0 disables reloads)
+DEFAULT_RELOAD_SECONDS = 2.0
+
 def _safe_read_csv(path: str) -> pd.DataFrame:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Dataset not found: {path}")
@@ -15,45 +38,247 @@ def _normalize(df: pd.DataFrame) -> pd.DataFrame:
             df[c] = df[c].astype(str).str.strip()
     return df
 
-def _ensure_ug_mcg_aliases(df: pd.DataFrame) -> pd.DataFrame:
-    pairs = [
-        ("vitamin_a_ug", "vitamin_a_mcg"),
-        ("vitamin_d_ug", "vitamin_d_mcg"),
-        ("vitamin_b12_ug", "vitamin_b12_mcg"),
-        ("folate_ug", "folate_mcg"),
-    ]
-    for ug, mcg in pairs:
-        if ug not in df.columns and mcg in df.columns:
-            df[ug] = df[mcg]
-        if mcg not in df.columns and ug in df.columns:
-            df[mcg] = df[ug]
+# mcg alias -> canonical *_ug column
+UG_ALIASES = {
+    "vitamin_a_mcg": "vitamin_a_ug",
+    "vitamin_d_mcg": "vitamin_d_ug",
+    "vitamin_b12_mcg": "vitamin_b12_ug",
+    "folate_mcg": "folate_ug",
+}
+
+def _canonical_ug_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep one column per micronutrient: *_mcg is renamed to *_ug (or dropped if
+    *_ug already exists). Consumers map aliases via CANONICAL_KEY anyway.
+    """
+    for mcg, ug in UG_ALIASES.items():
+        if mcg not in df.columns:
+            continue
+        if ug in df.columns:
+            df = df.drop(columns=[mcg])
+        else:
+            df = df.rename(columns={mcg: ug})
+    return df
+
+def _data_dir(app) -> str:
+    if app is None:
+        return DEFAULT_DATA_DIR
+    return os.path.abspath(app.config.get("DATA_DIR") or os.path.join(os.getcwd(), "data"))
+
+def _file_stat(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _load_food(path: str) -> pd.DataFrame:
+    df = _canonical_ug_columns(_normalize(_safe_read_csv(path)))
+    if "food_name" not in df.columns:
+        raise ValueError("Food dataset must contain 'food_name' column")
+    return df
+
+def _load_requirements(path: str) -> pd.DataFrame:
+    df = _canonical_ug_columns(_normalize(_safe_read_csv(path)))
+    if "age_min" not in df.columns or "age_max" not in df.columns or "group" not in df.columns:
+        raise ValueError("Requirements dataset must contain 'age_min', 'age_max', 'group'")
+    return df
+
+def _load_conditions(path: str) -> pd.DataFrame:
+    df = _normalize(_safe_read_csv(path))
+    if not {"condition", "nutrient", "rule_type", "value"}.issubset(set(df.columns)):
+        raise ValueError("Condition dataset must contain condition,nutrient,rule_type,value")
     return df
 
+# (name, file, loader) in get_datasets() tuple order
+DATASET_FILES = [
+    ("food", "SL_Food_Nutrition_Master.csv", _load_food),
+    ("requirements", "SL_Nutrient_Requirements_By_Age.csv", _load_requirements),
+    ("conditions", "Health_Condition_Nutrient_Adjustments.csv", _load_conditions),
+]
+
+def _reload_seconds(app) -> float:
+    if app is None:
+        return DEFAULT_RELOAD_SECONDS
+    try:
+        return float(app.config.get("DATASET_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS))
+    except Exception:
+        return DEFAULT_RELOAD_SECONDS
+
+def _load_all(data_dir: str) -> dict:
+    """
+    First load: CSVs whose sha256 matches the prebuilt artifact come from the
+    memory-mapped artifact (no parsing / normalizing), the rest from the CSV.
+    """
+    files = {}
+    for name, fname, _ in DATASET_FILES:
+        path = os.path.join(data_dir, fname)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dataset not found: {path}")
+        files[name] = (_file_stat(path), _file_hash(path))
+
+    prebuilt = load_artifact(data_dir, {name: sig for name, (_, sig) in files.items()})
+
+    frames = []
+    for name, fname, loader in DATASET_FILES:
+        df = prebuilt.get(name)
+        frames.append(df if df is not None else loader(os.path.join(data_dir, fname)))
+
+    return {"datasets": tuple(frames), "files": files, "checked_at": time.monotonic(), "version": next(_version_counter)}
+
+def build_dataset_artifact(data_dir: str = None) -> str:
+    """
+    Parse + normalize the CSVs in data_dir and write the prebuilt artifact
+    (see dataset_artifact.py). Returns the schema path.
+    """
+    data_dir = os.path.abspath(data_dir or DEFAULT_DATA_DIR)
+    frames, signatures = {}, {}
+    for name, fname, loader in DATASET_FILES:
+        path = os.path.join(data_dir, fname)
+        frames[name] = loader(path)
+        signatures[name] = _file_hash(path)
+    return build_artifact(data_dir, frames, signatures)
+
+def _refresh(data_dir: str, entry: dict) -> dict:
+    """
+    Re-read only the CSVs whose content changed (mtime/size first, then sha256).
+    Returns a new registry entry (same datasets tuple and version if no content changed).
+    """
+    frames = list(entry["datasets"])
+    files = dict(entry["files"])
+    changed = False
+
+    for i, (name, fname, loader) in enumerate(DATASET_FILES):
+        path = os.path.join(data_dir, fname)
+        try:
+            stat = _file_stat(path)
+        except OSError:
+            continue  # file being replaced -> keep the loaded version
+        old_stat, old_hash = files[name]
+        if stat == old_stat:
+            continue
+
+        try:
+            digest = _file_hash(path)
+        except OSError:
+            continue
+        if digest != old_hash:
+            try:
+                frames[i] = loader(path)
+            except Exception as e:
+                # keep serving the loaded version, retry once the file changes again
+                print(f"⚠️ Dataset reload failed for {path}, keeping the loaded version: {e}")
+                files[name] = (stat, old_hash)
+                continue
+            changed = True
+        files[name] = (stat, digest)
+
+    if not changed:
+        return {**entry, "files": files, "checked_at": time.monotonic()}
+    return {"datasets": tuple(frames), "files": files, "checked_at": time.monotonic(), "version": next(_version_counter)}
+
 def get_datasets(app):
     """
     Reads 3 CSVs from backend/data/ and caches them.
     Uses app.config["DATA_DIR"] if available, otherwise backend/data/.
+    app=None is allowed for code running outside a request (ML services, jobs).
+
+    Hot reload: at most every DATASET_RELOAD_SECONDS the CSV mtimes are checked;
+    a CSV whose content hash changed is re-read and re-normalized, and the
+    (food_df, req_df, cond_df) tuple is swapped atomically. Everything built
+    with _get_derived (nutrient matrix, rule engine, requirement index,
+    autocomplete, ...) is rebuilt on next use because the tuple changed.
+    A CSV that fails to load keeps serving the previous version.
     """
-    data_dir = app.config.get("DATA_DIR") or os.path.join(os.getcwd(), "data")
-    key = ("datasets", data_dir)
-    if key in _CACHE:
-        return _CACHE[key]
+    data_dir = _data_dir(app)
+    entry = _REGISTRY.get(data_dir)
+    interval = _reload_seconds(app)
 
-    food_path = os.path.join(data_dir, "SL_Food_Nutrition_Master.csv")
-    req_path  = os.path.join(data_dir, "SL_Nutrient_Requirements_By_Age.csv")
-    cond_path = os.path.join(data_dir, "Health_Condition_Nutrient_Adjustments.csv")
+    if entry is not None and (interval <= 0 or time.monotonic() - entry["checked_at"] < interval):
+        return entry["datasets"]
 
-    food_df = _ensure_ug_mcg_aliases(_normalize(_safe_read_csv(food_path)))
-    req_df  = _ensure_ug_mcg_aliases(_normalize(_safe_read_csv(req_path)))
-    cond_df = _normalize(_safe_read_csv(cond_path))
+    with _REGISTRY_LOCK:
+        entry = _REGISTRY.get(data_dir)
+        if entry is None:
+            entry = _load_all(data_dir)
+        elif interval > 0 and time.monotonic() - entry["checked_at"] >= interval:
+            entry = _refresh(data_dir, entry)
+        _REGISTRY[data_dir] = entry
 
-    # quick checks
-    if "food_name" not in food_df.columns:
-        raise ValueError("Food dataset must contain 'food_name' column")
-    if "age_min" not in req_df.columns or "age_max" not in req_df.columns or "group" not in req_df.columns:
-        raise ValueError("Requirements dataset must contain 'age_min', 'age_max', 'group'")
-    if not {"condition", "nutrient", "rule_type", "value"}.issubset(set(cond_df.columns)):
-        raise ValueError("Condition dataset must contain condition,nutrient,rule_type,value")
+    return entry["datasets"]
+
+def datasets_version(app) -> int:
+    """
+    Number that changes whenever a new set of datasets is loaded (cache keys for derived results).
+    """
+    get_datasets(app)
+    return _REGISTRY[_data_dir(app)]["version"]
+
+def dataset_signature(app, name: str) -> str:
+    """
+    sha256 of a loaded CSV ("food", "requirements", "conditions"); stable across processes.
+    """
+    get_datasets(app)
+    return _REGISTRY[_data_dir(app)]["files"][name][1]
+
+def _get_derived(app, name: str, builder):
+    """
+    Cache a structure built from the datasets (built once, reused by every request).
+    It is rebuilt only if the underlying datasets tuple changes.
+    """
+    datasets = get_datasets(app)
+    key = (name, _data_dir(app))
+    hit = _CACHE.get(key)
+    if hit is not None and hit[0] is datasets:
+        return hit[1]
+
+    # one build at a time (concurrent first requests would otherwise all build)
+    with _BUILD_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None and hit[0] is datasets:
+            return hit[1]
+        value = builder(*datasets)
+        _CACHE[key] = (datasets, value)
+    return value
+
+def get_nutrient_matrix(app) -> NutrientMatrix:
+    """
+    Food nutrients as a float64 matrix (foods x NUTRIENT_COLS) + id/name -> row maps.
+    """
+    return _get_derived(app, "nutrient_matrix", lambda food_df, req_df, cond_df: NutrientMatrix(food_df))
+
+def get_food_recommender(app) -> FoodRecommender:
+    """
+    Raw + max-normalized food nutrient matrices for gap-based recommendations.
+    """
+    return _get_derived(app, "food_recommender", lambda food_df, req_df, cond_df: FoodRecommender(food_df))
 
-    _CACHE[key] = (food_df, req_df, cond_df)
-    return _CACHE[key]
+def get_food_autocomplete(app) -> FoodAutocomplete:
+    """
+    Prefix / trigram index over food names for /foods/search.
+    """
+    return _get_derived(app, "food_autocomplete", lambda food_df, req_df, cond_df: FoodAutocomplete(food_df))
+
+def get_rule_engine(app) -> ConditionRuleEngine:
+    """
+    Condition rules compiled into vectors aligned to the requirement nutrients.
+    """
+    return _get_derived(
+        app,
+        "rule_engine",
+        lambda food_df, req_df, cond_df: ConditionRuleEngine(cond_df, requirement_nutrients(req_df)),
+    )
+
+def get_requirement_index(app) -> RequirementIndex:
+    """
+    Requirement age bands per group (bisect lookup) + LRU of condition-adjusted requirements.
+    """
+    return _get_derived(
+        app,
+        "requirement_index",
+        lambda food_df, req_df, cond_df: RequirementIndex(req_df, get_rule_engine(app)),
+    )
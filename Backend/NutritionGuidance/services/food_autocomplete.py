@@ -0,0 +1,188 @@
+# backend/NutritionGuidance/services/food_autocomplete.py
+
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[^0-9a-z]+")
+
+# minimum trigram similarity (Jaccard) for typo-tolerant matches
+FUZZY_MIN_SIMILARITY = 0.3
+
+
+def normalize_name(name) -> str:
+    return str(name or "").strip().lower()
+
+
+def _trigrams(s: str) -> set:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _padded_trigrams(s: str) -> set:
+    return _trigrams(f"  {s} ")
+
+
+class FoodAutocomplete:
+    """
+    Autocomplete index over food names, built once per loaded dataset.
+
+    - dedup:     one entry per case-insensitive name (first row wins)
+    - prefix:    sorted name array + sorted token array, searched with bisect
+    - substring: trigram postings, candidates verified with `in`
+    - fuzzy:     padded-trigram Jaccard similarity for typos ("kotu" -> "kottu")
+
+    Ranking: name prefix > word prefix > substring > fuzzy,
+    then popularity (how often the food is logged), then table order.
+    """
+
+    def __init__(self, food_df):
+        cols = []
+        if "food_id" in food_df.columns:
+            cols.append("food_id")
+        cols.append("food_name")
+        for c in ["serving_basis", "serving_size_g"]:
+            if c in food_df.columns:
+                cols.append(c)
+
+        values = {c: food_df[c].tolist() for c in cols}
+        names = food_df["food_name"].astype(str).tolist()
+
+        # precomputed dedup keys -> one entry per distinct name, in table order
+        self.items = []
+        self.keys = []
+        self.entry_by_key = {}
+        for i, name in enumerate(names):
+            k = normalize_name(name)
+            if k in self.entry_by_key:
+                continue
+            self.entry_by_key[k] = len(self.keys)
+            self.keys.append(k)
+            self.items.append({c: values[c][i] for c in cols})
+
+        n = len(self.keys)
+
+        # prefix arrays
+        by_name = sorted(range(n), key=lambda e: self.keys[e])
+        self._names_sorted = [self.keys[e] for e in by_name]
+        self._names_ids = np.asarray(by_name, dtype=np.int64)
+
+        tokens = sorted((t, e) for e, k in enumerate(self.keys) for t in set(_TOKEN_RE.split(k)) if t)
+        self._tokens_sorted = [t for t, _ in tokens]
+        self._tokens_ids = np.asarray([e for _, e in tokens], dtype=np.int64)
+
+        # trigram postings (plain for substring, padded for fuzzy)
+        self._tri = self._postings(_trigrams)
+        self._ptri = self._postings(_padded_trigrams)
+        self._ptri_count = np.asarray([len(_padded_trigrams(k)) for k in self.keys], dtype=np.int64)
+
+        self.popularity = np.zeros(n, dtype=np.int64)
+        self.popularity_loaded_at = None
+
+    def _postings(self, grams) -> Dict[str, np.ndarray]:
+        acc = {}
+        for e, k in enumerate(self.keys):
+            for g in grams(k):
+                acc.setdefault(g, []).append(e)
+        return {g: np.asarray(ids, dtype=np.int64) for g, ids in acc.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set_popularity(self, counts: Dict[str, int]) -> None:
+        """
+        counts: food_name -> number of times logged (any casing).
+        """
+        pop = np.zeros(len(self.keys), dtype=np.int64)
+        for name, c in (counts or {}).items():
+            e = self.entry_by_key.get(normalize_name(name))
+            if e is not None:
+                pop[e] += int(c or 0)
+        self.popularity = pop
+        self.popularity_loaded_at = time.monotonic()
+
+    # --------------------------------------------------
+    # candidate generators
+    # --------------------------------------------------
+    @staticmethod
+    def _prefix_range(sorted_keys: List[str], ids: np.ndarray, q: str) -> np.ndarray:
+        lo = bisect_left(sorted_keys, q)
+        hi = bisect_left(sorted_keys, q + "\uffff")
+        return ids[lo:hi]
+
+    def _substring(self, q: str) -> np.ndarray:
+        if len(q) < 3:
+            # too short for trigrams (rare: prefix tiers normally fill the page)
+            return np.asarray([e for e, k in enumerate(self.keys) if q in k], dtype=np.int64)
+
+        grams = sorted(_trigrams(q), key=lambda g: len(self._tri.get(g, ())))
+        cand = None
+        for g in grams:
+            p = self._tri.get(g)
+            if p is None:
+                return np.zeros(0, dtype=np.int64)
+            cand = p if cand is None else np.intersect1d(cand, p, assume_unique=True)
+            if len(cand) == 0:
+                return cand
+        return np.asarray([e for e in cand.tolist() if q in self.keys[e]], dtype=np.int64)
+
+    def _fuzzy(self, q: str) -> np.ndarray:
+        qg = _padded_trigrams(q)
+        postings = [self._ptri[g] for g in qg if g in self._ptri]
+        if not postings:
+            return np.zeros(0, dtype=np.int64)
+
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        cand = np.nonzero(shared)[0]
+        sim = shared[cand] / (len(qg) + self._ptri_count[cand] - shared[cand])
+        keep = sim >= FUZZY_MIN_SIMILARITY
+        cand, sim = cand[keep], sim[keep]
+        return cand[np.lexsort((cand, -sim))]
+
+    def _rank(self, ids: np.ndarray, limit: int) -> List[int]:
+        """
+        Best `limit` entries by popularity desc, then table order.
+        """
+        if len(ids) == 0:
+            return []
+        n = len(self.keys)
+        key = self.popularity[ids] * (n + 1) + (n - ids)
+        if len(ids) > limit:
+            part = np.argpartition(-key, limit - 1)[:limit]
+            ids, key = ids[part], key[part]
+        return ids[np.argsort(-key, kind="stable")].tolist()
+
+    # --------------------------------------------------
+    # public
+    # --------------------------------------------------
+    def search(self, q: str, limit: int = 15) -> List[dict]:
+        q = normalize_name(q)
+        if not q or limit <= 0:
+            return []
+
+        out = []
+        seen = set()
+
+        def take(ids, ranked=True):
+            picks = self._rank(ids, limit + len(seen)) if ranked else ids.tolist()
+            for e in picks:
+                if e in seen:
+                    continue
+                seen.add(e)
+                out.append(e)
+                if len(out) >= limit:
+                    return True
+            return False
+
+        if take(self._prefix_range(self._names_sorted, self._names_ids, q)):
+            return [dict(self.items[e]) for e in out]
+        if " " not in q and take(self._prefix_range(self._tokens_sorted, self._tokens_ids, q)):
+            return [dict(self.items[e]) for e in out]
+        if take(self._substring(q)):
+            return [dict(self.items[e]) for e in out]
+        if len(q) >= 3:
+            take(self._fuzzy(q), ranked=False)
+
+        return [dict(self.items[e]) for e in out]
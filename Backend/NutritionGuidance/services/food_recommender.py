@@ -0,0 +1,151 @@
+# backend/NutritionGuidance/services/food_recommender.py
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# text columns of the food table (everything else is treated as a nutrient)
+TEXT_COLS = {"food_id", "food_name", "name", "serving_basis"}
+
+
+def _as_float(x) -> Optional[float]:
+    try:
+        v = float(x)
+    except Exception:
+        return None
+    return v if math.isfinite(v) else None
+
+
+class FoodRecommender:
+    """
+    "Which foods best close these gaps?" over a precomputed nutrient matrix.
+
+    - raw:        foods x nutrients (per serving, NaN -> 0 for scoring)
+    - normalized: raw / column max, so nutrients with different units are comparable
+
+    Scores are one vectorized weighted sum over the selected nutrient columns,
+    top-k uses np.argpartition (no full sort, no DataFrame copies).
+    """
+
+    def __init__(self, food_df: pd.DataFrame):
+        df = food_df if food_df is not None else pd.DataFrame()
+        n = len(df)
+
+        self.columns = []
+        cols = []
+        for c in df.columns:
+            c = str(c).strip()
+            if c in TEXT_COLS:
+                continue
+            values = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+            if n and np.isnan(values).all():
+                continue
+            self.columns.append(c)
+            cols.append(values)
+
+        self.col_index = {c: j for j, c in enumerate(self.columns)}
+        self.values = np.column_stack(cols) if cols else np.zeros((n, 0), dtype=np.float64)  # keeps NaN for output
+        self.raw = np.nan_to_num(self.values, nan=0.0, posinf=0.0, neginf=0.0)
+
+        col_max = self.raw.max(axis=0) if n else np.zeros(len(self.columns))
+        safe_max = np.where(col_max > 0, col_max, 1.0)
+        self.normalized = np.where(col_max > 0, self.raw / safe_max, 0.0)
+
+        def text(col):
+            return df[col].tolist() if col in df.columns else [None] * n
+
+        self.food_ids = text("food_id")
+        self.food_names = df["food_name"].tolist() if "food_name" in df.columns else text("name")
+        self.serving_basis = text("serving_basis")
+        self.serving_size_g = text("serving_size_g")
+        self.has_food_id = "food_id" in df.columns
+        self.has_serving_basis = "serving_basis" in df.columns
+        self.has_serving_size = "serving_size_g" in df.columns
+
+    def __len__(self):
+        return self.raw.shape[0]
+
+    def known(self, keys) -> List[str]:
+        return [k for k in keys if k in self.col_index]
+
+    def value(self, i: int, key: str):
+        return _as_float(self.values[i, self.col_index[key]])
+
+    def score(self, keys, weights=None, normalized: bool = True) -> np.ndarray:
+        """
+        Weighted sum of the given nutrient columns for every food.
+        """
+        idx = [self.col_index[k] for k in keys if k in self.col_index]
+        if not idx or len(self) == 0:
+            return np.zeros(len(self), dtype=np.float64)
+
+        m = self.normalized if normalized else self.raw
+        sub = m[:, idx]
+        if weights is None:
+            return sub.sum(axis=1)
+
+        w = np.asarray([weights.get(k, 1.0) for k in keys if k in self.col_index], dtype=np.float64)
+        return sub @ w
+
+    def top_k(self, keys, k: int = 8, weights=None, normalized: bool = True) -> List[int]:
+        """
+        Row indices of the k best-scoring foods (best first, ties by table order).
+        """
+        n = len(self)
+        if n == 0 or k <= 0 or not self.known(keys):
+            return []
+
+        s = self.score(keys, weights=weights, normalized=normalized)
+        if k < n:
+            cand = np.argpartition(-s, k - 1)[:k]
+        else:
+            cand = np.arange(n)
+        order = np.lexsort((cand, -s[cand]))
+        return cand[order].tolist()
+
+    def greedy_combination(self, gaps: Dict, keys=None, max_items: int = 3) -> Dict:
+        """
+        Greedy multi-food plan: repeatedly pick the food (one serving) that covers
+        the largest share of the *remaining* gaps, until max_items or nothing left.
+
+        Coverage of a food = sum over gap nutrients of min(value, remaining) / gap.
+        """
+        keys = [k for k in (keys or list(gaps.keys())) if k in self.col_index]
+        gap = np.asarray([_as_float(gaps.get(k)) or 0.0 for k in keys], dtype=np.float64)
+        live = gap > 0
+        keys = [k for k, ok in zip(keys, live) if ok]
+        gap = gap[live]
+
+        if not keys or len(self) == 0:
+            return {"foods": [], "coverage": {}}
+
+        sub = self.raw[:, [self.col_index[k] for k in keys]]
+        remaining = gap.copy()
+        used = np.zeros(len(self), dtype=bool)
+        picks = []
+
+        for _ in range(max_items):
+            gain = (np.minimum(sub, remaining) / gap).sum(axis=1)
+            gain[used] = -1.0
+            i = int(np.argmax(gain))
+            if gain[i] <= 0:
+                break
+
+            used[i] = True
+            remaining = np.maximum(remaining - sub[i], 0.0)
+            picks.append(
+                {
+                    "food_id": self.food_ids[i],
+                    "food_name": self.food_names[i],
+                    "servings": 1,
+                    "gap_coverage": round(float(gain[i]) / len(keys), 4),
+                }
+            )
+
+        covered = 1.0 - remaining / gap
+        return {
+            "foods": picks,
+            "coverage": {k: round(float(c), 4) for k, c in zip(keys, covered)},
+        }
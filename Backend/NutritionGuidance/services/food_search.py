@@ -1,13 +1,44 @@
 # backend/NutritionGuidance/services/food_search.py
 
-def search_foods(food_df, q: str, limit: int = 15):
+import time
+
+from NutritionGuidance.services.dataset_loader import get_food_autocomplete
+from NutritionGuidance.services.food_autocomplete import FoodAutocomplete
+from NutritionGuidance.services.intake_store import food_popularity
+
+# how often autocomplete ranking picks up new intake logs (seconds)
+POPULARITY_REFRESH_SECONDS = 300
+
+
+def get_autocomplete_index(app) -> FoodAutocomplete:
+    """
+    Shared autocomplete index with popularity refreshed from intake logs.
+    """
+    index = get_food_autocomplete(app)
+    loaded = index.popularity_loaded_at
+    if loaded is None or time.monotonic() - loaded > POPULARITY_REFRESH_SECONDS:
+        try:
+            index.set_popularity(food_popularity(app))
+        except Exception as e:
+            # ranking still works (table order) without popularity
+            print("⚠️ Food popularity refresh failed:", str(e))
+            index.popularity_loaded_at = time.monotonic()
+    return index
+
+
+def search_foods(food_df, q: str, limit: int = 15, index: FoodAutocomplete = None):
     """
     Search foods for UI autocomplete.
 
-    - Case-insensitive "contains" search on food_name
+    - Case-insensitive match on food_name: name prefix, word prefix,
+      substring, then typo-tolerant (trigram) matches
+    - Ranked by match quality, then how often the food is logged
     - Returns a small set of UI-friendly fields
     - Removes duplicates ignoring case (e.g., "Iced Tea" vs "Iced tea")
 
+    Pass `index` (see get_autocomplete_index) to reuse the prebuilt index;
+    otherwise a one-off index is built from food_df.
+
     Returns:
       [
         { food_id, food_name, serving_basis, serving_size_g },
@@ -18,25 +49,7 @@ def search_foods(food_df, q: str, limit: int = 15):
     if not q:
         return []
 
-    # contains match (case-insensitive)
-    mask = food_df["food_name"].astype(str).str.lower().str.contains(q, na=False)
-
-    # choose columns safely
-    cols = []
-    if "food_id" in food_df.columns:
-        cols.append("food_id")
-
-    cols.append("food_name")
-
-    for c in ["serving_basis", "serving_size_g"]:
-        if c in food_df.columns:
-            cols.append(c)
-
-    out = food_df.loc[mask, cols].copy()
-
-    # remove duplicates ignoring case
-    out["_k"] = out["food_name"].astype(str).str.lower().str.strip()
-    out = out.drop_duplicates(subset=["_k"], keep="first").drop(columns=["_k"])
+    if index is None:
+        index = FoodAutocomplete(food_df)
 
-    # limit results
-    return out.head(limit).to_dict(orient="records")
+    return index.search(q, limit)
@@ -0,0 +1,135 @@
+# backend/NutritionGuidance/services/forecast_service.py
+
+from datetime import date, timedelta
+from typing import Dict
+
+import numpy as np
+
+from NutritionGuidance.services.intake_store import daily_nutrient_series
+from NutritionGuidance.services.nutrient_matrix import NUTRIENT_COLS
+
+# days of daily rollups the model is fitted on (from the first logged day inside this window)
+HISTORY_DAYS = 56
+
+# damped additive trend (Holt) on weekday-adjusted daily totals
+ALPHA = 0.3    # level smoothing
+BETA = 0.1     # trend smoothing
+PHI = 0.9      # trend damping, keeps long horizons from running away
+
+# weekday seasonality needs at least two full weeks
+MIN_SEASONAL_DAYS = 14
+
+CONFIDENCE = 0.8
+Z_SCORE = 1.2816  # two-sided 80% normal interval
+
+METHOD = "damped_trend_weekday"
+
+
+def fit_forecast(history_days, y: np.ndarray, logged: np.ndarray, horizon: int) -> Dict:
+    """
+    Forecast every nutrient column of `y` (days x nutrients) `horizon` days ahead.
+
+    - weekday seasonality: mean deviation of each weekday from the overall mean
+    - level / trend: exponentially weighted (error-correction form), damped trend
+    - intervals: one-step residual spread, widened with the horizon
+      (sigma^2 * (1 + (h - 1) * alpha^2), summed for totals, assumes independent errors)
+
+    All nutrients are fitted together: every step is a vector operation over the
+    nutrient axis, the only Python loop is over the (<= HISTORY_DAYS) history days.
+    """
+    k = y.shape[1]
+    horizon = max(1, int(horizon))
+    last_day = history_days[-1] if history_days else date.today()
+
+    first = int(np.argmax(logged)) if logged.any() else len(logged)
+    y = y[first:]
+    days = history_days[first:]
+    t_len = len(y)
+
+    season = np.zeros((7, k))
+    if t_len >= MIN_SEASONAL_DAYS:
+        weekdays = np.asarray([d.weekday() for d in days])
+        overall = y.mean(axis=0)
+        for w in range(7):
+            season[w] = y[weekdays == w].mean(axis=0) - overall
+
+    level = np.zeros(k)
+    trend = np.zeros(k)
+    sigma = np.zeros(k)
+
+    if t_len:
+        adjusted = y - season[[d.weekday() for d in days]]
+        level = adjusted[:min(7, t_len)].mean(axis=0)
+
+        errors = np.zeros((t_len, k))
+        for t in range(t_len):
+            pred = level + PHI * trend
+            err = adjusted[t] - pred
+            errors[t] = err
+            level = pred + ALPHA * err
+            trend = PHI * trend + ALPHA * BETA * err
+
+        if t_len > 1:
+            sigma = np.sqrt((errors[1:] ** 2).mean(axis=0))
+
+    h = np.arange(1, horizon + 1)
+    damp = np.cumsum(PHI ** h)
+    future = [last_day + timedelta(days=int(i)) for i in h]
+
+    mean = level[None, :] + damp[:, None] * trend[None, :] + season[[d.weekday() for d in future]]
+    mean = np.maximum(mean, 0.0)
+
+    var = (sigma ** 2)[None, :] * (1.0 + (h[:, None] - 1) * ALPHA ** 2)
+    total = mean.sum(axis=0)
+    total_spread = Z_SCORE * np.sqrt(var.sum(axis=0))
+
+    return {
+        "dates": [d.isoformat() for d in future],
+        "history_days": t_len,
+        "mean": mean,
+        "total": total,
+        "total_low": np.maximum(total - total_spread, 0.0),
+        "total_high": total + total_spread,
+    }
+
+
+def forecast_user(app, user_id: str, days: int = 14) -> Dict:
+    """
+    GET /api/nutrition/forecast?user_id=demo&days=14
+
+    Per-nutrient forecast of the next `days` days (starting tomorrow) for all
+    NUTRIENT_COLS, fitted on the user's daily rollups up to today.
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    days = max(1, int(days))
+
+    end = date.today()
+    start = end - timedelta(days=HISTORY_DAYS - 1)
+    history, y, logged = daily_nutrient_series(app, user_id, start, end)
+
+    fit = fit_forecast(history, y, logged, days)
+
+    def r(x):
+        return round(float(x), 4)
+
+    nutrients = {}
+    for j, key in enumerate(NUTRIENT_COLS):
+        nutrients[key] = {
+            "per_day": r(fit["total"][j] / days),
+            "per_day_ci": [r(fit["total_low"][j] / days), r(fit["total_high"][j] / days)],
+            "total": r(fit["total"][j]),
+            "total_ci": [r(fit["total_low"][j]), r(fit["total_high"][j])],
+            "daily": [r(v) for v in fit["mean"][:, j]],
+        }
+
+    return {
+        "user_id": user_id,
+        "method": METHOD,
+        "confidence": CONFIDENCE,
+        "history_days_used": fit["history_days"],
+        "logged_days": int(logged.sum()),
+        "forecast_days": days,
+        "forecast_start": fit["dates"][0],
+        "forecast_end": fit["dates"][-1],
+        "nutrients": nutrients,
+    }
@@ -1,15 +1,132 @@
 
 import json
 import os
+import sqlite3
 from datetime import datetime, timedelta, date
 
-from NutritionGuidance.services.dataset_loader import get_datasets
+import numpy as np
 
+from NutritionGuidance.services.dataset_loader import dataset_signature, get_nutrient_matrix
+from NutritionGuidance.services.nutrient_matrix import NUTRIENT_COLS
+from NutritionGuidance.services.file_lock import locked
 
-def _intake_path(app, user_id: str) -> str:
+
+def _store_dir(app) -> str:
     store_dir = app.config.get("STORE_DIR") or os.path.join(os.getcwd(), "store")
     os.makedirs(store_dir, exist_ok=True)
-    return os.path.join(store_dir, f"intake_{user_id}.json")
+    return store_dir
+
+
+def _intake_path(app, user_id: str) -> str:
+    """
+    Append-only intake log (JSON Lines, one record per line).
+    """
+    return os.path.join(_store_dir(app), f"intake_{user_id}.jsonl")
+
+
+def _legacy_intake_path(app, user_id: str) -> str:
+    """
+    Old format: one JSON array per user, rewritten on every log.
+    """
+    return os.path.join(_store_dir(app), f"intake_{user_id}.json")
+
+
+def _migrate_legacy(app, user_id: str) -> bool:
+    """
+    Convert intake_<user>.json -> intake_<user>.jsonl once.
+    The legacy file is left untouched (the .jsonl takes precedence from now on).
+    """
+    legacy = _legacy_intake_path(app, user_id)
+    path = _intake_path(app, user_id)
+    if os.path.exists(path) or not os.path.exists(legacy):
+        return False
+
+    with locked(path):
+        # another worker may have migrated while we waited for the lock
+        if os.path.exists(path):
+            return False
+
+        with open(legacy, "r", encoding="utf-8") as f:
+            logs = json.load(f) or []
+
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in logs:
+                if isinstance(rec, dict):
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    return True
+
+
+def migrate_legacy_intake_logs(app) -> list:
+    """
+    Migrate every intake_<user>.json in STORE_DIR to the .jsonl log.
+    Returns the list of migrated user ids.
+    """
+    migrated = []
+    for fname in sorted(os.listdir(_store_dir(app))):
+        if not (fname.startswith("intake_") and fname.endswith(".json")):
+            continue
+        user_id = fname[len("intake_"):-len(".json")]
+        if _migrate_legacy(app, user_id):
+            migrated.append(user_id)
+    return migrated
+
+
+def read_intake_logs(app, user_id: str) -> list:
+    """
+    Read all intake records of a user (oldest first).
+    A trailing line without newline is an in-progress append and is skipped.
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    _migrate_legacy(app, user_id)
+
+    path = _intake_path(app, user_id)
+    if not os.path.exists(path):
+        return []
+
+    logs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n") or not line.strip():
+                continue
+            try:
+                logs.append(json.loads(line))
+            except ValueError:
+                continue
+    return logs
+
+
+def intake_log_version(app, user_id: str):
+    """
+    Cheap version stamp of a user's intake log (size, mtime_ns), None if nothing is logged.
+    Appends always grow the file, so any new log changes the version.
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    for path in (_intake_path(app, user_id), _legacy_intake_path(app, user_id)):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        return (os.path.basename(path), st.st_size, st.st_mtime_ns)
+    return None
+
+
+def _append_record(app, user_id: str, record: dict) -> None:
+    """
+    O(1) append of a single record, serialized across processes by a file lock.
+    """
+    _migrate_legacy(app, user_id)
+
+    path = _intake_path(app, user_id)
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with locked(path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
 
 
 def _normalize_ts(date_str: str, ts_str: str | None) -> str:
@@ -74,18 +191,279 @@ def add_intake(app, user_id: str, food_id: str, food_name: str, quantity: float,
         "ts": _normalize_ts(date_str, ts_str),
     }
 
+    _append_record(app, user_id, record)
+    _sync_rollups(app, user_id)
+
+    return record
+
+
+# --------------------------------------------------
+# DAILY ROLLUPS
+# Per-user per-day nutrient totals, maintained on write.
+# The intake log stays the source of truth; rollup_state keeps the byte
+# offset of the log that has already been folded in, so every sync only
+# reads the new tail (usually the single record just appended), and the
+# hash of the food CSV the totals were computed with (a changed food table
+# rebuilds the user's rollups on next sync).
+# --------------------------------------------------
+_SCHEMA_READY = set()
+
+
+def _rollup_db_path(app) -> str:
+    return os.path.join(_store_dir(app), "intake_rollups.db")
+
+
+def _rollup_conn(app) -> sqlite3.Connection:
+    path = _rollup_db_path(app)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+
+    if path not in _SCHEMA_READY:
+        nutrient_defs = ", ".join(f"{k} REAL NOT NULL DEFAULT 0" for k in NUTRIENT_COLS)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS daily_nutrients (
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                logs INTEGER NOT NULL DEFAULT 0,
+                {nutrient_defs},
+                PRIMARY KEY (user_id, date)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS daily_foods (
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                food_name TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                servings REAL NOT NULL DEFAULT 0,
+                first_seen INTEGER NOT NULL,
+                PRIMARY KEY (user_id, date, food_name)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rollup_state (
+                user_id TEXT PRIMARY KEY,
+                log_offset INTEGER NOT NULL DEFAULT 0,
+                food_sig TEXT
+            )"""
+        )
+        # databases created before food_sig existed
+        state_cols = {r[1] for r in conn.execute("PRAGMA table_info(rollup_state)")}
+        if "food_sig" not in state_cols:
+            conn.execute("ALTER TABLE rollup_state ADD COLUMN food_sig TEXT")
+        _SCHEMA_READY.add(path)
+
+    return conn
+
+
+def _fold_records(app, records):
+    """
+    records: [(byte_offset, log_dict)] in log order.
+    Returns per-day nutrient totals / log counts and per-day food tallies.
+
+    Nutrients are one gather from the food nutrient matrix weighted by the
+    logged servings, reduced per day with np.add.reduceat.
+    """
+    parsed = []  # (date, row, qty, final_name, offset)
+    fm = None
+
+    for offset, log in records:
+        date_str = log.get("date")
+        try:
+            d = datetime.strptime(date_str, "%Y-%m-%d").date().isoformat()
+        except Exception:
+            continue
+
+        if fm is None:
+            fm = get_nutrient_matrix(app)
+
+        fid = str(log.get("food_id") or "").strip()
+        fname = str(log.get("food_name") or "").strip()
+        qty = float(log.get("quantity") or 1.0)
+
+        row = fm.row_for(fid, fname)
+        resolved_name = (fm.names[row] or None) if row >= 0 else None
+        final_name = resolved_name or fname or fid or "Unknown"
+
+        parsed.append((d, row, qty, final_name, offset))
+
+    days = {}    # date -> {"logs": n, nutrient: total}
+    foods = {}   # (date, food_name) -> [count, servings, first_seen]
+    if not parsed:
+        return days, foods
+
+    # group logs by day (stable sort keeps log order inside a day)
+    parsed.sort(key=lambda x: x[0])
+    dates = [p[0] for p in parsed]
+    starts = [i for i in range(len(dates)) if i == 0 or dates[i] != dates[i - 1]]
+
+    per_day = fm.grouped_totals([p[1] for p in parsed], [p[2] for p in parsed], starts)
+    counts = np.diff(starts + [len(dates)])
+
+    for g, i in enumerate(starts):
+        day = {"logs": int(counts[g])}
+        day.update(zip(NUTRIENT_COLS, per_day[g].tolist()))
+        days[dates[i]] = day
+
+    for d, _, qty, final_name, offset in parsed:
+        tally = foods.setdefault((d, final_name), [0, 0.0, offset])
+        tally[0] += 1
+        tally[1] += qty
+
+    return days, foods
+
+
+def _apply_rollups(conn, user_id: str, days: dict, foods: dict) -> None:
+    cols = ", ".join(NUTRIENT_COLS)
+    marks = ", ".join("?" for _ in NUTRIENT_COLS)
+    updates = ", ".join(f"{k} = {k} + excluded.{k}" for k in NUTRIENT_COLS)
+
+    conn.executemany(
+        f"""INSERT INTO daily_nutrients (user_id, date, logs, {cols})
+            VALUES (?, ?, ?, {marks})
+            ON CONFLICT (user_id, date) DO UPDATE SET logs = logs + excluded.logs, {updates}""",
+        [(user_id, d, v["logs"], *[v[k] for k in NUTRIENT_COLS]) for d, v in days.items()],
+    )
+    conn.executemany(
+        """INSERT INTO daily_foods (user_id, date, food_name, count, servings, first_seen)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT (user_id, date, food_name) DO UPDATE SET
+               count = count + excluded.count,
+               servings = servings + excluded.servings""",
+        [(user_id, d, name, t[0], t[1], t[2]) for (d, name), t in foods.items()],
+    )
+
+
+def _sync_rollups(app, user_id: str) -> None:
+    """
+    Fold any intake records not yet in the rollups (normally just the last append).
+    BEGIN IMMEDIATE serializes concurrent syncs so no record is applied twice.
+    """
+    _migrate_legacy(app, user_id)
     path = _intake_path(app, user_id)
-    logs = []
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            logs = json.load(f) or []
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    food_sig = dataset_signature(app, "food")
 
-    logs.append(record)
+    conn = _rollup_conn(app)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT log_offset, food_sig FROM rollup_state WHERE user_id = ?", (user_id,)).fetchone()
+        offset = row[0] if row else 0
+
+        if size < offset or (row and row[1] != food_sig):
+            # log was replaced/truncated, or the food table changed -> start over
+            conn.execute("DELETE FROM daily_nutrients WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM daily_foods WHERE user_id = ?", (user_id,))
+            offset = 0
+        elif size == offset:
+            conn.execute("COMMIT")
+            return
+
+        records = []
+        if size:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # in-progress append, pick it up next time
+                    pos = offset
+                    offset += len(raw)
+                    try:
+                        records.append((pos, json.loads(raw.decode("utf-8"))))
+                    except ValueError:
+                        continue
+
+        days, foods = _fold_records(app, records)
+        _apply_rollups(conn, user_id, days, foods)
+        conn.execute(
+            """INSERT INTO rollup_state (user_id, log_offset, food_sig) VALUES (?, ?, ?)
+               ON CONFLICT (user_id) DO UPDATE SET log_offset = excluded.log_offset, food_sig = excluded.food_sig""",
+            (user_id, offset, food_sig),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(logs, f, ensure_ascii=False, indent=2)
 
-    return record
+def rebuild_rollups(app, user_id: str = None) -> list:
+    """
+    Drop and recompute rollups from the intake logs.
+    user_id=None rebuilds every user found in STORE_DIR.
+    Returns the list of rebuilt user ids.
+    """
+    if user_id:
+        user_ids = [(user_id or "demo").strip() or "demo"]
+    else:
+        migrate_legacy_intake_logs(app)
+        user_ids = sorted(
+            fname[len("intake_"):-len(".jsonl")]
+            for fname in os.listdir(_store_dir(app))
+            if fname.startswith("intake_") and fname.endswith(".jsonl")
+        )
+
+    conn = _rollup_conn(app)
+    try:
+        for uid in user_ids:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM daily_nutrients WHERE user_id = ?", (uid,))
+            conn.execute("DELETE FROM daily_foods WHERE user_id = ?", (uid,))
+            conn.execute("DELETE FROM rollup_state WHERE user_id = ?", (uid,))
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    for uid in user_ids:
+        _sync_rollups(app, uid)
+
+    return user_ids
+
+
+def food_popularity(app) -> dict:
+    """
+    food_name -> number of logs across all users (from the rollups).
+    Used to rank autocomplete suggestions.
+    """
+    conn = _rollup_conn(app)
+    try:
+        rows = conn.execute("SELECT food_name, SUM(count) FROM daily_foods GROUP BY food_name").fetchall()
+    finally:
+        conn.close()
+    return {name: int(c or 0) for name, c in rows}
+
+
+def daily_nutrient_series(app, user_id: str, start: date, end: date):
+    """
+    Daily nutrient totals from the rollups for [start, end], one row per calendar day
+    (days without logs are 0, same as daily_average_over_period assumes).
+
+    Returns (days: list[date], totals: ndarray days x NUTRIENT_COLS, logged: bool ndarray).
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    _sync_rollups(app, user_id)
+
+    conn = _rollup_conn(app)
+    try:
+        rows = conn.execute(
+            f"""SELECT date, {", ".join(NUTRIENT_COLS)} FROM daily_nutrients
+                WHERE user_id = ? AND date >= ? AND date <= ? ORDER BY date""",
+            (user_id, start.isoformat(), end.isoformat()),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    n = max(0, (end - start).days + 1)
+    days = [start + timedelta(days=i) for i in range(n)]
+    totals = np.zeros((n, len(NUTRIENT_COLS)), dtype=np.float64)
+    logged = np.zeros(n, dtype=bool)
+    for d, *values in rows:
+        i = (date.fromisoformat(d) - start).days
+        totals[i] = values
+        logged[i] = True
+    return days, totals, logged
 
 
 def _period_range(period: str):
@@ -107,6 +485,9 @@ def get_summary(app, user_id: str, period: str = "weekly") -> dict:
     Build totals + daily averages for the given period (weekly/monthly),
     using food nutrient values from SL_Food_Nutrition_Master.csv.
 
+    Reads the precomputed daily rollups, so the cost is a sum over at most
+    30 rows regardless of how long the user's history is.
+
     Also returns:
     - top_foods (top 3 most frequently eaten)
     - food_frequency (full map)
@@ -123,112 +504,59 @@ def get_summary(app, user_id: str, period: str = "weekly") -> dict:
     # Always compute last-30-days coverage (useful for demos/panels)
     start_30, end_30 = _period_range("monthly")
 
-    path = _intake_path(app, user_id)
-    logs = []
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            logs = json.load(f) or []
+    # fold in anything appended since the last sync (e.g. freshly migrated logs)
+    _sync_rollups(app, user_id)
 
-    # Load food dataset for nutrient lookup
-    food_df, _, _ = get_datasets(app)
-
-    # Build fast lookup maps
-    by_id = {}
-    if food_df is not None and not food_df.empty and "food_id" in food_df.columns:
-        for _, r in food_df.iterrows():
-            by_id[str(r.get("food_id", "")).strip()] = r
-
-    by_name = {}
-    if food_df is not None and not food_df.empty and "food_name" in food_df.columns:
-        by_name = {str(r.get("food_name", "")).strip(): r for _, r in food_df.iterrows()}
-
-    nutrient_cols = [
-        "energy_kcal",
-        "protein_g",
-        "fat_g",
-        "carbohydrate_g",
-        "fiber_g",
-        "sugar_g",
-        "calcium_mg",
-        "iron_mg",
-        "zinc_mg",
-        "magnesium_mg",
-        "potassium_mg",
-        "sodium_mg",
-        "vitamin_c_mg",
-        "vitamin_a_ug",
-        "vitamin_d_ug",
-        "vitamin_b12_ug",
-        "folate_ug",
-    ]
-
-    totals = {k: 0.0 for k in nutrient_cols}
-    days_logged = set()
+    totals = {k: 0.0 for k in NUTRIENT_COLS}
+    days_logged = 0
     used_logs = 0
 
     # Coverage for last 30 days
-    days_logged_last30 = set()
+    days_logged_last30 = 0
     used_logs_last30 = 0
 
-    # food frequency tracking
     food_frequency = {}
     food_servings = {}
 
-    for log in logs:
-        date_str = log.get("date")
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except Exception:
-            continue
-
-        if start_30 <= d <= end_30:
-            days_logged_last30.add(d.isoformat())
-            used_logs_last30 += 1
-
-        if d < start or d > end:
+    conn = _rollup_conn(app)
+    try:
+        rows = conn.execute(
+            f"""SELECT date, logs, {", ".join(NUTRIENT_COLS)} FROM daily_nutrients
+                WHERE user_id = ? AND date >= ? AND date <= ?""",
+            (user_id, min(start, start_30).isoformat(), end.isoformat()),
+        ).fetchall()
+
+        foods = conn.execute(
+            """SELECT food_name, SUM(count), SUM(servings) FROM daily_foods
+               WHERE user_id = ? AND date >= ? AND date <= ?
+               GROUP BY food_name ORDER BY MIN(first_seen)""",
+            (user_id, start.isoformat(), end.isoformat()),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for d, logs, *values in rows:
+        if start_30.isoformat() <= d <= end_30.isoformat():
+            days_logged_last30 += 1
+            used_logs_last30 += logs
+
+        if d < start.isoformat():
             continue
 
-        days_logged.add(d.isoformat())
-        used_logs += 1
-
-        fid = str(log.get("food_id") or "").strip()
-        fname = str(log.get("food_name") or "").strip()
-        qty = float(log.get("quantity") or 1.0)
-
-        row = None
-        if fid and fid in by_id:
-            row = by_id[fid]
-        elif fname and fname in by_name:
-            row = by_name[fname]
-
-        resolved_name = None
-        if row is not None:
-            try:
-                resolved_name = str(row.get("food_name", "")).strip() or None
-            except Exception:
-                resolved_name = None
-
-        final_name = resolved_name or fname or fid or "Unknown"
-
-        food_frequency[final_name] = food_frequency.get(final_name, 0) + 1
-        food_servings[final_name] = round(food_servings.get(final_name, 0.0) + qty, 4)
+        days_logged += 1
+        used_logs += logs
+        for k, v in zip(NUTRIENT_COLS, values):
+            totals[k] += v
 
-        if row is None:
-            continue
-
-        for k in nutrient_cols:
-            if k not in row or str(row[k]) == "nan":
-                continue
-            try:
-                totals[k] += float(row[k]) * qty
-            except Exception:
-                pass
+    for name, count, servings in foods:
+        food_frequency[name] = int(count)
+        food_servings[name] = round(float(servings), 4)
 
     period_days = 7 if period == "weekly" else 30
-    days_logged_count = max(1, len(days_logged))
+    days_logged_count = max(1, days_logged)
 
-    daily_average_logged_days = {k: round(totals[k] / days_logged_count, 6) for k in nutrient_cols}
-    daily_average_over_period = {k: round(totals[k] / period_days, 6) for k in nutrient_cols}
+    daily_average_logged_days = {k: round(totals[k] / days_logged_count, 6) for k in NUTRIENT_COLS}
+    daily_average_over_period = {k: round(totals[k] / period_days, 6) for k in NUTRIENT_COLS}
 
     top_foods = sorted(food_frequency.items(), key=lambda x: x[1], reverse=True)[:3]
     top_foods = [{"food_name": k, "count": v, "servings": food_servings.get(k, 0)} for k, v in top_foods]
@@ -238,10 +566,10 @@ def get_summary(app, user_id: str, period: str = "weekly") -> dict:
         "period": period,
         "date_start": start.isoformat(),
         "date_end": end.isoformat(),
-        "days_logged": len(days_logged),
+        "days_logged": days_logged,
         "logs_used": used_logs,
         "period_days": period_days,
-        "days_logged_last30": len(days_logged_last30),
+        "days_logged_last30": days_logged_last30,
         "logs_used_last30": used_logs_last30,
         "totals": {k: round(v, 6) for k, v in totals.items()},
         "daily_average_logged_days": daily_average_logged_days,
@@ -1,22 +1,26 @@
 import os
 import joblib
+import numpy as np
 import pandas as pd
 
+from NutritionGuidance.services.dataset_loader import get_requirement_index
+
 # ------------------------------------------------------------
 # Paths
 # ------------------------------------------------------------
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))          # NutritionGuidance/
-BACKEND_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))                       # backend/
-DATA_DIR = os.path.join(BACKEND_DIR, "data")
-
-REQ_PATH = os.path.join(DATA_DIR, "SL_Nutrient_Requirements_By_Age.csv")
-COND_PATH = os.path.join(DATA_DIR, "Health_Condition_Nutrient_Adjustments.csv")
 
 MODEL_PATH = os.path.join(BASE_DIR, "ml", "deficiency_risk_model.pkl")
 
 _model = None
-_req_df = None
-_cond_table = None
+
+# model feature name -> requirement / intake key
+REQ_KEYS = {
+    "energy": "energy_kcal",
+    "protein": "protein_g",
+    "calcium": "calcium_mg",
+    "iron": "iron_mg",
+}
 
 
 # ------------------------------------------------------------
@@ -29,132 +33,10 @@ def _load_model():
     return _model
 
 
-def _load_requirements():
-    """
-    Loads requirement table with age_min/age_max and 4 key nutrients.
-    """
-    global _req_df
-    if _req_df is not None:
-        return _req_df
-
-    df = pd.read_csv(REQ_PATH)
-
-    required_cols = {"age_min", "age_max", "energy_kcal", "protein_g", "calcium_mg", "iron_mg"}
-    missing = [c for c in required_cols if c not in df.columns]
-    if missing:
-        raise ValueError(f"Requirements CSV missing columns: {missing}. Found: {list(df.columns)}")
-
-    df = df[list(required_cols)].copy()
-    for c in ["age_min", "age_max", "energy_kcal", "protein_g", "calcium_mg", "iron_mg"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna()
-    df = df[df["age_max"] >= df["age_min"]]
-
-    _req_df = df
-    return _req_df
-
-
-def _load_condition_table():
-    """
-    Optional: builds nutrient multipliers by condition if the file has usable columns.
-    If not usable/missing -> returns None and we run baseline.
-    Supports either:
-      - *_mult columns, or
-      - *_pct columns (percent increase/decrease)
-    """
-    global _cond_table
-    if _cond_table is not None:
-        return _cond_table
-
-    if not os.path.exists(COND_PATH):
-        _cond_table = None
-        return _cond_table
-
-    df = pd.read_csv(COND_PATH)
-
-    # Find a condition/name column
-    cond_col = None
-    for c in ["condition", "health_condition", "name"]:
-        if c in df.columns:
-            cond_col = c
-            break
-    if cond_col is None:
-        _cond_table = None
-        return _cond_table
-
-    def col(*names):
-        for n in names:
-            if n in df.columns:
-                return n
-        return None
-
-    m_energy = col("energy_mult", "kcal_mult", "calories_mult")
-    m_protein = col("protein_mult")
-    m_calcium = col("calcium_mult")
-    m_iron = col("iron_mult")
-
-    p_energy = col("energy_pct", "kcal_pct", "calories_pct")
-    p_protein = col("protein_pct")
-    p_calcium = col("calcium_pct")
-    p_iron = col("iron_pct")
-
-    table = {}
-    for _, r in df.iterrows():
-        name = str(r[cond_col]).strip().lower()
-        if not name:
-            continue
-
-        e = pr = ca = ir = 1.0
-
-        # multipliers
-        if any([m_energy, m_protein, m_calcium, m_iron]):
-            if m_energy and pd.notna(r[m_energy]): e = float(r[m_energy])
-            if m_protein and pd.notna(r[m_protein]): pr = float(r[m_protein])
-            if m_calcium and pd.notna(r[m_calcium]): ca = float(r[m_calcium])
-            if m_iron and pd.notna(r[m_iron]): ir = float(r[m_iron])
-            table[name] = {"energy": e, "protein": pr, "calcium": ca, "iron": ir}
-            continue
-
-        # percents
-        if any([p_energy, p_protein, p_calcium, p_iron]):
-            if p_energy and pd.notna(r[p_energy]): e = 1.0 + float(r[p_energy]) / 100.0
-            if p_protein and pd.notna(r[p_protein]): pr = 1.0 + float(r[p_protein]) / 100.0
-            if p_calcium and pd.notna(r[p_calcium]): ca = 1.0 + float(r[p_calcium]) / 100.0
-            if p_iron and pd.notna(r[p_iron]): ir = 1.0 + float(r[p_iron]) / 100.0
-            table[name] = {"energy": e, "protein": pr, "calcium": ca, "iron": ir}
-            continue
-
-    _cond_table = table if table else None
-    return _cond_table
-
-
-# ------------------------------------------------------------
-# Requirement lookup
-# ------------------------------------------------------------
-def _requirements_for_age(age: int):
-    """
-    Returns requirement dict for the given age by selecting matching age_min/age_max row.
-    """
-    df = _load_requirements()
-    match = df[(df["age_min"] <= age) & (age <= df["age_max"])]
-
-    if match.empty:
-        # fallback: nearest by age_min
-        match = df.iloc[[int((df["age_min"] - age).abs().idxmin())]]
-
-    row = match.iloc[0]
-    return {
-        "energy": float(row["energy_kcal"]),
-        "protein": float(row["protein_g"]),
-        "calcium": float(row["calcium_mg"]),
-        "iron": float(row["iron_mg"]),
-    }
-
-
 # ------------------------------------------------------------
 # Public API
 # ------------------------------------------------------------
-def predict_risk(age, avg, condition=None):
+def predict_risk(age, avg, condition=None, app=None, group=None):
     """
     Predict deficiency risk using ML model.
 
@@ -167,57 +49,66 @@ def predict_risk(age, avg, condition=None):
         (works with your daily_average_over_period output)
     condition : str | None
         optional health condition name, used only if condition adjustments exist
+    app : Flask app | None
+        used to locate the shared datasets (defaults to backend/data/)
+    group : str | None
+        requirement group (male/female/pregnant/...), defaults to male
 
     Returns
     -------
     str: "LOW" | "MEDIUM" | "HIGH"
     """
+    return predict_risk_batch([age], [avg], [condition], app=app, groups=[group])[0]
+
+
+def predict_risk_batch(ages, avgs, conditions=None, app=None, groups=None):
+    """
+    Same as predict_risk for many users in one model call.
+
+    ages / avgs / conditions / groups are parallel sequences
+    (conditions and groups may be None -> no condition / male).
+
+    Returns
+    -------
+    list[str], one label per user, in input order
+    """
+    n = len(ages)
+    if len(avgs) != n:
+        raise ValueError("ages and avgs must have the same length")
+    conditions = list(conditions) if conditions is not None else [None] * n
+    groups = list(groups) if groups is not None else [None] * n
+    if len(conditions) != n or len(groups) != n:
+        raise ValueError("conditions and groups must have the same length as ages")
+    if n == 0:
+        return []
+
     model = _load_model()
+    index = get_requirement_index(app)
+
+    age_arr = np.empty(n, dtype=np.int64)
+    totals = np.zeros((n, len(REQ_KEYS)), dtype=np.float64)
+    req = np.zeros((n, len(REQ_KEYS)), dtype=np.float64)
+    has_condition = np.zeros(n, dtype=np.int64)
+
+    for i in range(n):
+        age = int(ages[i]) if ages[i] is not None else 30
+        avg = avgs[i] or {}
+        condition = conditions[i]
+
+        age_arr[i] = age
+        totals[i] = [float(avg.get(col, 0) or 0) for col in REQ_KEYS.values()]
+
+        # requirements for the age band, adjusted by the condition (same rules as the reports)
+        has_condition[i] = 1 if condition and index.engine.has_condition(condition) else 0
+        adjusted, _ = index.resolve(age, groups[i], [condition] if has_condition[i] else [])
+        req[i] = [float(adjusted.get(col, 0) or 0) for col in REQ_KEYS.values()]
+
+    ratios = totals / np.maximum(req, 1e-6)
+
+    columns = {"age": age_arr, "has_condition": has_condition}
+    for j, (k, col) in enumerate(REQ_KEYS.items()):
+        columns[f"total_{col}"] = totals[:, j]
+        columns[f"ratio_{k}"] = ratios[:, j]
 
-    age = int(age) if age is not None else 30
-    avg = avg or {}
-
-    total_energy = float(avg.get("energy_kcal", 0) or 0)
-    total_protein = float(avg.get("protein_g", 0) or 0)
-    total_calcium = float(avg.get("calcium_mg", 0) or 0)
-    total_iron = float(avg.get("iron_mg", 0) or 0)
-
-    req = _requirements_for_age(age)
-
-    # apply condition multiplier if available
-    has_condition = 0
-    cond_table = _load_condition_table()
-    if condition and cond_table:
-        key = str(condition).strip().lower()
-        if key in cond_table:
-            has_condition = 1
-            mult = cond_table[key]
-            req["energy"] *= mult["energy"]
-            req["protein"] *= mult["protein"]
-            req["calcium"] *= mult["calcium"]
-            req["iron"] *= mult["iron"]
-
-    ratio_energy = total_energy / max(req["energy"], 1e-6)
-    ratio_protein = total_protein / max(req["protein"], 1e-6)
-    ratio_calcium = total_calcium / max(req["calcium"], 1e-6)
-    ratio_iron = total_iron / max(req["iron"], 1e-6)
-
-    import pandas as pd  # ensure this is already imported at top
-
-    feature_names = list(model.feature_names_in_)
-
-    row = {
-        "age": age,
-        "total_energy_kcal": total_energy,
-        "total_protein_g": total_protein,
-        "total_calcium_mg": total_calcium,
-        "total_iron_mg": total_iron,
-        "ratio_energy": ratio_energy,
-        "ratio_protein": ratio_protein,
-        "ratio_calcium": ratio_calcium,
-        "ratio_iron": ratio_iron,
-        "has_condition": has_condition,
-    }
-
-    X_df = pd.DataFrame([row], columns=feature_names)
-    return model.predict(X_df)[0]
+    X_df = pd.DataFrame(columns)[list(model.feature_names_in_)]
+    return [str(label) for label in model.predict(X_df)]
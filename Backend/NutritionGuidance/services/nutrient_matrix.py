@@ -0,0 +1,105 @@
+# backend/NutritionGuidance/services/nutrient_matrix.py
+
+import numpy as np
+import pandas as pd
+
+# nutrients tracked in intake summaries (per serving, from SL_Food_Nutrition_Master.csv)
+NUTRIENT_COLS = [
+    "energy_kcal",
+    "protein_g",
+    "fat_g",
+    "carbohydrate_g",
+    "fiber_g",
+    "sugar_g",
+    "calcium_mg",
+    "iron_mg",
+    "zinc_mg",
+    "magnesium_mg",
+    "potassium_mg",
+    "sodium_mg",
+    "vitamin_c_mg",
+    "vitamin_a_ug",
+    "vitamin_d_ug",
+    "vitamin_b12_ug",
+    "folate_ug",
+]
+
+
+class NutrientMatrix:
+    """
+    Food table as a dense float64 matrix (foods x nutrients) plus
+    food_id / food_name -> row index maps.
+
+    Missing / non-numeric cells are stored as 0.0, which is what the
+    summaries did before when skipping "nan" values.
+    """
+
+    def __init__(self, food_df: pd.DataFrame, columns=None):
+        self.columns = list(columns or NUTRIENT_COLS)
+        self.col_index = {k: j for j, k in enumerate(self.columns)}
+
+        n = 0 if food_df is None else len(food_df)
+        self.matrix = np.zeros((n, len(self.columns)), dtype=np.float64)
+        self.names = []
+        self.id_index = {}
+        self.name_index = {}
+
+        if n == 0:
+            return
+
+        for j, k in enumerate(self.columns):
+            if k in food_df.columns:
+                col = pd.to_numeric(food_df[k], errors="coerce").to_numpy(dtype=np.float64)
+                self.matrix[:, j] = np.nan_to_num(col, nan=0.0, posinf=0.0, neginf=0.0)
+
+        if "food_name" in food_df.columns:
+            self.names = [str(x).strip() for x in food_df["food_name"].tolist()]
+        else:
+            self.names = [""] * n
+
+        # later rows win on duplicate keys (same as building a dict over iterrows)
+        if "food_id" in food_df.columns:
+            for i, fid in enumerate(food_df["food_id"].tolist()):
+                self.id_index[str(fid).strip()] = i
+        for i, name in enumerate(self.names):
+            self.name_index[name] = i
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def row_for(self, food_id: str = "", food_name: str = "") -> int:
+        """
+        Row index for a logged food (id first, then exact name), -1 if unknown.
+        """
+        if food_id and food_id in self.id_index:
+            return self.id_index[food_id]
+        if food_name and food_name in self.name_index:
+            return self.name_index[food_name]
+        return -1
+
+    def totals(self, rows, quantities) -> np.ndarray:
+        """
+        Nutrient totals for logged rows x servings (unknown rows = -1 are ignored).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        qty = np.asarray(quantities, dtype=np.float64)
+        known = rows >= 0
+        if not known.any():
+            return np.zeros(len(self.columns), dtype=np.float64)
+        return qty[known] @ self.matrix[rows[known]]
+
+    def grouped_totals(self, rows, quantities, group_starts) -> np.ndarray:
+        """
+        Nutrient totals per contiguous group of logs (e.g. per day).
+        group_starts = index of the first log of each group in `rows`.
+        Returns (n_groups x nutrients).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        qty = np.asarray(quantities, dtype=np.float64)
+        if len(rows) == 0:
+            return np.zeros((0, len(self.columns)), dtype=np.float64)
+
+        known = rows >= 0
+        weighted = np.zeros((len(rows), len(self.columns)), dtype=np.float64)
+        weighted[known] = self.matrix[rows[known]] * qty[known, None]
+        return np.add.reduceat(weighted, np.asarray(group_starts, dtype=np.int64), axis=0)
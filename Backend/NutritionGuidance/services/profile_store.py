@@ -1,7 +1,30 @@
 # backend/NutritionGuidance/services/profile_store.py
 
+"""
+User profiles behind get_profile / save_profile.
+
+Backends (app.config["PROFILE_BACKEND"] or the PROFILE_BACKEND env var):
+    json    (default) one store/profile_<user>.json per user
+    sqlite  one store/profiles.db table, for deployments with many users;
+            a user without a row is imported from their profile_<user>.json
+
+Parsed profiles are kept in a process-wide LRU keyed by the stored version
+((size, mtime_ns) of the file / the row's version counter), so a profile saved
+by another worker is picked up on the next read. Writes go through the lock,
+the JSON file is replaced atomically (temp file + rename) and the cache is
+updated with what was written.
+"""
+
+import copy
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from NutritionGuidance.services.file_lock import locked
 
 DEFAULT_PROFILE = {
     "user_id": "demo",
@@ -10,26 +33,43 @@ DEFAULT_PROFILE = {
     "conditions": []        # list of strings
 }
 
-def _profile_path(app, user_id: str) -> str:
+PROFILE_BACKENDS = ["json", "sqlite"]
+MAX_CACHED_PROFILES = 4096
+
+_PROFILE_FILE_RE = re.compile(r"^profile_(.+)\.json$")
+
+_CACHE = OrderedDict()   # (backend, store_dir, user_id) -> (version, profile)
+_CACHE_LOCK = threading.Lock()
+_SCHEMA_READY = set()
+
+def _store_dir(app) -> str:
     store_dir = app.config.get("STORE_DIR") or os.path.join(os.getcwd(), "store")
     os.makedirs(store_dir, exist_ok=True)
-    return os.path.join(store_dir, f"profile_{user_id}.json")
+    return store_dir
 
-def get_profile(app, user_id: str) -> dict:
-    user_id = (user_id or "demo").strip() or "demo"
-    path = _profile_path(app, user_id)
+def _profile_path(app, user_id: str) -> str:
+    return os.path.join(_store_dir(app), f"profile_{user_id}.json")
 
-    if not os.path.exists(path):
-        p = dict(DEFAULT_PROFILE)
-        p["user_id"] = user_id
-        return p
+def _backend(app) -> str:
+    backend = str(app.config.get("PROFILE_BACKEND") or os.getenv("PROFILE_BACKEND") or "json").strip().lower()
+    if backend not in PROFILE_BACKENDS:
+        raise ValueError(f"Unknown PROFILE_BACKEND {backend!r}. Allowed: {PROFILE_BACKENDS}")
+    return backend
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f) or {}
+def _clean_groups(profile: dict) -> None:
+    profile["group"] = str(profile.get("group") or "male").strip().lower()
+    if profile["group"] not in ["male", "female", "pregnant", "lactating"]:
+        profile["group"] = "male"
 
+    conds = profile.get("conditions")
+    if not isinstance(conds, list):
+        conds = []
+    profile["conditions"] = [str(c).strip().lower() for c in conds if str(c).strip()]
+
+def _from_stored(user_id: str, data: dict) -> dict:
     # Ensure required keys exist
     profile = dict(DEFAULT_PROFILE)
-    profile.update(data)
+    profile.update(data or {})
     profile["user_id"] = user_id
 
     # Clean types
@@ -38,15 +78,181 @@ def get_profile(app, user_id: str) -> dict:
     except Exception:
         profile["age"] = 0
 
-    profile["group"] = str(profile.get("group") or "male").strip().lower()
-    if profile["group"] not in ["male", "female", "pregnant", "lactating"]:
-        profile["group"] = "male"
+    _clean_groups(profile)
+    return profile
 
-    conds = profile.get("conditions")
-    if not isinstance(conds, list):
-        conds = []
-    profile["conditions"] = [str(c).strip().lower() for c in conds if str(c).strip()]
+def _default_profile(user_id: str) -> dict:
+    p = dict(DEFAULT_PROFILE)
+    p["conditions"] = []
+    p["user_id"] = user_id
+    return p
+
+# --------------------------------------------------
+# LRU of parsed profiles
+# --------------------------------------------------
+def _cache_get(key, version):
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is None or hit[0] != version:
+            return None
+        _CACHE.move_to_end(key)
+        return copy.deepcopy(hit[1])
+
+def _cache_put(key, version, profile: dict) -> None:
+    with _CACHE_LOCK:
+        _CACHE[key] = (version, copy.deepcopy(profile))
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_CACHED_PROFILES:
+            _CACHE.popitem(last=False)
+
+# --------------------------------------------------
+# json backend
+# --------------------------------------------------
+def _file_version(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # st_ino: an atomic replace within the same mtime tick still changes the inode
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
 
+def _read_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f) or {}
+
+def _write_file(path: str, data: dict) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# --------------------------------------------------
+# sqlite backend
+# --------------------------------------------------
+def _db_path(app) -> str:
+    return os.path.join(_store_dir(app), "profiles.db")
+
+def _conn(app) -> sqlite3.Connection:
+    path = _db_path(app)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+
+    if path not in _SCHEMA_READY:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS profiles (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL
+            )"""
+        )
+        _SCHEMA_READY.add(path)
+
+    return conn
+
+def _db_version(conn, user_id: str):
+    row = conn.execute("SELECT version FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else None
+
+def _db_write(conn, user_id: str, data: dict) -> int:
+    # strictly increasing even if two saves land in the same clock tick
+    conn.execute(
+        """INSERT INTO profiles (user_id, data, version) VALUES (?, ?, ?)
+           ON CONFLICT(user_id) DO UPDATE SET
+               data = excluded.data,
+               version = MAX(excluded.version, profiles.version + 1)""",
+        (user_id, json.dumps(data, ensure_ascii=False), time.time_ns()),
+    )
+    return _db_version(conn, user_id)
+
+def _db_get(app, user_id: str):
+    """
+    (version, stored dict) or (None, None); imports profile_<user>.json on first read.
+    """
+    conn = _conn(app)
+    try:
+        row = conn.execute("SELECT version, data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if row:
+            return row[0], json.loads(row[1]) or {}
+
+        legacy = _profile_path(app, user_id)
+        if not os.path.exists(legacy):
+            return None, None
+
+        data = _read_file(legacy)
+        conn.execute("INSERT OR IGNORE INTO profiles (user_id, data, version) VALUES (?, ?, ?)",
+                     (user_id, json.dumps(data, ensure_ascii=False), time.time_ns()))
+        row = conn.execute("SELECT version, data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0], json.loads(row[1]) or {}
+    finally:
+        conn.close()
+
+# --------------------------------------------------
+# public API
+# --------------------------------------------------
+def profile_version(app, user_id: str):
+    """
+    Opaque version of the saved profile, None if the user has no profile yet.
+    """
+    user_id = (user_id or "demo").strip() or "demo"
+    if _backend(app) == "json":
+        return _file_version(_profile_path(app, user_id))
+
+    conn = _conn(app)
+    try:
+        version = _db_version(conn, user_id)
+    finally:
+        conn.close()
+    if version is None:
+        return _file_version(_profile_path(app, user_id))
+    return ("db", version)
+
+def list_profile_user_ids(app) -> list:
+    """
+    user_ids of every saved profile, sorted.
+    """
+    store_dir = _store_dir(app)
+    out = {m.group(1) for m in map(_PROFILE_FILE_RE.match, os.listdir(store_dir)) if m}
+
+    if _backend(app) == "sqlite":
+        conn = _conn(app)
+        try:
+            out.update(r[0] for r in conn.execute("SELECT user_id FROM profiles"))
+        finally:
+            conn.close()
+
+    return sorted(out)
+
+def get_profile(app, user_id: str) -> dict:
+    user_id = (user_id or "demo").strip() or "demo"
+    backend = _backend(app)
+    key = (backend, _store_dir(app), user_id)
+
+    if backend == "json":
+        path = _profile_path(app, user_id)
+        version = _file_version(path)
+        if version is None:
+            return _default_profile(user_id)
+
+        cached = _cache_get(key, version)
+        if cached is not None:
+            return cached
+
+        profile = _from_stored(user_id, _read_file(path))
+        _cache_put(key, version, profile)
+        return profile
+
+    version, data = _db_get(app, user_id)
+    if version is None:
+        return _default_profile(user_id)
+
+    cached = _cache_get(key, version)
+    if cached is not None:
+        return cached
+
+    profile = _from_stored(user_id, data)
+    _cache_put(key, version, profile)
     return profile
 
 def save_profile(app, user_id: str, profile: dict) -> dict:
@@ -56,20 +262,25 @@ def save_profile(app, user_id: str, profile: dict) -> dict:
     clean = {
         "user_id": user_id,
         "age": int(profile.get("age") or 0),
-        "group": str(profile.get("group") or "male").strip().lower(),
+        "group": profile.get("group"),
         "conditions": profile.get("conditions") or []
     }
+    _clean_groups(clean)
 
-    if clean["group"] not in ["male", "female", "pregnant", "lactating"]:
-        clean["group"] = "male"
-
-    if not isinstance(clean["conditions"], list):
-        clean["conditions"] = []
-
-    clean["conditions"] = [str(c).strip().lower() for c in clean["conditions"] if str(c).strip()]
-
+    backend = _backend(app)
+    key = (backend, _store_dir(app), user_id)
     path = _profile_path(app, user_id)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(clean, f, ensure_ascii=False, indent=2)
 
+    if backend == "json":
+        with locked(path):
+            _write_file(path, clean)
+            version = _file_version(path)
+    else:
+        conn = _conn(app)
+        try:
+            version = _db_write(conn, user_id, clean)
+        finally:
+            conn.close()
+
+    _cache_put(key, version, _from_stored(user_id, clean))
     return clean
@@ -1,8 +1,13 @@
+from NutritionGuidance.services.food_recommender import FoodRecommender
 
-def recommend_foods_for_gaps(food_df, gaps: dict, top_k: int = 8):
+
+def recommend_foods_for_gaps(foods, gaps: dict, top_k: int = 8):
     """
     Recommend foods by top missing nutrients.
     We score foods by normalized values of the top 3 gaps.
+
+    foods: FoodRecommender (preferred, see dataset_loader.get_food_recommender)
+           or the raw food DataFrame.
     """
     if not gaps:
         return []
@@ -13,31 +18,24 @@ def recommend_foods_for_gaps(food_df, gaps: dict, top_k: int = 8):
     if not top_nutrients:
         return []
 
-    df = food_df.copy()
-
-    score = None
-    for n in top_nutrients:
-        if n not in df.columns:
-            continue
-        col = df[n].fillna(0).astype(float)
-        mx = float(col.max()) if len(col) else 0.0
-        if mx <= 0:
-            continue
-        s = col / mx
-        score = s if score is None else (score + s)
+    rec = foods if isinstance(foods, FoodRecommender) else FoodRecommender(foods)
 
-    if score is None:
+    # nutrients with no positive values cannot contribute to the normalized score
+    present = [n for n in rec.known(top_nutrients) if rec.normalized[:, rec.col_index[n]].any()]
+    if not present:
         return []
 
-    df["_score"] = score
-
-    cols = ["food_name"]
-    if "food_id" in df.columns:
-        cols = ["food_id"] + cols
-    for c in ["serving_basis", "serving_size_g"]:
-        if c in df.columns:
-            cols.append(c)
-    cols += [n for n in top_nutrients if n in df.columns]
-
-    out = df.sort_values("_score", ascending=False).head(top_k)[cols]
-    return out.to_dict(orient="records")
+    out = []
+    for i in rec.top_k(present, k=top_k, normalized=True):
+        item = {}
+        if rec.has_food_id:
+            item["food_id"] = rec.food_ids[i]
+        item["food_name"] = rec.food_names[i]
+        if rec.has_serving_basis:
+            item["serving_basis"] = rec.serving_basis[i]
+        if rec.has_serving_size:
+            item["serving_size_g"] = rec.serving_size_g[i]
+        for n in rec.known(top_nutrients):
+            item[n] = rec.value(i, n)
+        out.append(item)
+    return out
@@ -1,14 +1,9 @@
 import math
-from typing import Dict, List, Tuple
+from typing import Dict, List
 
-import pandas as pd
+from NutritionGuidance.services.dataset_loader import get_food_recommender, get_requirement_index
+from NutritionGuidance.services.compute_graph import profile_node, requirements_node, summary_node
 
-from NutritionGuidance.services.dataset_loader import get_datasets
-from NutritionGuidance.services.profile_store import get_profile
-from NutritionGuidance.services.intake_store import get_summary
-
-
-NUMERIC_SKIP = {"age_min", "age_max", "group"}
 
 # --------------------------------------------------------
 # De-duplicate micronutrient keys (mcg vs ug)
@@ -70,95 +65,6 @@ def _canonicalize_keys(d: Dict) -> Dict:
     return out
 
 
-def _clean_numeric_dict(row: Dict) -> Dict:
-    """
-    Convert row values to numeric where possible, skipping non-nutrient columns.
-    """
-    out = {}
-    for k, v in row.items():
-        if k in NUMERIC_SKIP:
-            continue
-        if v is None or (isinstance(v, float) and math.isnan(v)):
-            continue
-        if _is_number(v):
-            out[k] = float(v)
-    return out
-
-
-def _pick_requirement_row(req_df, age: int, group: str) -> Dict:
-    """
-    Find the best matching requirement row:
-    - group match (case-insensitive)
-    - age within [age_min, age_max]
-    Fallback: closest age band for that group.
-    """
-    group = (group or "").strip().lower()
-    if not group:
-        group = "male"
-
-    df = req_df.copy()
-    df["group"] = df["group"].astype(str).str.lower()
-
-    # perfect match: group + age band
-    band = df[(df["group"] == group) & (df["age_min"] <= age) & (df["age_max"] >= age)]
-    if not band.empty:
-        return band.iloc[0].to_dict()
-
-    # fallback: same group, nearest band
-    same_group = df[df["group"] == group]
-    if not same_group.empty:
-        same_group = same_group.copy()
-        same_group["dist"] = (same_group["age_min"] - age).abs()
-        return same_group.sort_values("dist").iloc[0].to_dict()
-
-    # final fallback: first row
-    return df.iloc[0].to_dict()
-
-
-def _apply_condition_rules(
-    base_req: Dict, cond_df: pd.DataFrame, conditions: List[str]
-) -> Tuple[Dict, List[Dict]]:
-    """
-    Applies condition rules to base requirements (if dataset exists).
-    Output:
-      - adjusted requirements
-      - condition_notes list
-    """
-    req = dict(base_req)
-    notes = []
-
-    if cond_df is None or cond_df.empty or not conditions:
-        return req, notes
-
-    cond_df = cond_df.copy()
-    cond_df["condition"] = cond_df["condition"].astype(str).str.strip().str.lower()
-
-    for c in conditions:
-        c_key = str(c).strip().lower()
-        rows = cond_df[cond_df["condition"] == c_key]
-        if rows.empty:
-            continue
-
-        for _, r in rows.iterrows():
-            nutrient = str(r.get("nutrient", "")).strip()
-            adj = r.get("adjustment", 0)
-            note = r.get("note", "")
-
-            if nutrient and nutrient in req and _is_number(req[nutrient]) and _is_number(adj):
-                req[nutrient] = float(req[nutrient]) + float(adj)
-
-            notes.append(
-                {
-                    "condition": c,
-                    "nutrient": nutrient,
-                    "adjustment": float(adj) if _is_number(adj) else adj,
-                    "note": note,
-                }
-            )
-
-    return req, notes
-
-
 def _severity_from_gap(gap: float, req_value: float) -> str:
     if gap <= 0:
         return "ok"
@@ -173,45 +79,38 @@ def _severity_from_gap(gap: float, req_value: float) -> str:
     return "low"
 
 
-def _pick_recommendations(food_df, gaps: Dict, requirements: Dict, limit: int = 8) -> List[Dict]:
+def _top_gap_keys(gaps: Dict, n: int = 6) -> List[str]:
+    """
+    Top lacking nutrients (largest positive gaps, excluding *_upper keys).
+    """
+    gap_items = [(k, v) for k, v in gaps.items() if _is_number(v) and float(v) > 0 and not str(k).endswith("_upper")]
+    gap_items.sort(key=lambda x: float(x[1]), reverse=True)
+    return [k for k, _ in gap_items[:n]]
+
+
+def _pick_recommendations(recommender, gaps: Dict, requirements: Dict, limit: int = 8) -> List[Dict]:
     """
     Simple recommendation logic:
     - find foods rich in nutrients with highest positive gaps
     - rank by multi-nutrient score
     """
-    if food_df is None or food_df.empty:
+    if recommender is None or len(recommender) == 0:
         return []
 
-    # choose top lacking nutrients (exclude *_upper keys)
-    gap_items = [(k, v) for k, v in gaps.items() if _is_number(v) and float(v) > 0 and not str(k).endswith("_upper")]
-    gap_items.sort(key=lambda x: float(x[1]), reverse=True)
-    top_keys = [k for k, _ in gap_items[:6]]
-
+    top_keys = _top_gap_keys(gaps)
     if not top_keys:
         return []
 
-    # score foods by how much they contribute to top gaps
-    df = food_df.copy()
-    df.columns = [str(c).strip() for c in df.columns]
-
-    score = []
-    for _, row in df.iterrows():
-        s = 0.0
-        for k in top_keys:
-            if k in row and _is_number(row[k]):
-                s += float(row[k])
-        score.append(s)
-
-    df["_score"] = score
-    df = df.sort_values("_score", ascending=False)
+    # score foods by how much they contribute to top gaps (raw per-serving amounts)
+    present = recommender.known(top_keys)
 
     recs = []
-    for _, row in df.head(limit).iterrows():
+    for i in recommender.top_k(top_keys, k=limit, normalized=False):
         recs.append(
             {
-                "food_id": row.get("food_id"),
-                "food_name": row.get("food_name") or row.get("name"),
-                **{k: row.get(k) for k in top_keys if k in row},
+                "food_id": recommender.food_ids[i],
+                "food_name": recommender.food_names[i],
+                **{k: recommender.value(i, k) for k in present},
             }
         )
     return recs
@@ -224,33 +123,23 @@ def build_report(app, user_id: str, period: str = "monthly") -> Dict:
     user_id = (user_id or "demo").strip() or "demo"
     period = (period or "monthly").strip().lower()
 
-    food_df, req_df, cond_df = get_datasets(app)
-    if req_df is None or req_df.empty:
+    req_index = get_requirement_index(app)
+    if len(req_index) == 0:
         raise RuntimeError("Requirements dataset is empty or not loaded.")
 
-    profile = get_profile(app, user_id) or {}
+    profile = profile_node(app, user_id) or {}
     age = profile.get("age", 22)
     group = profile.get("group", "male")
     conditions = profile.get("conditions", []) or []
 
-    base_row = _pick_requirement_row(req_df, int(age), str(group))
-
-    # canonicalize base requirements dict (prevents alias keys from surviving)
-    requirements_base = _canonicalize_keys(
-        {
-            "age_min": base_row.get("age_min"),
-            "age_max": base_row.get("age_max"),
-            "group": str(base_row.get("group", group)).lower(),
-            **_clean_numeric_dict(base_row),
-        }
-    )
-
-    requirements, condition_notes = _apply_condition_rules(requirements_base, cond_df, conditions)
+    # canonical *_ug keys, numeric values only (precomputed per age band)
+    requirements_base = req_index.base(int(age), str(group))
+    requirements, condition_notes = requirements_node(app, int(age), str(group), conditions)
 
     # Canonicalize requirements to avoid duplicates (mcg vs ug)
     requirements = _canonicalize_keys(requirements)
 
-    intake_summary = get_summary(app, user_id, period)
+    intake_summary = summary_node(app, user_id, period)
     intake_daily = intake_summary.get("daily_average_over_period") or intake_summary.get("daily_average") or {}
 
     # Canonicalize intake averages too (prevents duplicates from logs)
@@ -289,7 +178,11 @@ def build_report(app, user_id: str, period: str = "monthly") -> Dict:
     severity = _canonicalize_keys(severity)
 
     # recommendations: ratio-based + multi-nutrient scoring
-    recommendations = _pick_recommendations(food_df, gaps, requirements, limit=8)
+    recommender = get_food_recommender(app)
+    recommendations = _pick_recommendations(recommender, gaps, requirements, limit=8)
+
+    # greedy plan: few foods that together close most of the top gaps per serving
+    recommended_combination = recommender.greedy_combination(gaps, keys=_top_gap_keys(gaps), max_items=3)
 
     return {
         "period": period,
@@ -306,4 +199,5 @@ def build_report(app, user_id: str, period: str = "monthly") -> Dict:
         "gaps": gaps,
         "severity": severity,
         "recommendations": recommendations,
+        "recommended_combination": recommended_combination,
     }
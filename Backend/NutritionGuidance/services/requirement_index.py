@@ -0,0 +1,136 @@
+# backend/NutritionGuidance/services/requirement_index.py
+
+import math
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from NutritionGuidance.services.condition_rules import ConditionRuleEngine
+
+DEFAULT_GROUP = "male"
+
+
+def _to_int(x, default: int = 0) -> int:
+    try:
+        v = float(x)
+    except Exception:
+        return default
+    return int(v) if math.isfinite(v) else default
+
+
+class RequirementIndex:
+    """
+    SL_Nutrient_Requirements_By_Age.csv indexed once per loaded dataset.
+
+    - per group: age bands sorted by age_min, looked up with bisect
+    - each band keeps a preconverted requirement vector (rule engine nutrient order)
+    - resolve(age, group, conditions) results are kept in a small LRU
+
+    Lookup rules (shared by the report, trained report and ML risk):
+      - unknown / empty group -> "male"
+      - age inside a band      -> that band
+      - otherwise              -> nearest band by age_min
+    """
+
+    LRU_SIZE = 2048
+
+    def __init__(self, req_df, engine: ConditionRuleEngine):
+        self.engine = engine
+        self.nutrients = engine.nutrients
+        self._bands = {}   # group -> (age_mins, bands sorted by age_min)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        if req_df is None or req_df.empty:
+            return
+
+        acc = {}
+        for pos, row in enumerate(req_df.to_dict(orient="records")):
+            group = str(row.get("group", "")).strip().lower()
+            age_min = _to_int(row.get("age_min"))
+            age_max = _to_int(row.get("age_max"))
+            vector = engine.to_vector(row)
+            vector.setflags(write=False)
+            acc.setdefault(group, []).append((age_min, age_max, pos, group, vector))
+
+        for group, bands in acc.items():
+            bands.sort(key=lambda b: (b[0], b[2]))
+            self._bands[group] = ([b[0] for b in bands], bands)
+
+    def __len__(self):
+        return sum(len(b[1]) for b in self._bands.values())
+
+    def groups(self) -> List[str]:
+        return sorted(self._bands)
+
+    def _band(self, age: int, group: str):
+        group = (group or "").strip().lower()
+        if group not in self._bands:
+            group = DEFAULT_GROUP if DEFAULT_GROUP in self._bands else next(iter(self._bands), None)
+        if group is None:
+            return None
+
+        mins, bands = self._bands[group]
+
+        # last band starting at or before `age`
+        i = bisect_right(mins, age)
+        if i > 0 and bands[i - 1][1] >= age:
+            return bands[i - 1]
+
+        # nearest band by age_min (ties -> lower band)
+        near = [b for b in (bands[i - 1] if i > 0 else None, bands[i] if i < len(bands) else None) if b]
+        return min(near, key=lambda b: (abs(b[0] - age), b[0]))
+
+    def band_key(self, age, group) -> Tuple:
+        """
+        (age_min, age_max, group) of the band used for this profile.
+        """
+        b = self._band(_to_int(age), group)
+        return (b[0], b[1], b[3]) if b else (None, None, (group or DEFAULT_GROUP).strip().lower())
+
+    def vector(self, age, group) -> np.ndarray:
+        """
+        Base requirement vector (engine nutrient order, read-only).
+        """
+        b = self._band(_to_int(age), group)
+        return b[4] if b else np.full(len(self.nutrients), np.nan)
+
+    def _as_dict(self, key: Tuple, vec: np.ndarray) -> Dict:
+        out = {"age_min": key[0], "age_max": key[1], "group": key[2]}
+        for k, v in zip(self.nutrients, vec.tolist()):
+            if not math.isnan(v):
+                out[k] = v
+        return out
+
+    def base(self, age, group) -> Dict:
+        """
+        Base requirements for a profile: {age_min, age_max, group, <nutrient>: float}.
+        """
+        return self._as_dict(self.band_key(age, group), self.vector(age, group))
+
+    def resolve(self, age, group, conditions=None) -> Tuple[Dict, List[Dict]]:
+        """
+        Condition-adjusted requirements + condition notes for a profile.
+        Cached per (age, group, sorted conditions); callers get their own copies.
+        """
+        conds = self.engine.normalize_conditions(conditions)
+        key = (_to_int(age), (group or "").strip().lower(), conds)
+
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+
+        if hit is None:
+            band = self.band_key(age, group)
+            adjusted = self.engine.apply_vector(self.vector(age, group), conds, key=band)
+            hit = (self._as_dict(band, adjusted), self.engine.condition_notes(conds))
+            with self._lock:
+                self._lru[key] = hit
+                if len(self._lru) > self.LRU_SIZE:
+                    self._lru.popitem(last=False)
+
+        return dict(hit[0]), [dict(n) for n in hit[1]]
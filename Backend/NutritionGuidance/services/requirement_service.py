@@ -1,21 +1,17 @@
+from NutritionGuidance.services.condition_rules import ConditionRuleEngine, requirement_nutrients
+from NutritionGuidance.services.requirement_index import RequirementIndex
 
-def pick_requirements(req_df, age: int, group: str):
-    group = (group or "male").strip().lower()
-
-    df = req_df.copy()
-    df["group"] = df["group"].astype(str).str.strip().str.lower()
 
-    # fallback if group not found
-    gdf = df[df["group"] == group]
-    if gdf.empty:
-        gdf = df[df["group"] == "male"]
-
-    age = int(age or 0)
+def pick_requirements(req_df, age: int, group: str):
+    """
+    Base requirement row for (age, group).
 
-    band = gdf[(gdf["age_min"] <= age) & (gdf["age_max"] >= age)]
-    if not band.empty:
-        return band.iloc[0].to_dict()
+    `req_df` is a RequirementIndex (see dataset_loader.get_requirement_index)
+    or the raw requirements DataFrame (indexed on the fly).
+    Missing group falls back to male, ages outside every band to the nearest band.
+    """
+    index = req_df
+    if not isinstance(index, RequirementIndex):
+        index = RequirementIndex(req_df, ConditionRuleEngine(None, requirement_nutrients(req_df)))
 
-    # if no exact band, return closest last
-    gdf = gdf.sort_values("age_min")
-    return gdf.iloc[-1].to_dict()
+    return index.base(age, group)
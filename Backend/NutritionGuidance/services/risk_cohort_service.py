@@ -0,0 +1,78 @@
+# backend/NutritionGuidance/services/risk_cohort_service.py
+
+from datetime import datetime
+from typing import Dict, List
+
+from NutritionGuidance.services.compute_graph import profile_node, summary_node
+from NutritionGuidance.services.ml_risk_service import REQ_KEYS, predict_risk_batch
+
+RISK_LABELS = ["LOW", "MEDIUM", "HIGH"]
+
+
+def _risk_inputs(app, user_id: str, period: str) -> Dict:
+    """
+    Same inputs as GET /ml-risk: profile age, first condition, daily averages for the period.
+    """
+    profile = profile_node(app, user_id) or {}
+
+    try:
+        age = int(profile.get("age") or 22)
+    except Exception:
+        age = 22
+
+    summary = summary_node(app, user_id, period) or {}
+    avg = summary.get("daily_average_over_period") or summary.get("daily_average") or summary.get("daily_average_logged_days") or {}
+
+    conditions = profile.get("conditions") or []
+    condition = conditions[0] if isinstance(conditions, list) and len(conditions) > 0 else None
+
+    return {"user_id": user_id, "age": age, "condition": condition, "avg": avg}
+
+
+def score_users(app, user_ids: List[str], period: str = "monthly") -> List[Dict]:
+    """
+    Deficiency risk for many users with a single model call.
+    Items have the same fields as GET /ml-risk (without "period").
+    """
+    inputs = [_risk_inputs(app, u, period) for u in user_ids]
+    labels = predict_risk_batch(
+        [x["age"] for x in inputs],
+        [x["avg"] for x in inputs],
+        [x["condition"] for x in inputs],
+        app=app,
+    )
+
+    items = []
+    for x, risk in zip(inputs, labels):
+        avg = x["avg"]
+        items.append(
+            {
+                "user_id": x["user_id"],
+                "ml_deficiency_risk": risk,
+                "age": x["age"],
+                "condition": x["condition"],
+                "inputs_used": {col: float(avg.get(col, 0) or 0) for col in REQ_KEYS.values()},
+            }
+        )
+    return items
+
+
+def cohort_summary(items: List[Dict], period: str) -> Dict:
+    """
+    Cohort view: users per risk level + the scored items (HIGH first).
+    """
+    counts = {label: 0 for label in RISK_LABELS}
+    for it in items:
+        label = str(it.get("ml_deficiency_risk"))
+        counts[label] = counts.get(label, 0) + 1
+
+    rank = {label: i for i, label in enumerate(reversed(RISK_LABELS))}
+    ordered = sorted(items, key=lambda it: (rank.get(str(it.get("ml_deficiency_risk")), len(rank)), it["user_id"]))
+
+    return {
+        "period": period,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "users": len(items),
+        "by_risk": counts,
+        "items": ordered,
+    }
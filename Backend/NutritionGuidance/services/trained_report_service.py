@@ -1,12 +1,6 @@
 
-from datetime import date, timedelta
 
-from NutritionGuidance.services.dataset_loader import get_datasets
-from NutritionGuidance.services.profile_store import get_profile
-from NutritionGuidance.services.intake_store import get_summary
-from NutritionGuidance.services.requirement_service import pick_requirements
-from NutritionGuidance.services.condition_rules import apply_condition_rules
-from NutritionGuidance.services.ml_risk_service import predict_risk
+from NutritionGuidance.services.compute_graph import forecast_node, profile_node, requirements_node, risk_node
 
 TRAINED_KEYS = ["energy_kcal", "protein_g", "calcium_mg", "iron_mg"]
 
@@ -45,18 +39,16 @@ def build_trained_two_week_report(app, user_id: str, period: str = "monthly", da
     """
     Clean 2-week report for ONLY the 4 trained nutrients.
     - user profile
-    - daily intake avg (from selected period)
+    - expected intake from the per-nutrient forecast (trend + weekday pattern
+      over the daily rollups), with confidence intervals
     - 14-day forecast deficit + level
-    - ML overall risk label
+    - ML overall risk label (from the selected period)
     """
     user_id = (user_id or "demo").strip() or "demo"
     period = (period or "monthly").strip().lower()
 
-    # datasets
-    _, req_df, cond_df = get_datasets(app)
-
     # profile
-    profile = get_profile(app, user_id) or {}
+    profile = profile_node(app, user_id) or {}
     try:
         age = int(profile.get("age") or 22)
     except Exception:
@@ -67,52 +59,53 @@ def build_trained_two_week_report(app, user_id: str, period: str = "monthly", da
     if not isinstance(conditions, list):
         conditions = []
 
-    # intake summary for selected period
-    summary = get_summary(app, user_id, period) or {}
-    avg = summary.get("daily_average_over_period") or summary.get("daily_average") or {}
-
-    # requirements row (full row), then keep only trained keys
-    base_req_row = pick_requirements(req_df, age=age, group=group) or {}
-    base_req = {k: _safe_float(base_req_row.get(k, 0)) for k in TRAINED_KEYS}
-
-    # apply condition rules (if any)
-    adj_req, cond_notes = apply_condition_rules(base_req, cond_df, conditions)
+    # forecast of the next `days` days (cached until the next intake write)
+    forecast = forecast_node(app, user_id, days)
 
-    # forecast window (date info only, not statistics)
-    start = date.today()
-    end = start + timedelta(days=days - 1)
+    # requirements (age band + condition rules), then keep only trained keys
+    adj_row, cond_notes = requirements_node(app, age, group, conditions)
+    adj_req = {k: _safe_float(adj_row.get(k, 0)) for k in TRAINED_KEYS}
 
     nutrients = []
     for k in TRAINED_KEYS:
+        fc = forecast["nutrients"].get(k) or {}
+        total_ci = fc.get("total_ci") or [0.0, 0.0]
+
         required_day = _safe_float(adj_req.get(k, 0))
-        intake_day = _safe_float(avg.get(k, 0))
+        intake_day = _safe_float(fc.get("per_day", 0))
 
         required_total = required_day * float(days)
-        intake_total = intake_day * float(days)
+        intake_total = _safe_float(fc.get("total", 0))
 
         deficit = max(0.0, required_total - intake_total)
         ratio = (deficit / required_total) if required_total > 0 else (1.0 if deficit > 0 else 0.0)
 
+        # deficit range: high intake end -> smallest deficit
+        deficit_low = max(0.0, required_total - _safe_float(total_ci[1]))
+        deficit_high = max(0.0, required_total - _safe_float(total_ci[0]))
+
         nutrients.append(
             {
                 "key": k,
                 "label": LABELS.get(k, k),
                 "required_per_day": round(required_day, 2),
                 "expected_intake_per_day": round(intake_day, 2),
+                "expected_intake_per_day_ci": [round(_safe_float(v), 2) for v in fc.get("per_day_ci") or [0.0, 0.0]],
                 "required_total_14d": round(required_total, 2),
                 "expected_total_14d": round(intake_total, 2),
+                "expected_total_14d_ci": [round(_safe_float(v), 2) for v in total_ci],
                 "deficit_total_14d": round(deficit, 2),
+                "deficit_total_14d_ci": [round(deficit_low, 2), round(deficit_high, 2)],
                 "deficiency_level_next_14d": _level_from_ratio(ratio),
             }
         )
 
-    # ML overall deficiency risk (uses first condition if exists)
-    condition_for_ml = conditions[0] if len(conditions) > 0 else None
-    ml_risk = predict_risk(age, avg, condition=condition_for_ml)
+    # ML overall deficiency risk (uses first condition if exists, shared with /ml-risk)
+    ml_risk = risk_node(app, user_id, period)["ml_deficiency_risk"]
 
     # build clean narrative lines for UI
     lines = []
-    lines.append(f"This report forecasts your next {days} days based on your recent intake pattern ({period}).")
+    lines.append(f"This report forecasts your next {days} days from your daily intake trend and weekday pattern.")
     lines.append("If you continue the same eating pattern, these are the expected nutrient gaps and deficiency levels.")
 
     return {
@@ -120,8 +113,10 @@ def build_trained_two_week_report(app, user_id: str, period: str = "monthly", da
         "user_id": user_id,
         "period_used": period,
         "forecast_days": int(days),
-        "forecast_start": start.isoformat(),
-        "forecast_end": end.isoformat(),
+        "forecast_start": forecast["forecast_start"],
+        "forecast_end": forecast["forecast_end"],
+        "forecast_method": forecast["method"],
+        "confidence": forecast["confidence"],
         "profile": {
             "user_id": user_id,
             "age": age,
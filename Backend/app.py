@@ -25,6 +25,7 @@ app.config["UPLOAD_FOLDER"] = os.path.join(app.config["BASE_DIR"], "uploads")
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024
 app.config["PROPAGATE_EXCEPTIONS"] = True
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "dev-secret")
+app.config["PROFILE_BACKEND"] = os.getenv("PROFILE_BACKEND", "json")  # json / sqlite (NutritionGuidance profiles)
 
 # Ensure required folders exist
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
@@ -120,7 +121,12 @@ except Exception as e:
 # --------------------------------------------------------
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy", "message": "Smart Kitchen Backend is running!"}), 200
+    from integrations import integration_stats
+    return jsonify({
+        "status": "healthy",
+        "message": "Smart Kitchen Backend is running!",
+        "integrations": integration_stats(),  # breaker state + latency per outbound service
+    }), 200
 
 # --------------------------------------------------------
 # Root route (overview)
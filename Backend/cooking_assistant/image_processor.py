@@ -2,6 +2,8 @@ import os
 import io
 from google.cloud import vision
 
+from integrations import guarded_call, vision_client
+
 def detect_ingredients(image_path):
     """
     Detect ingredients from image using Google Cloud Vision API
@@ -19,10 +21,8 @@ def detect_ingredients(image_path):
         
         print(f"✅ API key found! Analyzing image: {image_path}")
         
-        # Initialize Vision API client
-        client = vision.ImageAnnotatorClient(
-            client_options={"api_key": api_key}
-        )
+        # Shared Vision API client (created once per process)
+        client = vision_client(api_key)
         
         # Read the image file
         with io.open(image_path, 'rb') as image_file:
@@ -31,15 +31,15 @@ def detect_ingredients(image_path):
         image = vision.Image(content=content)
         
         # 1. Label Detection (general objects)
-        label_response = client.label_detection(image=image)
+        label_response = guarded_call('vision', client.label_detection, image=image)
         labels = label_response.label_annotations
         
         # 2. Object Localization (specific objects)
-        object_response = client.object_localization(image=image)
+        object_response = guarded_call('vision', client.object_localization, image=image)
         objects = object_response.localized_object_annotations
         
         # 3. Text Detection (for packaged foods)
-        text_response = client.text_detection(image=image)
+        text_response = guarded_call('vision', client.text_detection, image=image)
         texts = text_response.text_annotations
         
         # Check for errors
@@ -267,9 +267,7 @@ def test_api_connection():
         if not api_key:
             return False, "No API key found in .env file"
         
-        client = vision.ImageAnnotatorClient(
-            client_options={"api_key": api_key}
-        )
+        vision_client(api_key)
         
         return True, "API connection successful!"
         
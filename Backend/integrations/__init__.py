@@ -0,0 +1,26 @@
+"""
+Outbound integration layer: one pooled HTTP client and per-process SDK
+clients, with circuit breakers, concurrency limits, retries and latency
+histograms per service
+"""
+from .clients import gemini_model, openai_client, vision_client
+from .http import HttpClient, http_client
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyHistogram
+from .services import ConcurrencyLimitError, configure_service, guarded_call, integration_stats
+from .stub_llm import llm_stub_enabled
+
+__all__ = [
+    'HttpClient',
+    'http_client',
+    'gemini_model',
+    'openai_client',
+    'vision_client',
+    'llm_stub_enabled',
+    'guarded_call',
+    'configure_service',
+    'integration_stats',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'ConcurrencyLimitError',
+    'LatencyHistogram',
+]
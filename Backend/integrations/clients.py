@@ -0,0 +1,73 @@
+"""
+SDK clients built once per process (Gemini, OpenAI, Google Cloud Vision)
+
+The SDKs keep their own connection pools, so constructing them per request
+throws those away; these accessors configure / construct each client on
+first use and hand out the same instance afterwards. Calls made with them
+should go through services.guarded_call for breaker, limits and latency.
+SDK imports and API key lookups are lazy (keys may come from a .env loaded
+after import), so a missing optional SDK only affects its callers.
+"""
+import os
+import threading
+from typing import Optional
+
+from .stub_llm import StubGenerativeModel, llm_stub_enabled
+
+# OpenAI SDK request timeout / retries (it retries connection errors, 429 and 5xx itself)
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+
+_lock = threading.Lock()
+_gemini_configured = False
+_gemini_models = {}
+_openai_client = None
+_vision_clients = {}
+
+
+def gemini_model(model_name: str = 'models/gemini-flash-latest', system_instruction: Optional[str] = None):
+    """
+    Gemini GenerativeModel. genai is configured once; models without a system
+    instruction are cached per name. Models with one (it differs per user) are
+    cheap wrappers created per call over the same configured client.
+    With LLM_STUB=1 a local stub model is returned instead.
+    """
+    global _gemini_configured
+    if llm_stub_enabled():
+        return StubGenerativeModel(model_name, system_instruction)
+    import google.generativeai as genai
+
+    with _lock:
+        if not _gemini_configured:
+            genai.configure(api_key=os.getenv('GEMINI_API_KEY', ''))
+            _gemini_configured = True
+        if system_instruction:
+            return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        model = _gemini_models.get(model_name)
+        if model is None:
+            model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+def openai_client():
+    """Shared OpenAI client, or None without OPENAI_API_KEY"""
+    global _openai_client
+    api_key = os.getenv('OPENAI_API_KEY', '')
+    if not api_key:
+        return None
+    with _lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+        return _openai_client
+
+
+def vision_client(api_key: Optional[str] = None):
+    """Shared Cloud Vision ImageAnnotatorClient per API key"""
+    api_key = api_key or os.getenv('GOOGLE_CLOUD_API_KEY', '')
+    with _lock:
+        client = _vision_clients.get(api_key)
+        if client is None:
+            from google.cloud import vision
+            client = _vision_clients[api_key] = vision.ImageAnnotatorClient(client_options={'api_key': api_key})
+        return client
@@ -0,0 +1,154 @@
+"""
+Shared HTTP client for outbound integrations
+
+One requests.Session per process with pooled keep-alive connections. Every
+request goes through its service's circuit breaker and latency histogram
+(services.py), is limited to MAX_CONCURRENCY concurrent requests per host,
+and connection errors, timeouts and retryable statuses (429 / 5xx) are
+retried with jittered exponential backoff (idempotent methods only, unless
+the caller passes retries=).
+
+When retries are exhausted on a retryable status, the last response is
+returned as is, so callers keep their own status handling.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .resilience import CircuitOpenError, backoff_delay
+from .services import MAX_CONCURRENCY, ConcurrencyLimitError, acquire_slot, get_service
+
+DEFAULT_TIMEOUT = float(os.getenv('INTEGRATION_TIMEOUT', '10'))
+CONNECT_TIMEOUT = float(os.getenv('INTEGRATION_CONNECT_TIMEOUT', '3.05'))
+DEFAULT_RETRIES = int(os.getenv('INTEGRATION_MAX_RETRIES', '2'))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Longest Retry-After we are willing to sleep for inside a request
+MAX_RETRY_AFTER = 5.0
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return min(float(response.headers.get('Retry-After', '')), MAX_RETRY_AFTER)
+    except ValueError:
+        return None
+
+
+class HttpClient:
+    def __init__(self, max_per_host: int = MAX_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT, pool_hosts: int = 32):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        # urllib3 retries are off: retrying is done here, where the breaker can see every attempt
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=max_per_host, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def request(self, method: str, url: str, service: Optional[str] = None, timeout=None,
+                retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        session.request with pooling, limits, breaker and retries.
+        service names the breaker / stats entry (default: the URL's host).
+        Raises CircuitOpenError, ConcurrencyLimitError or the last
+        requests exception when every attempt failed.
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc
+        state = get_service(service or host)
+        slots = self._slots(host)
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        timeout = timeout if timeout is not None else self.timeout
+        if not isinstance(timeout, tuple):
+            timeout = (min(CONNECT_TIMEOUT, timeout), timeout)
+
+        for attempt in range(retries + 1):
+            # slot first: a refused slot must not consume the half-open trial
+            try:
+                acquire_slot(slots, host, timeout[1])
+            except ConcurrencyLimitError:
+                state.latency.count('rejected')
+                raise
+
+            response, retry = None, False
+            try:
+                try:
+                    state.breaker.before_call()
+                except CircuitOpenError:
+                    state.latency.count('rejected')
+                    raise
+
+                start = time.perf_counter()
+                verdict = False
+                try:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+                except requests.RequestException as e:
+                    verdict = True
+                    state.latency.observe((time.perf_counter() - start) * 1000, 'error')
+                    state.breaker.record_failure()
+                    # only transport failures are retried (not InvalidURL, TooManyRedirects, ...)
+                    if attempt < retries and isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                        state.latency.count('retried')
+                        retry = True
+                    else:
+                        raise
+                else:
+                    verdict = True
+                    latency_ms = (time.perf_counter() - start) * 1000
+                    if response.status_code in RETRY_STATUSES:
+                        state.latency.observe(latency_ms, 'error')
+                        state.breaker.record_failure()
+                        if attempt < retries:
+                            state.latency.count('retried')
+                            retry = True
+                    else:
+                        state.latency.observe(latency_ms, 'ok')
+                        state.breaker.record_success()
+                finally:
+                    if not verdict:
+                        state.breaker.abandon_trial()
+            finally:
+                slots.release()
+
+            if not retry:
+                return response
+
+            # back off without holding the host slot
+            delay = None
+            if response is not None:
+                delay = _retry_after(response)
+                response.close()
+            time.sleep(delay if delay is not None else backoff_delay(attempt))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+
+# Process-wide client
+http_client = HttpClient()
@@ -0,0 +1,140 @@
+"""
+Resilience primitives for outbound integrations: circuit breaker, jittered
+backoff and latency histogram
+"""
+import bisect
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} circuit open, retry in {retry_in:.1f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def backoff_delay(attempt: int, base: float = 0.25, cap: float = 4.0) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    closed     calls go through; `failure_threshold` consecutive failures open it
+    open       calls fail fast with CircuitOpenError for `reset_timeout` seconds
+    half_open  one trial call; success closes the circuit, failure re-opens it
+
+    Every before_call that does not raise must be followed by record_success,
+    record_failure or abandon_trial, or a half-open circuit stays blocked.
+    """
+
+    def __init__(self, service: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be made"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == 'open' and retry_in > 0:
+                raise CircuitOpenError(self.service, retry_in)
+            # reset timeout elapsed: let exactly one trial call through
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.service, max(retry_in, 0.0))
+            self.state = 'half_open'
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def abandon_trial(self):
+        """
+        The call allowed by before_call ended without a success / failure
+        verdict (e.g. interrupted): let the next call be the trial instead.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures, 'times_opened': self.times_opened}
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with per-outcome counters"""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = list(buckets_ms or LATENCY_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.outcomes = {'ok': 0, 'error': 0, 'retried': 0, 'rejected': 0}
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float, outcome: str = 'ok'):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+            self.total_ms += latency_ms
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def count(self, outcome: str):
+        """Count an event that has no latency (retry, rejected call)"""
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (None if empty / beyond the last bucket)"""
+        with self._lock:
+            total = sum(self.counts)
+            if not total:
+                return None
+            rank = q / 100 * total
+            seen = 0
+            for i, c in enumerate(self.counts):
+                seen += c
+                if seen >= rank:
+                    return self.buckets_ms[i] if i < len(self.buckets_ms) else None
+            return None
+
+    def snapshot(self) -> Dict:
+        observed = sum(self.counts)
+        labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        return {
+            'calls': observed,
+            'mean_ms': round(self.total_ms / observed, 1) if observed else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'outcomes': dict(self.outcomes),
+            'histogram': {label: c for label, c in zip(labels, self.counts) if c},
+        }
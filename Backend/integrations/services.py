@@ -0,0 +1,124 @@
+"""
+Per-service state shared by the HTTP client and the SDK clients: circuit
+breaker, latency histogram and concurrency limit, plus guarded_call for
+SDK calls that do their own HTTP
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Tuple, Type
+
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyHistogram, backoff_delay
+
+FAILURE_THRESHOLD = int(os.getenv('INTEGRATION_FAILURE_THRESHOLD', '5'))
+RESET_TIMEOUT = float(os.getenv('INTEGRATION_RESET_TIMEOUT', '30'))
+# concurrent calls per service (SDK calls) / per host (HTTP client)
+MAX_CONCURRENCY = int(os.getenv('INTEGRATION_MAX_CONCURRENCY', '8'))
+
+
+class ConcurrencyLimitError(Exception):
+    """No call slot for the service/host became free in time"""
+
+
+class ServiceState:
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, max_concurrency: int = MAX_CONCURRENCY):
+        self.name = name
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.latency = LatencyHistogram()
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def snapshot(self) -> Dict:
+        return {'circuit': self.breaker.snapshot(), **self.latency.snapshot()}
+
+
+_services: Dict[str, ServiceState] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(name: str) -> ServiceState:
+    with _services_lock:
+        state = _services.get(name)
+        if state is None:
+            state = _services[name] = ServiceState(name)
+        return state
+
+
+def configure_service(name: str, **kwargs) -> ServiceState:
+    """(Re)create a service's state with non-default breaker / concurrency settings"""
+    with _services_lock:
+        state = _services[name] = ServiceState(name, **kwargs)
+        return state
+
+
+def integration_stats() -> Dict[str, Dict]:
+    with _services_lock:
+        services = list(_services.values())
+    return {s.name: s.snapshot() for s in services}
+
+
+def acquire_slot(semaphore: threading.Semaphore, name: str, timeout: float):
+    if not semaphore.acquire(timeout=timeout):
+        raise ConcurrencyLimitError(f"{name}: no free call slot after {timeout:.1f}s")
+
+
+def guarded_call(
+    service: str,
+    fn: Callable,
+    *args,
+    retries: int = 0,
+    retry_on: Tuple[Type[BaseException], ...] = (),
+    slot_timeout: float = 30.0,
+    **kwargs
+):
+    """
+    fn(*args, **kwargs) through the service's circuit breaker and concurrency
+    limit, timed into its latency histogram. Exceptions in retry_on are retried
+    up to `retries` times with jittered backoff; every exception counts as a
+    failure for the breaker and is re-raised.
+    """
+    state = get_service(service)
+    for attempt in range(retries + 1):
+        # slot first: a refused slot must not consume the half-open trial
+        try:
+            acquire_slot(state.slots, service, slot_timeout)
+        except ConcurrencyLimitError:
+            state.latency.count('rejected')
+            raise
+
+        retry = False
+        try:
+            try:
+                state.breaker.before_call()
+            except CircuitOpenError:
+                state.latency.count('rejected')
+                raise
+
+            start = time.perf_counter()
+            verdict = False
+            try:
+                result = fn(*args, **kwargs)
+                verdict = True
+            except Exception as e:
+                verdict = True
+                state.latency.observe((time.perf_counter() - start) * 1000, 'error')
+                state.breaker.record_failure()
+                if attempt < retries and isinstance(e, retry_on):
+                    state.latency.count('retried')
+                    retry = True
+                else:
+                    raise
+            finally:
+                if not verdict:
+                    state.breaker.abandon_trial()
+        finally:
+            state.slots.release()
+
+        if retry:
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        state.latency.observe((time.perf_counter() - start) * 1000, 'ok')
+        state.breaker.record_success()
+        return result
@@ -0,0 +1,55 @@
+"""
+Local stand-in for Gemini GenerativeModel (LLM_STUB=1)
+
+Deterministic canned answers shaped like what each shopping endpoint asks
+for, so the Gemini-backed routes can be exercised without an API key or
+network. LLM_STUB_DELAY adds latency per call (seconds) to mimic the real
+service, e.g. when checking caching and coalescing.
+"""
+import json
+import os
+import threading
+import time
+
+
+def llm_stub_enabled():
+    return os.getenv('LLM_STUB', '').strip().lower() in ('1', 'true', 'yes')
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = []
+
+
+class StubGenerativeModel:
+    calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, contents, **kwargs):
+        with StubGenerativeModel._lock:
+            StubGenerativeModel.calls += 1
+        time.sleep(float(os.getenv('LLM_STUB_DELAY', '0')))
+
+        prompt = contents if isinstance(contents, str) else ' '.join(map(str, contents))
+        if 'shelf_life' in prompt:
+            return StubResponse(json.dumps({
+                'shelf_life': '5-7 Days',
+                'storage_tip': 'Refrigerate in an airtight container.',
+                'wastage_risk': 'Medium',
+                'eco_tip': 'Plan meals before buying.',
+            }))
+        if 'meal_plan' in prompt:
+            return StubResponse(json.dumps({
+                'preferences': ['Home Cooking'],
+                'weekend_habit': 'Weekly grocery run',
+                'meal_plan': {'breakfast': 'Oatmeal', 'lunch': 'Rice and Curry', 'dinner': 'Vegetable Soup'},
+                'reasoning': 'Stub model response.',
+            }))
+        if 'JSON array of strings' in prompt:
+            return StubResponse(json.dumps(['Rice', 'Coconut Milk', 'Spices', 'Vegetables']))
+        return StubResponse(f"(stub) Here is a shopping list for: {prompt[:80]}")
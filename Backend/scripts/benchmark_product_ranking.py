@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the smart-shopping rule-based ranking: the previous per-product
+loop (avg price recomputed per product, every product copied) vs the
+vectorized smart_shopping.ranking.rank_products.
+
+Usage:
+    python scripts/benchmark_product_ranking.py [--products 10000] [--repeat 5] [--loop-products 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from smart_shopping.ranking import rank_products
+
+PLATFORMS = ['eBay', 'Amazon', 'Walmart', 'Etsy', 'BestBuy']
+CATEGORIES = ['electronics', 'home', 'kitchen', 'sports', 'toys']
+WORDS = ['wireless', 'pro', 'mini', 'max', 'steel', 'smart', 'portable', 'kit', 'set', 'ultra', 'air', 'lite']
+
+
+def make_products(n, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f'p{i}',
+            'name': ' '.join(rng.sample(WORDS, 4)),
+            'price': round(rng.uniform(5, 500), 2),
+            'rating': round(rng.uniform(2.5, 5.0), 1),
+            'platform': rng.choice(PLATFORMS),
+            'category': rng.choice(CATEGORIES),
+            'availability': 'In Stock' if rng.random() < 0.8 else 'Out of Stock',
+        }
+        for i in range(n)
+    ]
+
+
+def loop_rank(products, user_preferences, budget):
+    """The previous RecommendationEngine._rule_based_recommend scoring"""
+    scored_products = []
+    for product in products:
+        score = 0
+        rating = product.get('rating', 0)
+        score += rating * 8
+        price = product.get('price', 0)
+        if budget:
+            if price <= budget:
+                score += 30 * (1 - (price / budget))
+            else:
+                score -= 10
+        else:
+            avg_price = sum(p.get('price', 0) for p in products) / len(products)
+            if price <= avg_price * 1.2:
+                score += 20
+        platform = product.get('platform', '')
+        if platform in ['eBay', 'Amazon', 'Walmart']:
+            score += 10
+        if product.get('availability', '').lower() == 'in stock':
+            score += 10
+        if user_preferences and 'category' in user_preferences:
+            if product.get('category', '') == user_preferences['category']:
+                score += 10
+        product_copy = product.copy()
+        product_copy['recommendation_score'] = score
+        scored_products.append(product_copy)
+    scored_products.sort(key=lambda x: x.get('recommendation_score', 0), reverse=True)
+    return scored_products[:10]
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--loop-products', type=int, default=2000,
+                        help='the old loop is O(n^2) without a budget, so it runs on a smaller list')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    prefs = {'category': 'kitchen'}
+    products = make_products(args.products)
+    small = products[:args.loop_products]
+
+    print(f"⏱️ Ranking benchmark (best of {args.repeat})")
+    for budget in [None, 200]:
+        label = f"budget={budget}"
+        t_loop, ref = timed(lambda: loop_rank(small, prefs, budget), args.repeat)
+        t_vec_small, out = timed(lambda: rank_products(small, 10, budget, prefs), args.repeat)
+        t_vec, _ = timed(lambda: rank_products(products, 10, budget, prefs), args.repeat)
+
+        same = [p['id'] for p in ref] == [p['id'] for p in out]
+        print(f"   {label:<11} loop   {len(small):>6,} products: {t_loop * 1000:9.2f} ms")
+        print(f"   {label:<11} vector {len(small):>6,} products: {t_vec_small * 1000:9.2f} ms  (same top 10: {same})")
+        print(f"   {label:<11} vector {len(products):>6,} products: {t_vec * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
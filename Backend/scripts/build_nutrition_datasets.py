@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Convert the NutritionGuidance CSVs in data/ into the prebuilt artifact
+(data/nutrition_datasets.bin + data/nutrition_datasets.schema.json) that
+dataset_loader memory-maps at startup instead of parsing the CSVs.
+
+Re-run after editing a CSV. Until then the edited CSV is simply read
+directly (the artifact records the sha256 of every source CSV).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from NutritionGuidance.services.dataset_loader import build_dataset_artifact
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else str(Path(__file__).parent.parent / "data")
+
+    t0 = time.perf_counter()
+    schema_path = build_dataset_artifact(data_dir)
+    print(f"✅ Built nutrition dataset artifact in {time.perf_counter() - t0:.2f}s")
+    print(f"   {schema_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Migrate NutritionGuidance intake logs from the old per-user JSON arrays
+(store/intake_<user>.json) to append-only JSON Lines (store/intake_<user>.jsonl).
+
+Safe to run multiple times: users that already have a .jsonl log are skipped.
+Logs are also migrated lazily on first access, so this is only needed to
+convert everything up front.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask
+
+from NutritionGuidance.services.intake_store import migrate_legacy_intake_logs
+
+
+def main():
+    base_dir = str(Path(__file__).parent.parent)
+
+    app = Flask(__name__)
+    app.config["DATA_DIR"] = os.path.join(base_dir, "data")
+    app.config["STORE_DIR"] = os.path.join(base_dir, "store")
+
+    migrated = migrate_legacy_intake_logs(app)
+    print(f"✅ Migrated {len(migrated)} intake log(s)")
+    for user_id in migrated:
+        print(f"   - {user_id}")
+
+
+if __name__ == "__main__":
+    main()
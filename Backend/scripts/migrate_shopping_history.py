@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Import the old data/shopping_history.json into data/shopping_history.db.
+
+Safe to run multiple times: the import is recorded in the database and only
+happens once. The store also migrates lazily on first use, so this is only
+needed to convert up front (e.g. during a deploy).
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shopping.history_store import HISTORY_DB, migrate_json_history
+
+
+def main():
+    migrated = migrate_json_history()
+    print(f"✅ Migrated {migrated} shopping history entries into {HISTORY_DB}")
+
+
+if __name__ == "__main__":
+    main()
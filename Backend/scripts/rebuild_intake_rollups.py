@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rebuild the NutritionGuidance daily nutrient rollups (store/intake_rollups.db)
+from the intake logs.
+
+Usage:
+    python scripts/rebuild_intake_rollups.py            # every user in store/
+    python scripts/rebuild_intake_rollups.py <user_id>  # one user
+
+Run it after backfilling logs by hand or after the food dataset changes.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask
+
+from NutritionGuidance.services.intake_store import rebuild_rollups
+
+
+def main():
+    base_dir = str(Path(__file__).parent.parent)
+
+    app = Flask(__name__)
+    app.config["DATA_DIR"] = os.path.join(base_dir, "data")
+    app.config["STORE_DIR"] = os.path.join(base_dir, "store")
+
+    user_id = sys.argv[1] if len(sys.argv) > 1 else None
+    rebuilt = rebuild_rollups(app, user_id)
+    print(f"✅ Rebuilt rollups for {len(rebuilt)} user(s)")
+    for uid in rebuilt:
+        print(f"   - {uid}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild the incremental shopping profiles (keyword counters, weekday /
+weekend tallies) from data/shopping_history.db.
+
+The counters are updated with every history change and backfilled once
+automatically; run this to repair them or after editing the history
+database by hand.
+
+Usage:
+    python scripts/rebuild_shopping_profiles.py [--user USER_ID]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shopping.history_store import HISTORY_DB, get_shopping_profile, rebuild_shopping_profiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--user', help='rebuild only this user (default: everyone)')
+    args = parser.parse_args()
+
+    rows = rebuild_shopping_profiles(args.user)
+    print(f"✅ Rebuilt shopping profiles from {rows} history entries in {HISTORY_DB}")
+    if args.user:
+        print(get_shopping_profile(args.user))
+
+
+if __name__ == "__main__":
+    main()
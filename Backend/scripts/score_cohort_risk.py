@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Score the deficiency risk of every saved NutritionGuidance profile
+(store/profile_<user>.json or store/profiles.db) and write a cohort report for care teams.
+
+Users are split into chunks that are scored in parallel worker processes,
+each chunk with a single model call (predict_risk_batch).
+
+Usage:
+    python scripts/score_cohort_risk.py [--period monthly] [--chunk-size 200] [--workers 4] [--out PATH]
+
+Nightly (crontab, 02:30):
+    30 2 * * * cd /path/to/Backend && python scripts/score_cohort_risk.py >> store/cohort_risk.log 2>&1
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask
+
+from NutritionGuidance.services.profile_store import list_profile_user_ids
+from NutritionGuidance.services.risk_cohort_service import cohort_summary, score_users
+
+BASE_DIR = str(Path(__file__).parent.parent)
+
+
+def _make_app(data_dir: str, store_dir: str) -> Flask:
+    app = Flask(__name__)
+    app.config["DATA_DIR"] = data_dir
+    app.config["STORE_DIR"] = store_dir
+    return app
+
+
+def _score_chunk(data_dir: str, store_dir: str, user_ids, period: str):
+    # runs in a worker process (datasets and model are loaded once per worker)
+    return score_users(_make_app(data_dir, store_dir), user_ids, period)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score deficiency risk for every saved profile.")
+    parser.add_argument("--period", default="monthly", choices=["weekly", "monthly"])
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--data-dir", default=os.path.join(BASE_DIR, "data"))
+    parser.add_argument("--store-dir", default=os.path.join(BASE_DIR, "store"))
+    parser.add_argument("--out", default=None, help="default: <store-dir>/cohort_risk_<period>.json")
+    args = parser.parse_args()
+
+    app = _make_app(args.data_dir, args.store_dir)
+    user_ids = list_profile_user_ids(app)
+    if not user_ids:
+        print("No profiles found in", args.store_dir)
+        return
+
+    size = max(1, args.chunk_size)
+    chunks = [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+    workers = max(1, min(args.workers, len(chunks)))
+
+    t0 = time.perf_counter()
+    items = []
+    if workers == 1:
+        for chunk in chunks:
+            items.extend(score_users(app, chunk, args.period))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_score_chunk, args.data_dir, args.store_dir, c, args.period) for c in chunks]
+            for f in futures:
+                items.extend(f.result())
+
+    report = cohort_summary(items, args.period)
+
+    out = args.out or os.path.join(args.store_dir, f"cohort_risk_{args.period}.json")
+    tmp = out + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out)
+
+    print(f"✅ Scored {len(items)} user(s) in {time.perf_counter() - t0:.2f}s "
+          f"({len(chunks)} chunk(s), {workers} worker(s))")
+    print("   by risk:", report["by_risk"])
+    print("   written:", out)
+
+
+if __name__ == "__main__":
+    main()
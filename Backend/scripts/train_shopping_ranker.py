@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Train the smart-shopping learning-to-rank model from the click log
+(data/shopping_clicks.db) and compare it offline with the rule-based ranker.
+
+Searches are split by time: the oldest (1 - test fraction) are used for
+training, the newest for evaluation (NDCG@k with position-debiased clicks as
+relevance, both rankers re-ranking the same logged results). The model is
+saved unless it scores more than --tolerance below the rule-based weights on
+the held-out searches, or always with --force.
+
+Clicks only exist on what the rule-based ranker chose to show, and the
+position debiasing cannot undo that selection, so on real logs this metric
+favours the rule-based ranker and a better model is often rejected. Until
+the log contains exploration traffic (searches served with a shuffled or
+learned ranking), review the printed weights and ship with --force.
+With --simulate the gate uses NDCG against the simulated users' true
+preference instead, which has no logging bias.
+
+Usage:
+    python scripts/train_shopping_ranker.py [--db PATH] [--out PATH] [--test-fraction 0.2] [--k 10]
+    python scripts/train_shopping_ranker.py --simulate 5000 --db /tmp/clicks.db --out /tmp/ranker.json
+
+--simulate N first fills the click log with N synthetic searches whose
+clicks follow a hidden preference (for trying the pipeline offline). In that
+mode --db and --out default to a new temporary directory, so the live click
+log and the model the app serves are only touched when passed explicitly.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from smart_shopping.ltr import (
+    CLICK_DB,
+    LTR_FEATURES,
+    LTR_MODEL_PATH,
+    ClickLog,
+    evaluate,
+    position_propensity,
+    save_model,
+    train_ranker,
+)
+from smart_shopping.ranking import DEFAULT_WEIGHTS, rank_with_features
+
+PLATFORMS = ['eBay', 'Amazon', 'Walmart', 'Etsy']
+CATEGORIES = ['electronics', 'home', 'kitchen', 'sports']
+WORDS = ['wireless', 'pro', 'mini', 'steel', 'smart', 'portable', 'kit', 'ultra', 'air', 'lite']
+
+# what simulated users actually care about (per unweighted feature score)
+HIDDEN_PREFERENCE = {'rating': 0.15, 'budget_fit': 0.12, 'platform_trust': 0.0, 'availability': 0.1,
+                     'category_match': 0.05, 'history_affinity': 0.4}
+
+
+def simulate(click_log, searches, seed=7):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    hidden = np.asarray([HIDDEN_PREFERENCE.get(f, 0.0) for f in LTR_FEATURES])
+
+    for _ in range(searches):
+        products = [
+            {
+                'id': f'p{rng.randrange(10 ** 6)}',
+                'name': ' '.join(rng.sample(WORDS, 3)),
+                'price': round(rng.uniform(5, 400), 2),
+                'rating': round(rng.uniform(2.5, 5.0), 1),
+                'platform': rng.choice(PLATFORMS),
+                'category': rng.choice(CATEGORIES),
+                'availability': 'In Stock' if rng.random() < 0.8 else 'Out of Stock',
+            }
+            for _ in range(30)
+        ]
+        history = [' '.join(rng.sample(WORDS, 2)) for _ in range(3)]
+        budget = rng.choice([None, 100, 250])
+        prefs = {'category': rng.choice(CATEGORIES)}
+
+        shown, X = rank_with_features(products, 10, budget, prefs, history, DEFAULT_WEIGHTS)
+        search_id = click_log.log_impressions('sim', 'simulated', shown, X)
+
+        # position-biased clicks on the hidden utility
+        utility = X @ hidden
+        p_click = 1 / (1 + np.exp(-(utility - utility.mean()) * 2)) / np.sqrt(np.arange(1, len(shown) + 1))
+        for product, p in zip(shown, p_click):
+            if np_rng.random() < p * 0.5:
+                click_log.log_click(search_id, product['id'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=None, help=f'click log (default {CLICK_DB})')
+    parser.add_argument('--out', default=None, help=f'model file (default {LTR_MODEL_PATH})')
+    parser.add_argument('--test-fraction', type=float, default=0.2)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--C', type=float, default=1.0, help='inverse L2 regularization')
+    parser.add_argument('--simulate', type=int, default=0, metavar='N')
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='allowed NDCG shortfall vs the rule-based weights (logging bias)')
+    parser.add_argument('--force', action='store_true', help='save regardless of NDCG')
+    args = parser.parse_args()
+
+    if args.simulate and (args.db is None or args.out is None):
+        # synthetic users must not end up in the production click log or model
+        sim_dir = tempfile.mkdtemp(prefix='shopping_ranker_sim_')
+        args.db = args.db or os.path.join(sim_dir, 'shopping_clicks.db')
+        args.out = args.out or os.path.join(sim_dir, 'shopping_ranker.json')
+    args.db = args.db or CLICK_DB
+    args.out = args.out or LTR_MODEL_PATH
+
+    click_log = ClickLog(args.db)
+    if args.simulate:
+        print(f"🧪 Simulating {args.simulate} searches into {args.db}")
+        simulate(click_log, args.simulate)
+
+    sessions = click_log.sessions()
+    print(f"📄 Clicked searches: {len(sessions)}")
+    if len(sessions) < 10:
+        raise SystemExit("Not enough clicked searches to train (need at least 10).")
+
+    n_test = max(1, int(len(sessions) * args.test_fraction))
+    train, test = sessions[:-n_test], sessions[-n_test:]
+
+    model = train_ranker(train, C=args.C)
+    print(f"✅ Trained on {len(train)} searches / {model['pairs']} pairs")
+    for name, w in model['weights'].items():
+        print(f"   {name:<16} {w:+.4f}")
+
+    rankers = {'rule_based': DEFAULT_WEIGHTS, 'ltr': model['weights']}
+    scores = evaluate(test, rankers, k=args.k, propensity=position_propensity(sessions))
+    print(f"\n📊 NDCG@{args.k} on {len(test)} held-out searches (position-debiased clicks)")
+    for name, value in scores.items():
+        print(f"   {name:<11} {value:.4f}")
+
+    if args.simulate:
+        hidden = np.asarray([HIDDEN_PREFERENCE.get(f, 0.0) for f in LTR_FEATURES])
+        truth = [dict(s, relevance=np.maximum(s['X'] @ hidden, 0.0)) for s in test]
+        true_scores = evaluate(truth, rankers, k=args.k)
+        print(f"   NDCG@{args.k} against the simulated users' true preference:")
+        for name, value in true_scores.items():
+            print(f"   {name:<11} {value:.4f}")
+
+    model['evaluation'] = {'k': args.k, 'test_searches': len(test), 'ndcg': scores}
+    # the click metric is biased towards the logging (rule-based) ranker; the simulation knows the truth
+    gate = scores
+    if args.simulate:
+        model['evaluation']['ndcg_true_preference'] = true_scores
+        gate = true_scores
+    if gate['ltr'] >= gate['rule_based'] - args.tolerance or args.force:
+        print("\n✅ Model saved at:", save_model(model, args.out))
+    else:
+        print("\nℹ️ Learned ranker scores worse than the rule-based weights, model not saved.")
+        if not args.simulate:
+            print("   Clicks logged under the rule-based ranker favour it; see the weights above and use --force to ship.")
+
+
+if __name__ == "__main__":
+    main()
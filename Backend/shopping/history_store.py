@@ -0,0 +1,326 @@
+"""
+Shopping search / chat history in SQLite (data/shopping_history.db).
+
+Replaces the single data/shopping_history.json that every helper loaded and
+rewrote in full. Rows are looked up through two indexes:
+
+    (user_id, timestamp)         a user's history, newest first
+    (user_id, type, query_key)   the "same query in the last 5 minutes" check
+
+so each request touches only the rows it needs. IDs are uuid4 hex strings
+(the old str(len(history) + 1) ids collided after deletes). SQLite handles
+locking between threads / workers (WAL, busy timeout).
+
+The old JSON file is imported once, on first use (see migrate_json_history);
+it is left in place untouched.
+
+Every change also updates the user's shopping profile counters in the same
+transaction (see shopping_profile.py).
+"""
+import datetime
+import json
+import os
+import sqlite3
+import uuid
+
+from shopping import shopping_profile
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+HISTORY_DB = os.path.join(DATA_DIR, 'shopping_history.db')
+LEGACY_HISTORY_FILE = os.path.join(DATA_DIR, 'shopping_history.json')
+
+# same user + type + query within this window only refreshes the timestamp
+DEDUP_SECONDS = 300
+
+_SCHEMA_READY = set()
+
+
+def _connect(db_path=None):
+    path = db_path or HISTORY_DB
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+
+    if path not in _SCHEMA_READY:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS history (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                user_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                query TEXT NOT NULL,
+                query_key TEXT NOT NULL,
+                details TEXT NOT NULL DEFAULT '{}',
+                timestamp TEXT NOT NULL
+            )"""
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history (user_id, timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_history_user_type_query ON history (user_id, type, query_key)')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        shopping_profile.create_schema(conn)
+        _SCHEMA_READY.add(path)
+        if db_path is None:
+            migrate_json_history(conn)
+        _ensure_profiles(conn)
+
+    return conn
+
+
+def _row_to_item(row):
+    try:
+        details = json.loads(row['details'] or '{}')
+    except ValueError:
+        details = {}
+    return {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'type': row['type'],
+        'query': row['query'],
+        'details': details,
+        'timestamp': row['timestamp'],
+    }
+
+
+def migrate_json_history(conn=None, legacy_file=None):
+    """
+    Import the old shopping_history.json once (recorded in the meta table).
+    Entries with a missing or duplicate id get a fresh uuid.
+    Returns the number of imported entries (0 if already migrated / no file).
+    """
+    legacy_file = legacy_file or LEGACY_HISTORY_FILE
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done or not os.path.exists(legacy_file):
+                conn.execute('COMMIT')
+                return 0
+
+            try:
+                with open(legacy_file, 'r') as f:
+                    entries = json.load(f) or []
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable shopping history {legacy_file}: {e}")
+                entries = []
+
+            seen = set()
+            rows = []
+            for h in entries:
+                if not isinstance(h, dict) or not h.get('user_id'):
+                    continue
+                item_id = str(h.get('id') or '')
+                if not item_id or item_id in seen:
+                    item_id = uuid.uuid4().hex
+                seen.add(item_id)
+                query = str(h.get('query') or '')
+                rows.append((
+                    item_id, str(h['user_id']), str(h.get('type') or 'search'), query, query.lower(),
+                    json.dumps(h.get('details') or {}), str(h.get('timestamp') or ''),
+                ))
+
+            conn.executemany(
+                'INSERT OR IGNORE INTO history (id, user_id, type, query, query_key, details, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (datetime.datetime.now(datetime.timezone.utc).isoformat(),),
+            )
+            if rows:
+                shopping_profile.rebuild_profiles(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if rows:
+            print(f"Migrated {len(rows)} shopping history entries from {legacy_file}")
+        return len(rows)
+    finally:
+        if own:
+            conn.close()
+
+
+def _ensure_profiles(conn):
+    """Backfill the profile counters once for histories recorded before they existed"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'profiles_built'").fetchone():
+            built = shopping_profile.rebuild_profiles(conn)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('profiles_built', ?)",
+                (datetime.datetime.now(datetime.timezone.utc).isoformat(),),
+            )
+            if built:
+                print(f"Built shopping profiles from {built} history entries")
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def get_shopping_profile(user_id):
+    """The user's learned shopping profile ({} without history), read from the counters"""
+    conn = _connect()
+    try:
+        return shopping_profile.read_profile(conn, user_id)
+    finally:
+        conn.close()
+
+
+def rebuild_shopping_profiles(user_id=None):
+    """Recompute profile counters from the history (one user or all); returns rows processed"""
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            count = shopping_profile.rebuild_profiles(conn, user_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return count
+    finally:
+        conn.close()
+
+
+def get_user_history(user_id, limit=None):
+    """
+    A user's history entries, newest first (optionally only the first `limit`).
+    """
+    conn = _connect()
+    try:
+        sql = 'SELECT * FROM history WHERE user_id = ? ORDER BY timestamp DESC, seq DESC'
+        params = [user_id]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return [_row_to_item(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def load_history():
+    """
+    Every user's history in insertion order (admin / export use; request
+    handlers should use get_user_history).
+    """
+    conn = _connect()
+    try:
+        return [_row_to_item(r) for r in conn.execute('SELECT * FROM history ORDER BY seq')]
+    finally:
+        conn.close()
+
+
+def append_history(user_id, action_type, query, details=None):
+    """
+    user_id: str (ID of the logged in user)
+    action_type: str ('search' or 'chat')
+    query: str (the search text or chat message)
+    details: dict (optional extra info like filter settings or result count)
+    """
+    try:
+        if not user_id:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        conn = _connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Check for duplication (same user, same query, same type within last 5 mins)
+                last = conn.execute(
+                    'SELECT id, timestamp FROM history WHERE user_id = ? AND type = ? AND query_key = ? '
+                    'ORDER BY seq DESC LIMIT 1',
+                    (user_id, action_type, query.lower()),
+                ).fetchone()
+                if last is not None:
+                    try:
+                        ts = datetime.datetime.fromisoformat(last['timestamp'])
+                        if ts.tzinfo is None:
+                            ts = ts.replace(tzinfo=datetime.timezone.utc)
+                        if (now - ts).total_seconds() < DEDUP_SECONDS:
+                            conn.execute('UPDATE history SET timestamp = ? WHERE id = ?', (now.isoformat(), last['id']))
+                            shopping_profile.move_timestamp(conn, user_id, last['timestamp'], now.isoformat())
+                            conn.execute('COMMIT')
+                            return
+                    except ValueError:
+                        pass
+
+                conn.execute(
+                    'INSERT INTO history (id, user_id, type, query, query_key, details, timestamp) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (uuid.uuid4().hex, user_id, action_type, query, query.lower(),
+                     json.dumps(details or {}), now.isoformat()),
+                )
+                shopping_profile.apply_entry(conn, user_id, query, now.isoformat())
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error saving history: {e}")
+
+
+def _modify(fn):
+    """Run fn(conn) in a write transaction; returns its result"""
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+    finally:
+        conn.close()
+
+
+def update_history_item(user_id, item_id, new_query):
+    def update(conn):
+        old = conn.execute(
+            'SELECT query, timestamp FROM history WHERE id = ? AND user_id = ?', (str(item_id), user_id)
+        ).fetchone()
+        if old is None:
+            return False
+        timestamp = datetime.datetime.utcnow().isoformat()
+        conn.execute(
+            'UPDATE history SET query = ?, query_key = ?, timestamp = ? WHERE id = ?',
+            (new_query, new_query.lower(), timestamp, str(item_id)),
+        )
+        shopping_profile.apply_entry(conn, user_id, old['query'], old['timestamp'], sign=-1)
+        shopping_profile.apply_entry(conn, user_id, new_query, timestamp)
+        return True
+
+    return _modify(update)
+
+
+def delete_history_item(user_id, item_id):
+    def delete(conn):
+        old = conn.execute(
+            'SELECT query, timestamp FROM history WHERE id = ? AND user_id = ?', (str(item_id), user_id)
+        ).fetchone()
+        if old is None:
+            return False
+        conn.execute('DELETE FROM history WHERE id = ?', (str(item_id),))
+        shopping_profile.apply_entry(conn, user_id, old['query'], old['timestamp'], sign=-1)
+        return True
+
+    return _modify(delete)
+
+
+def clear_user_history(user_id):
+    def clear(conn):
+        conn.execute('DELETE FROM history WHERE user_id = ?', (user_id,))
+        shopping_profile.clear_profile(conn, user_id)
+        return True
+
+    return _modify(clear)
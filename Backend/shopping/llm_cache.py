@@ -0,0 +1,184 @@
+"""
+Response cache for the Gemini-backed shopping endpoints.
+
+Each endpoint has its own policy (TTL, size, optional semantic matching).
+Entries are keyed by the normalized text that varies between requests
+(e.g. the product name for analyze-product, the full prompt for
+predict-needs):
+
+    exact     normalized key found and not expired
+    semantic  (policies with semantic_threshold, when an embedding model is
+              configured) the closest cached key of the same endpoint has
+              cosine similarity >= threshold
+    miss      compute() is called; concurrent misses for the same key wait
+              for the first caller's result (or its exception) instead of
+              making their own LLM call
+
+A compute() that returns None (no usable answer) is never cached.
+"""
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+LLM_CACHE_ENABLED = os.getenv('SHOPPING_LLM_CACHE', '1').strip().lower() not in ('0', 'false', 'no')
+# sentence-transformers model for semantic lookups; '' = exact keys only
+LLM_CACHE_EMBED_MODEL = os.getenv('SHOPPING_LLM_CACHE_EMBED_MODEL', '')
+
+_PUNCT_RE = re.compile(r'[^\w\s]+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    return _SPACE_RE.sub(' ', _PUNCT_RE.sub(' ', (text or '').lower())).strip()
+
+
+class CachePolicy:
+    def __init__(self, ttl: float, max_entries: int = 512, semantic_threshold: Optional[float] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+
+
+DEFAULT_POLICIES = {
+    # shelf life / storage advice per product name hardly changes
+    'analyze-product': CachePolicy(ttl=7 * 24 * 3600, max_entries=4096, semantic_threshold=0.93),
+    # keyed by the whole prompt (profile, recent activity, date): new activity is a new key
+    'predict-needs': CachePolicy(ttl=6 * 3600, max_entries=1024),
+    # keyed by recent activity + message; short TTL, answers are conversational
+    'chat': CachePolicy(ttl=600, max_entries=1024),
+}
+
+
+def sentence_embedder(model_name):
+    """texts -> L2-normalized embedding rows, or None if the model cannot be loaded"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+    except Exception as e:
+        print(f"LLM cache: semantic lookups disabled ({e})")
+        return None
+
+    def embed(texts):
+        return np.asarray(model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    return embed
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMCache:
+    def __init__(self, policies: Optional[Dict[str, CachePolicy]] = None,
+                 embed: Optional[Callable] = None, enabled: bool = LLM_CACHE_ENABLED):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.embed = embed
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries = {}    # endpoint -> OrderedDict(key -> (expires_at, value, vector))
+        self._inflight = {}   # (endpoint, key) -> _Flight
+        self._stats = {}
+
+    def _count(self, endpoint, what):
+        stats = self._stats.setdefault(endpoint, {'hits': 0, 'semantic_hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0})
+        stats[what] += 1
+
+    # ---------------------------------------------------------------
+    def get(self, endpoint, key_text, compute):
+        """
+        Cached response of `endpoint` for key_text, calling compute() on a miss.
+        Endpoints without a policy (or a disabled cache) always call compute().
+        """
+        policy = self.policies.get(endpoint)
+        if not self.enabled or policy is None:
+            return compute()
+
+        key = normalize_prompt(key_text)
+        with self._lock:
+            entries = self._entries.setdefault(endpoint, OrderedDict())
+            entry = entries.get(key)
+            if entry and entry[0] > time.time():
+                entries.move_to_end(key)
+                self._count(endpoint, 'hits')
+                return copy.deepcopy(entry[1])
+
+            flight = self._inflight.get((endpoint, key))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(endpoint, key)] = _Flight()
+            self._count(endpoint, 'misses' if leader else 'coalesced')
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        vector = None
+        try:
+            if policy.semantic_threshold and self.embed:
+                vector = self.embed([key])[0]
+                flight.value = self._nearest(endpoint, policy, vector)
+            if flight.value is None:
+                flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._count(endpoint, 'errors')
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None and flight.value is not None:
+                    self._store(endpoint, policy, key, flight.value, vector)
+                del self._inflight[(endpoint, key)]
+            flight.event.set()
+
+        return copy.deepcopy(flight.value)
+
+    def _nearest(self, endpoint, policy, vector):
+        """Value of the most similar fresh entry at or above the threshold, else None"""
+        now = time.time()
+        with self._lock:
+            candidates = [(v, vec) for exp, v, vec in self._entries.get(endpoint, {}).values()
+                          if vec is not None and exp > now]
+        if not candidates:
+            return None
+        sims = np.stack([vec for _, vec in candidates]) @ vector
+        best = int(np.argmax(sims))
+        if sims[best] < policy.semantic_threshold:
+            return None
+        with self._lock:
+            self._count(endpoint, 'semantic_hits')
+        return candidates[best][0]
+
+    def _store(self, endpoint, policy, key, value, vector):
+        entries = self._entries.setdefault(endpoint, OrderedDict())
+        entries[key] = (time.time() + policy.ttl, copy.deepcopy(value), vector)
+        entries.move_to_end(key)
+        while len(entries) > policy.max_entries:
+            entries.popitem(last=False)
+
+    # ---------------------------------------------------------------
+    def clear(self, endpoint=None):
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(endpoint, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: {**counts, 'entries': len(self._entries.get(endpoint, {}))}
+                for endpoint, counts in self._stats.items()
+            }
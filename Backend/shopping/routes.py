@@ -2,14 +2,30 @@
 import json
 import os
 import datetime
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from flask_jwt_extended import get_jwt_identity, jwt_required, verify_jwt_in_request
-import requests
 from dotenv import load_dotenv
 import re
 from extensions import jwt
+from integrations import gemini_model, guarded_call, http_client, llm_stub_enabled
+from smart_shopping.ltr import LTRRanker
+from smart_shopping.ranking import rank_products
+from shopping.llm_cache import LLM_CACHE_EMBED_MODEL, LLMCache, sentence_embedder
+from shopping.search_cache import SEARCH_CACHE_FILE, SearchCache, normalize_query
+from shopping.history_store import (
+    append_history,
+    clear_user_history,
+    delete_history_item,
+    get_shopping_profile,
+    get_user_history,
+    update_history_item,
+)
 
 load_dotenv()
 
@@ -17,95 +33,29 @@ shopping_bp = Blueprint('shopping', __name__)
 
 SERPAPI_KEY = os.getenv('SERPAPI_KEY', '')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+# LLM_STUB=1 serves the Gemini routes from a local stub model (no key / network needed)
+GEMINI_ENABLED = bool(GEMINI_API_KEY) or llm_stub_enabled()
+# Gemini-curated recommendation lists are opt-in (computed in the background); by default
+# recommendations are ranked locally
+GEMINI_RECOMMENDATIONS = os.getenv('SHOPPING_LLM_RECOMMENDATIONS', '').strip().lower() in ('1', 'true', 'yes')
 SERPAPI_ENDPOINT = 'https://serpapi.com/search.json'
 
-# --- HISTORY FILE SETUP ---
-HISTORY_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'shopping_history.json')
+# Parsed SerpAPI results per (query, country); pages and max_results slices share one upstream call
+search_cache = SearchCache(persist_path=SEARCH_CACHE_FILE)
 
-def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    try:
-        with open(HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+# Gemini responses per endpoint (chat / analyze-product / predict-needs); concurrent misses share one call
+llm_cache = LLMCache(embed=sentence_embedder(LLM_CACHE_EMBED_MODEL) if LLM_CACHE_EMBED_MODEL else None)
 
-def save_history(history):
-    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
-
-def update_history_item(user_id, item_id, new_query):
-    history = load_history()
-    updated = False
-    for item in history:
-        if item['id'] == item_id and item['user_id'] == user_id:
-            item['query'] = new_query
-            item['timestamp'] = datetime.datetime.utcnow().isoformat()
-            updated = True
-            break
-    if updated:
-        save_history(history)
-    return updated
-
-def delete_history_item(user_id, item_id):
-    history = load_history()
-    original_len = len(history)
-    history = [h for h in history if not (h['id'] == item_id and h['user_id'] == user_id)]
-    if len(history) < original_len:
-        save_history(history)
-        return True
-    return False
-
-def clear_user_history(user_id):
-    history = load_history()
-    history = [h for h in history if h['user_id'] != user_id]
-    save_history(history)
-    return True
-
-def append_history(user_id, action_type, query, details=None):
-    """
-    user_id: str (ID of the logged in user)
-    action_type: str ('search' or 'chat')
-    query: str (the search text or chat message)
-    details: dict (optional extra info like filter settings or result count)
-    """
-    try:
-        if not user_id:
-            return
-        
-        history = load_history()
-        
-        # Check for duplication (same user, same query, same type within last 5 mins)
-        now = datetime.datetime.now(datetime.timezone.utc)
-        for item in reversed(history):
-            if item['user_id'] == user_id and item['type'] == action_type and item['query'].lower() == query.lower():
-                try:
-                    ts = datetime.datetime.fromisoformat(item['timestamp'])
-                    if ts.tzinfo is None:
-                        ts = ts.replace(tzinfo=datetime.timezone.utc)
-                    if (now - ts).total_seconds() < 300: # 5 minutes
-                        item['timestamp'] = now.isoformat()
-                        save_history(history)
-                        return
-                except:
-                    pass
-                break # Only check the most recent match
-        
-        new_entry = {
-            'id': str(len(history) + 1),
-            'user_id': user_id,
-            'type': action_type,
-            'query': query,
-            'details': details or {},
-            'timestamp': now.isoformat()
-        }
-        
-        history.append(new_entry)
-        save_history(history)
-    except Exception as e:
-        print(f"Error saving history: {e}")
+# Learned ranking weights (smart_shopping/ltr.py), rule weights until a model is trained
+shopping_ranker = LTRRanker()
+
+# Gemini-curated recommendation lists per recent activity, built in the background
+CURATED_LIST_TTL = 3600      # seconds a ready list is served
+CURATED_LIST_RETRY = 300     # seconds before a failed list is tried again
+MAX_CURATED_LISTS = 256
+_curated_lists = OrderedDict()   # activity -> {'status': 'pending'|'ready'|'failed', 'at', 'queries', 'products'}
+_curated_lock = threading.Lock()
+_curated_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='shopping-curated')
 
 # =================================== PRODUCT SEARCH ===================================
 
@@ -128,13 +78,23 @@ def search_google_shopping(query, max_results=20, country='us'):
     }
     gl = country_map.get(country.lower().strip(), 'us')
 
-    print(f"Searching Google Shopping ({gl}): {query}")
-    products = []
-
     if not SERPAPI_KEY:
         print("No SerpAPI key → using fallback products")
         return get_fallback_products(query)
 
+    products = search_cache.get((normalize_query(query), gl), lambda: fetch_google_shopping(query, gl))
+    if products is None:
+        return get_fallback_products(query)
+    return products[:max_results]
+
+
+def fetch_google_shopping(query, gl):
+    """
+    One SerpAPI request -> every parsed product, or None if the request failed.
+    """
+    print(f"Searching Google Shopping ({gl}): {query}")
+    products = []
+
     try:
         params = {
             'engine': 'google_shopping',
@@ -144,11 +104,11 @@ def search_google_shopping(query, max_results=20, country='us'):
             'hl': 'en',
             'gl': gl
         }
-        response = requests.get(SERPAPI_ENDPOINT, params=params, timeout=15)
+        response = http_client.get(SERPAPI_ENDPOINT, service='serpapi', params=params, timeout=15)
 
         if response.status_code == 200:
             items = response.json().get('shopping_results', [])
-            for i, item in enumerate(items[:max_results]):
+            for i, item in enumerate(items):
                 try:
                     title = item.get('title', 'Unknown Product')
                     price_str = item.get('price', '$0')
@@ -177,10 +137,10 @@ def search_google_shopping(query, max_results=20, country='us'):
             print(f"Successfully fetched {len(products)} products from {gl.upper()}")
         else:
             print(f"SerpAPI failed: {response.status_code}")
-            return get_fallback_products(query)
+            return None
     except Exception as e:
         print(f"Request error: {e}")
-        return get_fallback_products(query)
+        return None
 
     return products
 
@@ -221,6 +181,154 @@ def get_fallback_products(query=""):
     return products
 
 
+# =================================== GEMINI CALLS ===================================
+# Uncached calls; routes go through llm_cache. Each raises on failure.
+
+def gemini_chat_reply(msg, history_context):
+    model = gemini_model(
+        'models/gemini-flash-latest',
+        system_instruction=f"{history_context}You are a helpful Kitchen Shopping Assistant. "
+                           f"When users ask how to make a dish or for a recipe, your primary job is to generate a comprehensive SHOPPING LIST of ingredients. "
+                           f"Format the shopping list as a Markdown table with columns: Ingredient, Quantity, and Shopping Tip. "
+                           f"Briefly describe the ingredients and suggest the best types to buy (e.g., 'San Marzano tomatoes are best for pasta sauce'). "
+                           f"Keep the cooking instructions very minimal (1-2 sentences) and focus 90% on the shopping aspect. "
+                           f"Always be friendly and encouraging. Context is provided if available: {history_context}"
+    )
+
+    # Relax safety settings to prevent "finish_reason: 2" blocks for recipe queries
+    safety_settings = [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
+    ]
+
+    response = guarded_call(
+        'gemini',
+        model.generate_content,
+        msg,
+        generation_config={
+            "temperature": 0.7,
+            "max_output_tokens": 4000
+        },
+        safety_settings=safety_settings
+    )
+
+    # Handle blocked responses
+    if response.candidates and response.candidates[0].finish_reason == 3: # SAFETY
+        return "I'm sorry, I can't provide that specific information for safety reasons, but I can help you find prices for common kitchen staples!"
+    if response.text:
+        print(f"Gemini: {response.text[:80]}...")
+        return response.text
+    return None
+
+
+def gemini_product_analysis(product_name):
+    model = gemini_model('models/gemini-flash-latest')
+
+    prompt = (
+        f"Analyze the food item '{product_name}' for kitchen wastage management.\n"
+        f"Provide a JSON response with these keys:\n"
+        f"- shelf_life: (e.g. '3-5 Days' or '1 Month')\n"
+        f"- storage_tip: (Best way to prolong freshness, max 10 words)\n"
+        f"- wastage_risk: ('High', 'Medium', or 'Low')\n"
+        f"- eco_tip: (Advice to reduce waste, max 10 words)\n"
+        f"Return ONLY raw JSON. No markdown."
+    )
+
+    response = guarded_call('gemini', model.generate_content, prompt)
+    text = response.text.replace('```json', '').replace('```', '').strip()
+    return json.loads(text)
+
+
+def gemini_curated_list(history_text):
+    """Suggested queries for the recent activity and the top product of each"""
+    model = gemini_model('models/gemini-flash-latest')
+
+    prompt = (
+        f"Act as a Professional Personal Shopper. \n"
+        f"User's recent activity:\n{history_text}\n\n"
+        f"Task: Suggest a 'Smart Shopping List' of 4 specific, distinct items based on their recent interests.\n"
+        f"Rules:\n"
+        f"1. Focus on complementary items (e.g., if they searched for 'Camera', suggest 'SD Card').\n"
+        f"2. Return ONLY a raw JSON array of strings (e.g. [\"Lenses\", \"Camera Bag\"]).\n"
+        f"3. Do not include markdown or explanations."
+    )
+
+    response = guarded_call('gemini', model.generate_content, prompt)
+    text_response = response.text.replace('```json', '').replace('```', '').strip()
+    suggested_queries = json.loads(text_response)
+    if not isinstance(suggested_queries, list) or not suggested_queries:
+        return None
+    print(f"AI Health Suggestions: {suggested_queries}")
+
+    products = []
+    for q in suggested_queries[:4]:
+        query_products = search_google_shopping(q, 1)
+        if query_products:
+            p = query_products[0]
+            p['aiReason'] = f"Smart Suggestion: {q}"
+            products.append(p)
+    return {'queries': suggested_queries, 'products': products}
+
+
+def curated_list_async(history_text):
+    """
+    (ready curated list or None, pending) for this recent activity. Never
+    waits for Gemini: a missing or expired list is built in the background
+    and served by a later request.
+    """
+    key = normalize_query(history_text)
+    now = time.time()
+    with _curated_lock:
+        entry = _curated_lists.get(key)
+        if entry:
+            if entry['status'] == 'pending':
+                return None, True
+            if entry['status'] == 'ready' and now - entry['at'] < CURATED_LIST_TTL:
+                _curated_lists.move_to_end(key)
+                return dict(entry), False
+            if entry['status'] == 'failed' and now - entry['at'] < CURATED_LIST_RETRY:
+                return None, False
+        _store_curated_list(key, {'status': 'pending', 'at': now})
+    _curated_pool.submit(_build_curated_list, key, history_text)
+    return None, True
+
+
+def _store_curated_list(key, entry):
+    _curated_lists[key] = entry
+    _curated_lists.move_to_end(key)
+    while len(_curated_lists) > MAX_CURATED_LISTS:
+        _curated_lists.popitem(last=False)
+
+
+def _build_curated_list(key, history_text):
+    try:
+        curated = gemini_curated_list(history_text)
+    except Exception as e:
+        print(f"AI Recommendation failed: {e}")
+        curated = None
+    entry = dict(curated, status='ready') if curated else {'status': 'failed'}
+    entry['at'] = time.time()
+    with _curated_lock:
+        _store_curated_list(key, entry)
+
+
+def gemini_predict_needs(prompt):
+    model = gemini_model('models/gemini-flash-latest') # Updated model
+
+    # Try specific models if the default alias fails (Error handling wrapper)
+    try:
+        response = guarded_call('gemini', model.generate_content, prompt)
+    except Exception as model_err:
+        print(f"Primary model failed, trying fallback: {model_err}")
+        model = gemini_model('models/gemini-pro-latest')
+        response = guarded_call('gemini-pro', model.generate_content, prompt)
+
+    text_response = response.text.replace('```json', '').replace('```', '').strip()
+    return json.loads(text_response)
+
+
 # =================================== ROUTES ===================================
 
 @shopping_bp.route('/api/shopping/chat', methods=['POST', 'OPTIONS'])
@@ -257,53 +365,21 @@ def chat():
 
         # TRY GEMINI (working in 2025)
         gemini_response = None
-        if GEMINI_API_KEY:
+        if GEMINI_ENABLED:
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=GEMINI_API_KEY)
-
                 # Fetch recent history context if user is logged in
                 history_context = ""
                 if user_id:
-                    user_history = [h for h in load_history() if h['user_id'] == user_id]
-                    # Get last 5 actions
-                    recent = user_history[-5:] 
+                    # Get last 5 actions (oldest first)
+                    recent = get_user_history(user_id, limit=5)[::-1]
                     if recent:
                         history_context = "User's recent activity:\n" + "\n".join([f"- {h['type']}: {h['query']}" for h in recent]) + "\n\n"
 
-                model = genai.GenerativeModel(
-                    'models/gemini-flash-latest',
-                    system_instruction=f"{history_context}You are a helpful Kitchen Shopping Assistant. "
-                                       f"When users ask how to make a dish or for a recipe, your primary job is to generate a comprehensive SHOPPING LIST of ingredients. "
-                                       f"Format the shopping list as a Markdown table with columns: Ingredient, Quantity, and Shopping Tip. "
-                                       f"Briefly describe the ingredients and suggest the best types to buy (e.g., 'San Marzano tomatoes are best for pasta sauce'). "
-                                       f"Keep the cooking instructions very minimal (1-2 sentences) and focus 90% on the shopping aspect. "
-                                       f"Always be friendly and encouraging. Context is provided if available: {history_context}"
-                )
-
-                # Relax safety settings to prevent "finish_reason: 2" blocks for recipe queries
-                safety_settings = [
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
-                ]
-
-                response = model.generate_content(
-                    msg,
-                    generation_config={
-                        "temperature": 0.7,
-                        "max_output_tokens": 4000
-                    },
-                    safety_settings=safety_settings
+                gemini_response = llm_cache.get(
+                    'chat',
+                    history_context + msg,
+                    lambda: gemini_chat_reply(msg, history_context)
                 )
-                
-                # Handle blocked responses
-                if response.candidates and response.candidates[0].finish_reason == 3: # SAFETY
-                     gemini_response = "I'm sorry, I can't provide that specific information for safety reasons, but I can help you find prices for common kitchen staples!"
-                elif response.text:
-                     print(f"Gemini: {response.text[:80]}...")
-                     gemini_response = response.text
             except Exception as e:
                 print(f"Gemini failed: {e}")
                 # Fallback handled below
@@ -421,70 +497,28 @@ def get_recommendations():
         
         if user_id:
             # 1. FETCH SHOPPING HISTORY (Standalone)
-            history = load_history()
-            user_history = [h for h in history if h['user_id'] == user_id]
+            user_history = get_user_history(user_id)
 
             if user_history:
                 # ---------------------------------------------------------
-                # NEW: AI-POWERED ANALYSIS (Gemini) - STANDALONE
+                # NEW: AI-POWERED ANALYSIS (Gemini) - STANDALONE (opt-in)
+                # Never waits for Gemini: the curated list is computed in the
+                # background and served once cached for this activity
                 # ---------------------------------------------------------
-                if GEMINI_API_KEY:
-                    try:
-                        import google.generativeai as genai
-                        genai.configure(api_key=GEMINI_API_KEY)
-                        
-                        # Prepare history context (last 10 interactions)
-                        sorted_history = sorted(user_history, key=lambda x: x.get('timestamp', ''), reverse=True)[:10]
-                        history_text = "\n".join([f"- {h['type'].upper()}: {h['query']}" for h in sorted_history])
-                        
-                        model = genai.GenerativeModel('models/gemini-flash-latest')
-                        
-                        prompt = (
-                            f"Act as a Professional Personal Shopper. \n"
-                            f"User's recent activity:\n{history_text}\n\n"
-                            f"Task: Suggest a 'Smart Shopping List' of 4 specific, distinct items based on their recent interests.\n"
-                            f"Rules:\n"
-                            f"1. Focus on complementary items (e.g., if they searched for 'Camera', suggest 'SD Card').\n"
-                            f"2. Return ONLY a raw JSON array of strings (e.g. [\"Lenses\", \"Camera Bag\"]).\n"
-                            f"3. Do not include markdown or explanations."
-                        )
-                        
-                        response = model.generate_content(prompt)
-                        text_response = response.text.strip()
-                        
-                        # Cleanup markdown
-                        if text_response.startswith('```json'):
-                            text_response = text_response.replace('```json', '').replace('```', '')
-                        if text_response.startswith('```'):
-                             text_response = text_response.replace('```', '')
-
-                        suggested_queries = json.loads(text_response)
-                        
-                        if isinstance(suggested_queries, list) and len(suggested_queries) > 0:
-                            print(f"AI Health Suggestions: {suggested_queries}")
-                            
-                            all_recommended_products = []
-                            for q in suggested_queries[:4]:
-                                query_products = search_google_shopping(q, 1) 
-                                if query_products:
-                                    p = query_products[0]
-                                    p['aiReason'] = f"Smart Suggestion: {q}" 
-                                    all_recommended_products.append(p)
-                            
-                            if all_recommended_products:
-                                return jsonify({
-                                    'success': True,
-                                    'recommendations': all_recommended_products,
-                                    'reason': "AI Curated Shopping List",
-                                    'source_queries': suggested_queries
-                                })
-                                
-                    except Exception as ai_error:
-                        print(f"AI Recommendation failed: {ai_error}")
-                        traceback.print_exc()
-
-                # Fallback to simple logic if AI fails...
-                user_history.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+                ai_pending = False
+                if GEMINI_ENABLED and GEMINI_RECOMMENDATIONS:
+                    # Prepare history context (last 10 interactions)
+                    history_text = "\n".join([f"- {h['type'].upper()}: {h['query']}" for h in user_history[:10]])
+                    curated, ai_pending = curated_list_async(history_text)
+                    if curated and curated['products']:
+                        return jsonify({
+                            'success': True,
+                            'recommendations': curated['products'],
+                            'reason': "AI Curated Shopping List",
+                            'source_queries': curated['queries']
+                        })
+
+                # Local ranking (also while the AI list is being prepared)
                 top_queries = []
                 seen = set()
                 for h in user_history:
@@ -502,13 +536,20 @@ def get_recommendations():
                          items = search_google_shopping(q, 4)
                          all_recommended_products.extend(items)
                     
-                    import random
-                    random.shuffle(all_recommended_products)
+                    # Rank locally against the user's recent searches
+                    ranked = rank_products(
+                        all_recommended_products,
+                        top_k=len(all_recommended_products),
+                        search_history=[h['query'] for h in user_history[:20]],
+                        weights=shopping_ranker.weights()
+                    )
                     return jsonify({
                         'success': True,
-                        'recommendations': all_recommended_products,
+                        'recommendations': ranked,
                         'reason': f"Based on recent searches: {', '.join(top_queries[:2])}",
-                        'source_queries': top_queries
+                        'source_queries': top_queries,
+                        # an AI curated list is being prepared for the next request
+                        'ai_pending': ai_pending
                     })
 
         # Fallback if no user history found or no user logged in
@@ -551,26 +592,14 @@ def analyze_product_wastage():
             "eco_tip": "Buy only what you need for the week."
         }
 
-        # REAL AI ANALYSIS
-        if GEMINI_API_KEY:
+        # REAL AI ANALYSIS (cached per product name)
+        if GEMINI_ENABLED:
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=GEMINI_API_KEY)
-                model = genai.GenerativeModel('models/gemini-flash-latest')
-                
-                prompt = (
-                    f"Analyze the food item '{product_name}' for kitchen wastage management.\n"
-                    f"Provide a JSON response with these keys:\n"
-                    f"- shelf_life: (e.g. '3-5 Days' or '1 Month')\n"
-                    f"- storage_tip: (Best way to prolong freshness, max 10 words)\n"
-                    f"- wastage_risk: ('High', 'Medium', or 'Low')\n"
-                    f"- eco_tip: (Advice to reduce waste, max 10 words)\n"
-                    f"Return ONLY raw JSON. No markdown."
+                analysis = llm_cache.get(
+                    'analyze-product',
+                    product_name,
+                    lambda: gemini_product_analysis(product_name)
                 )
-                
-                response = model.generate_content(prompt)
-                text = response.text.replace('```json', '').replace('```', '').strip()
-                analysis = json.loads(text)
             except Exception as e:
                 print(f"AI Analysis failed: {e}")
 
@@ -645,9 +674,8 @@ def predict_needs():
         if not user_id:
              return jsonify({'success': False, 'error': 'User not found'}), 404
 
-        # 1. Load User History
-        all_history = load_history()
-        user_history = [h for h in all_history if h['user_id'] == user_id]
+        # 1. Load recent User History (the long-term profile is kept by the history store)
+        user_history = get_user_history(user_id, limit=30)
         
         if not user_history:
             return jsonify({
@@ -664,13 +692,13 @@ def predict_needs():
         # HYBRID AI SYSTEM: "Training" + "Inference"
         # ---------------------------------------------------------
         
-        # STEP 1: "Train" (Build/Update the User Profile Model)
-        # We process the raw history to extract high-level "features" (Long-term Memory)
-        learned_profile = train_personal_model(user_id)
+        # STEP 1: Learned User Profile (Long-term Memory)
+        # Keyword / weekday counters updated incrementally with every history change
+        learned_profile = get_shopping_profile(user_id)
         
         # STEP 2: Prepare Context (Short-term Memory)
         # Limit to last 30 interactions for immediate context
-        recent_history = sorted(user_history, key=lambda x: x.get('timestamp', ''), reverse=True)[:30]
+        recent_history = user_history[:30]
         
         history_summary = []
         for h in recent_history:
@@ -686,12 +714,8 @@ def predict_needs():
         current_date = datetime.datetime.now().strftime("%Y-%m-%d (%A)")
 
         # STEP 3: Inference (Gemini uses both Learned Profile + Recent Context)
-        if GEMINI_API_KEY:
+        if GEMINI_ENABLED:
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=GEMINI_API_KEY)
-                model = genai.GenerativeModel('models/gemini-flash-latest') # Updated model
-                
                 # Construct a sophisticated prompt that uses the "Model" we just trained
                 prompt = (
                     f"Act as an Advanced AI Dietitian & Data Scientist.\n\n"
@@ -716,16 +740,8 @@ def predict_needs():
                     f"{{ \"preferences\": [\"...\"], \"weekend_habit\": \"...\", \"meal_plan\": {{ \"breakfast\": \"...\", \"lunch\": \"...\", \"dinner\": \"...\" }}, \"reasoning\": \"...\" }}"
                 )
                 
-                # Try specific models if the default alias fails (Error handling wrapper)
-                try:
-                     response = model.generate_content(prompt)
-                except Exception as model_err:
-                     print(f"Primary model failed, trying fallback: {model_err}")
-                     model = genai.GenerativeModel('models/gemini-pro-latest')
-                     response = model.generate_content(prompt)
-
-                text_response = response.text.replace('```json', '').replace('```', '').strip()
-                prediction_data = json.loads(text_response)
+                # Same profile + activity + date -> same prediction (cached)
+                prediction_data = llm_cache.get('predict-needs', prompt, lambda: gemini_predict_needs(prompt))
                 
                 return jsonify({
                     'success': True,
@@ -776,76 +792,6 @@ def predict_needs():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-# =================================== MODEL TRAINING (LOCAL) ===================================
-
-USER_PROFILES_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'user_profiles.json')
-
-def train_personal_model(user_id):
-    """
-    Simulates a 'Training Step'. 
-    Analyzes raw history to build a persistent User Profile (Weights/Features).
-    """
-    print(f"Training model for user: {user_id}...")
-    
-    # 1. Load Data
-    all_history = load_history()
-    user_history = [h for h in all_history if h['user_id'] == user_id]
-    
-    if not user_history:
-        return {}
-
-    # 2. Extract Features (The "Learning" Process)
-    from collections import Counter
-    
-    # Feature A: Keyword Frequency (Bag of Words)
-    all_queries = " ".join([h['query'].lower() for h in user_history])
-    ignore_words = {'the', 'a', 'in', 'of', 'for', 'to', 'recipe', 'how', 'make', 'cook', 'buy', 'price'}
-    words = [w for w in re.findall(r'\b\w+\b', all_queries) if w not in ignore_words and len(w) > 2]
-    keyword_counts = Counter(words)
-    top_keywords = [item[0] for item in keyword_counts.most_common(5)]
-    
-    # Feature B: Time Pattern
-    # Analyze if they shop mostly on weekends
-    weekend_count = 0
-    weekday_count = 0
-    for h in user_history:
-        try:
-             dt = datetime.datetime.fromisoformat(h.get('timestamp', ''))
-             if dt.weekday() >= 5: # 5=Sat, 6=Sun
-                 weekend_count += 1
-             else:
-                 weekday_count += 1
-        except:
-            pass
-            
-    shopping_pattern = "Weekend Shopper" if weekend_count > weekday_count else "Weekday Planner"
-    
-    # 3. Build & Save Model (Profile)
-    # Load existing profiles
-    profiles = {}
-    if os.path.exists(USER_PROFILES_FILE):
-        try:
-            with open(USER_PROFILES_FILE, 'r') as f:
-                profiles = json.load(f)
-        except:
-             profiles = {}
-             
-    # Update this user's profile "weights"
-    profiles[user_id] = {
-        'last_trained': datetime.datetime.now().isoformat(),
-        'top_keywords': top_keywords,
-        'shopping_pattern': shopping_pattern,
-        'data_points': len(user_history)
-    }
-    
-    # Persist the "Trained Model"
-    os.makedirs(os.path.dirname(USER_PROFILES_FILE), exist_ok=True)
-    with open(USER_PROFILES_FILE, 'w') as f:
-        json.dump(profiles, f, indent=2)
-        
-    print(f"Model trained. Profile saved for {user_id}.")
-    return profiles[user_id]
-
 @shopping_bp.route('/api/shopping/history', methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 @cross_origin(
     origins=['http://localhost:5173', 'http://127.0.0.1:5173'],
@@ -895,12 +841,8 @@ def shopping_history():
             return jsonify({'success': False, 'error': 'No id provided'}), 400
 
         # GET method
-        all_history = load_history()
-        user_history = [h for h in all_history if h['user_id'] == user_id]
-        # Sort by timestamp desc
-        user_history.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return jsonify(user_history), 200
+        # newest first
+        return jsonify(get_user_history(user_id)), 200
 
     except Exception as e:
         print(f"History error: {e}")
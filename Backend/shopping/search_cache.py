@@ -0,0 +1,147 @@
+"""
+In-process cache for parsed Google Shopping (SerpAPI) results.
+
+Entries are keyed by (normalized query, country code) and hold the whole
+parsed product list, so every page / max_results slice of the same search is
+served from one upstream call.
+
+    age < ttl                 fresh, returned as is
+    ttl <= age < ttl + stale  returned immediately, refreshed in the background
+    older / missing           fetched (blocking)
+
+Concurrent misses for the same key share one upstream call (the first caller
+fetches, the others wait for its result). A fetch that returns None (upstream
+failed -> caller uses fallback products) is never cached.
+
+With a persist_path the cache is written to a JSON file after every
+successful fetch and reloaded on start, so results survive restarts.
+"""
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SEARCH_CACHE_TTL = float(os.getenv('SHOPPING_SEARCH_CACHE_TTL', '900'))        # 15 min fresh
+SEARCH_CACHE_STALE = float(os.getenv('SHOPPING_SEARCH_CACHE_STALE', '3600'))   # then 1 h stale-while-revalidate
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SHOPPING_SEARCH_CACHE_MAX_ENTRIES', '512'))
+# '' = memory only; data/shopping_search_cache.json is git-ignored
+SEARCH_CACHE_FILE = os.getenv('SHOPPING_SEARCH_CACHE_FILE', '')
+
+
+def normalize_query(query):
+    return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+
+class SearchCache:
+    def __init__(self, ttl=SEARCH_CACHE_TTL, stale=SEARCH_CACHE_STALE,
+                 max_entries=SEARCH_CACHE_MAX_ENTRIES, persist_path=None):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self.persist_path = persist_path or None
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (fetched_at wall time, products)
+        self._inflight = {}             # key -> threading.Event
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'refreshes': 0}
+
+        if self.persist_path:
+            self._load()
+
+    # ---------------------------------------------------------------
+    def get(self, key, fetch):
+        """
+        Cached product list for key, calling fetch() (-> list or None) when needed.
+        Returns None only if there is no usable entry and fetch() failed.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                age = time.time() - entry[0] if entry else None
+
+                if entry and age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(entry[1])
+
+                if entry and age < self.ttl + self.stale:
+                    self._entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        self.stats['refreshes'] += 1
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return copy.deepcopy(entry[1])
+
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    self.stats['misses'] += 1
+                    break
+                self.stats['coalesced'] += 1
+
+            # someone else is fetching this key: wait, then re-check the cache
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or time.time() - entry[0] >= self.ttl + self.stale:
+                    # their fetch failed; don't stampede the upstream, let the caller fall back
+                    return None
+                return copy.deepcopy(entry[1])
+
+        return copy.deepcopy(self._refresh(key, fetch))
+
+    def _refresh(self, key, fetch):
+        products = None
+        try:
+            products = fetch()
+        except Exception as e:
+            print(f"Search cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                if products is not None:
+                    self._entries[key] = (time.time(), products)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                self._inflight.pop(key).set()
+
+        if products is not None and self.persist_path:
+            self._save()
+        return products
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ---------------------------------------------------------------
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r') as f:
+                data = json.load(f) or []
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable search cache {self.persist_path}: {e}")
+            return
+
+        now = time.time()
+        for item in data[-self.max_entries:]:
+            fetched_at = float(item.get('fetched_at', 0))
+            if now - fetched_at < self.ttl + self.stale:
+                self._entries[tuple(item['key'])] = (fetched_at, item['products'])
+
+    def _save(self):
+        with self._lock:
+            data = [{'key': list(k), 'fetched_at': v[0], 'products': v[1]} for k, v in self._entries.items()]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp = f"{self.persist_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.persist_path)
+        except OSError as e:
+            print(f"Could not persist search cache: {e}")
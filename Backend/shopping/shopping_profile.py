@@ -0,0 +1,158 @@
+"""
+Per-user shopping profile kept up to date incrementally.
+
+Replaces retraining on every /api/shopping/predict-needs request (reload the
+whole history, re-tokenize every query, recount, rewrite user_profiles.json).
+The profile is a set of counters in the history database, changed in the
+same transaction as the history row that causes the change:
+
+    profile_keywords (user_id, word)  count, last_seen
+    profile_stats    (user_id)        data_points, weekday, weekend, updated_at
+
+A new entry adds its query words and its weekday / weekend tally, a deletion
+subtracts them and an edit does both, so reading a profile is two indexed
+lookups. rebuild_profiles recomputes the counters from the history rows
+(backfill / repair).
+
+Every function takes an open connection from history_store; callers own the
+transaction.
+"""
+import datetime
+import re
+from collections import Counter
+
+# Words that say nothing about what the user shops for
+IGNORE_WORDS = {'the', 'a', 'in', 'of', 'for', 'to', 'recipe', 'how', 'make', 'cook', 'buy', 'price'}
+
+TOP_KEYWORDS = 5
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+def create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS profile_keywords (
+            user_id TEXT NOT NULL,
+            word TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (user_id, word)
+        )"""
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_profile_keywords_rank ON profile_keywords (user_id, count)')
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS profile_stats (
+            user_id TEXT PRIMARY KEY,
+            data_points INTEGER NOT NULL DEFAULT 0,
+            weekday INTEGER NOT NULL DEFAULT 0,
+            weekend INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )"""
+    )
+
+
+def keywords(query):
+    """Profile words of one query (lower-cased, stop words and words under 3 letters dropped)"""
+    return [w for w in _WORD_RE.findall((query or '').lower()) if w not in IGNORE_WORDS and len(w) > 2]
+
+
+def day_kind(timestamp):
+    """'weekend' / 'weekday' for an ISO timestamp, None if it does not parse"""
+    try:
+        return 'weekend' if datetime.datetime.fromisoformat(timestamp or '').weekday() >= 5 else 'weekday'
+    except (TypeError, ValueError):
+        return None
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def apply_entry(conn, user_id, query, timestamp, sign=1):
+    """Add (sign=1) or remove (sign=-1) one history entry's contribution"""
+    now = _now()
+    counts = Counter(keywords(query))
+    if sign > 0:
+        conn.executemany(
+            'INSERT INTO profile_keywords (user_id, word, count, last_seen) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (user_id, word) DO UPDATE SET count = count + excluded.count, last_seen = excluded.last_seen',
+            [(user_id, w, c, timestamp or now) for w, c in counts.items()],
+        )
+    elif counts:
+        conn.executemany(
+            'UPDATE profile_keywords SET count = count - ? WHERE user_id = ? AND word = ?',
+            [(c, user_id, w) for w, c in counts.items()],
+        )
+        conn.execute('DELETE FROM profile_keywords WHERE user_id = ? AND count <= 0', (user_id,))
+
+    kind = day_kind(timestamp)
+    conn.execute(
+        'INSERT INTO profile_stats (user_id, data_points, weekday, weekend, updated_at) VALUES (?, ?, ?, ?, ?) '
+        'ON CONFLICT (user_id) DO UPDATE SET data_points = data_points + excluded.data_points, '
+        'weekday = weekday + excluded.weekday, weekend = weekend + excluded.weekend, updated_at = excluded.updated_at',
+        (user_id, sign, sign if kind == 'weekday' else 0, sign if kind == 'weekend' else 0, now),
+    )
+
+
+def move_timestamp(conn, user_id, old_timestamp, new_timestamp):
+    """An entry's timestamp changed (dedup refresh / edit): move its weekday / weekend tally"""
+    old_kind, new_kind = day_kind(old_timestamp), day_kind(new_timestamp)
+    if old_kind == new_kind:
+        return
+    conn.execute(
+        'UPDATE profile_stats SET weekday = weekday + ?, weekend = weekend + ?, updated_at = ? WHERE user_id = ?',
+        (
+            (new_kind == 'weekday') - (old_kind == 'weekday'),
+            (new_kind == 'weekend') - (old_kind == 'weekend'),
+            _now(),
+            user_id,
+        ),
+    )
+
+
+def clear_profile(conn, user_id):
+    conn.execute('DELETE FROM profile_keywords WHERE user_id = ?', (user_id,))
+    conn.execute('DELETE FROM profile_stats WHERE user_id = ?', (user_id,))
+
+
+def rebuild_profiles(conn, user_id=None):
+    """
+    Recompute the counters from the history table, for one user or everyone.
+    Returns the number of history rows processed.
+    """
+    if user_id is None:
+        conn.execute('DELETE FROM profile_keywords')
+        conn.execute('DELETE FROM profile_stats')
+        rows = conn.execute('SELECT user_id, query, timestamp FROM history ORDER BY seq')
+    else:
+        clear_profile(conn, user_id)
+        rows = conn.execute('SELECT user_id, query, timestamp FROM history WHERE user_id = ? ORDER BY seq', (user_id,))
+
+    count = 0
+    for row in rows.fetchall():
+        apply_entry(conn, row['user_id'], row['query'], row['timestamp'])
+        count += 1
+    return count
+
+
+def read_profile(conn, user_id):
+    """
+    {'last_trained', 'top_keywords', 'shopping_pattern', 'data_points'}
+    ({} for a user without history) - the shape the retrained profile had.
+    """
+    stats = conn.execute('SELECT * FROM profile_stats WHERE user_id = ?', (user_id,)).fetchone()
+    if stats is None or stats['data_points'] <= 0:
+        return {}
+
+    # ties: most recently used word first
+    words = conn.execute(
+        'SELECT word FROM profile_keywords WHERE user_id = ? AND count > 0 '
+        'ORDER BY count DESC, last_seen DESC, word LIMIT ?',
+        (user_id, TOP_KEYWORDS),
+    ).fetchall()
+    return {
+        'last_trained': stats['updated_at'],
+        'top_keywords': [w['word'] for w in words],
+        'shopping_pattern': 'Weekend Shopper' if stats['weekend'] > stats['weekday'] else 'Weekday Planner',
+        'data_points': stats['data_points'],
+    }
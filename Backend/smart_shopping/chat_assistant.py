@@ -2,11 +2,11 @@
 Context-Aware Chat Assistant
 Uses OpenAI to provide intelligent shopping assistance
 """
-import os
 from typing import List, Dict, Optional
-from openai import OpenAI
 import json
 
+from integrations import guarded_call, openai_client
+
 
 class ChatAssistant:
     """AI-powered chat assistant for shopping guidance"""
@@ -15,12 +15,11 @@ class ChatAssistant:
         self.openai_client = None
         self.conversation_history = []
         
-        api_key = os.getenv('OPENAI_API_KEY', '')
-        if api_key:
-            try:
-                self.openai_client = OpenAI(api_key=api_key)
-            except Exception as e:
-                print(f"OpenAI initialization error: {str(e)}")
+        try:
+            # shared per-process client (None without OPENAI_API_KEY)
+            self.openai_client = openai_client()
+        except Exception as e:
+            print(f"OpenAI initialization error: {str(e)}")
     
     def get_response(
         self,
@@ -76,7 +75,9 @@ Keep responses brief (1-2 sentences) and actionable."""
                 "content": user_message + context_info
             })
             
-            response = self.openai_client.chat.completions.create(
+            response = guarded_call(
+                'openai',
+                self.openai_client.chat.completions.create,
                 model="gpt-3.5-turbo",
                 messages=messages,
                 temperature=0.7,
@@ -1,23 +1,39 @@
 """
 Currency Conversion Module
-Uses forex-python for real-time currency conversion
+Uses forex-python rates, cached as a rate table (see rate_table.py)
 """
 from forex_python.converter import CurrencyRates, CurrencyCodes
 from typing import Optional, Dict
-from datetime import datetime
+
+import numpy as np
+
+from .rate_table import RateTableService, round_money
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
 
 
 class CurrencyConverter:
     """Handles currency conversion for product prices"""
     
-    def __init__(self):
+    def __init__(self, rate_service: Optional[RateTableService] = None):
+        self.currency_rates = None
+        self.currency_codes = None
         try:
             self.currency_rates = CurrencyRates()
             self.currency_codes = CurrencyCodes()
         except Exception as e:
             print(f"Currency converter initialization error: {str(e)}")
-            self.currency_rates = None
-            self.currency_codes = None
+        
+        if rate_service is None:
+            # one get_rates call per refresh interval instead of get_rate per price
+            fetch = self.currency_rates.get_rates if self.currency_rates else None
+            rate_service = RateTableService(fetch=fetch)
+        self.rate_service = rate_service
     
     def convert_price(
         self,
@@ -36,61 +52,46 @@ class CurrencyConverter:
             'symbol': str
         }
         """
-        if from_currency == to_currency:
-            return {
-                'original_amount': amount,
-                'converted_amount': amount,
-                'from_currency': from_currency,
-                'to_currency': to_currency,
-                'rate': 1.0,
-                'symbol': self._get_symbol(to_currency)
-            }
+        rate = 1.0 if from_currency == to_currency else self.rate_service.table().rate(from_currency, to_currency)
+        converted = round_money(_to_float(amount) * rate, to_currency)
         
-        if not self.currency_rates:
-            # Fallback to mock rates if forex-python not available
-            return self._mock_convert(amount, from_currency, to_currency)
-        
-        try:
-            rate = self.currency_rates.get_rate(from_currency, to_currency)
-            converted = amount * rate
-            
-            return {
-                'original_amount': amount,
-                'converted_amount': round(converted, 2),
-                'from_currency': from_currency,
-                'to_currency': to_currency,
-                'rate': round(rate, 4),
-                'symbol': self._get_symbol(to_currency)
-            }
-        except Exception as e:
-            print(f"Currency conversion error: {str(e)}")
-            return self._mock_convert(amount, from_currency, to_currency)
+        return {
+            'original_amount': amount,
+            'converted_amount': float(converted),
+            'from_currency': from_currency,
+            'to_currency': to_currency,
+            'rate': round(rate, 4),
+            'symbol': self._get_symbol(to_currency)
+        }
     
     def convert_product_prices(
         self,
         products: list,
         target_currency: str = 'USD'
     ) -> list:
-        """Convert prices for a list of products"""
-        converted_products = []
+        """Convert prices for a list of products (one rate table read, one vectorized pass)"""
+        if not products:
+            return []
         
-        for product in products:
-            product_currency = product.get('currency', 'USD')
-            original_price = product.get('price', 0)
-            
-            conversion = self.convert_price(
-                original_price,
-                product_currency,
-                target_currency
-            )
-            
+        currencies = [product.get('currency', 'USD') for product in products]
+        original_prices = [product.get('price', 0) for product in products]
+        
+        rates = self.rate_service.table().rates(currencies, target_currency)
+        prices = np.fromiter((_to_float(p) for p in original_prices), dtype=np.float64, count=len(products))
+        converted = round_money(prices * rates, target_currency)
+        symbol = self._get_symbol(target_currency)
+        
+        converted_products = []
+        for product, currency, original_price, price, rate in zip(
+            products, currencies, original_prices, converted.tolist(), rates.tolist()
+        ):
             product_copy = product.copy()
-            product_copy['price'] = conversion['converted_amount']
+            product_copy['price'] = price
             product_copy['original_price'] = original_price
-            product_copy['original_currency'] = product_currency
+            product_copy['original_currency'] = currency
             product_copy['currency'] = target_currency
-            product_copy['currency_symbol'] = conversion['symbol']
-            product_copy['conversion_rate'] = conversion['rate']
+            product_copy['currency_symbol'] = symbol
+            product_copy['conversion_rate'] = round(rate, 4)
             
             converted_products.append(product_copy)
         
@@ -110,40 +111,3 @@ class CurrencyConverter:
             'CAD': 'C$'
         }
         return symbols.get(currency_code, currency_code)
-    
-    def _mock_convert(
-        self,
-        amount: float,
-        from_currency: str,
-        to_currency: str
-    ) -> Dict:
-        """Mock currency conversion (fallback)"""
-        # Mock exchange rates (approximate)
-        mock_rates = {
-            'USD': {'EUR': 0.92, 'GBP': 0.79, 'INR': 83.0, 'LKR': 325.0},
-            'EUR': {'USD': 1.09, 'GBP': 0.86, 'INR': 90.0, 'LKR': 353.0},
-            'GBP': {'USD': 1.27, 'EUR': 1.16, 'INR': 105.0, 'LKR': 411.0},
-            'INR': {'USD': 0.012, 'EUR': 0.011, 'GBP': 0.0095, 'LKR': 3.9},
-            'LKR': {'USD': 0.0031, 'EUR': 0.0028, 'GBP': 0.0024, 'INR': 0.26}
-        }
-        
-        if from_currency == to_currency:
-            rate = 1.0
-        elif from_currency in mock_rates and to_currency in mock_rates[from_currency]:
-            rate = mock_rates[from_currency][to_currency]
-        elif to_currency in mock_rates and from_currency in mock_rates[to_currency]:
-            rate = 1 / mock_rates[to_currency][from_currency]
-        else:
-            rate = 1.0  # Default if currency not in mock rates
-        
-        converted = amount * rate
-        
-        return {
-            'original_amount': amount,
-            'converted_amount': round(converted, 2),
-            'from_currency': from_currency,
-            'to_currency': to_currency,
-            'rate': round(rate, 4),
-            'symbol': self._get_symbol(to_currency)
-        }
-
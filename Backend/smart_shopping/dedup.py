@@ -0,0 +1,151 @@
+"""
+Product Deduplication
+Near-duplicate detection over product titles with MinHash + LSH banding
+"""
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Two titles are duplicates when the Jaccard similarity of their word sets is above this
+DEDUP_THRESHOLD = float(os.getenv('PRODUCT_DEDUP_THRESHOLD', '0.8'))
+
+# 16 bands x 4 rows: pairs at Jaccard 0.8 become candidates with p > 0.999,
+# pairs below ~0.4 rarely do. Candidates are always confirmed with exact Jaccard.
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(1234)
+_PERM_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64)
+
+
+def tokenize(name: str) -> frozenset:
+    """Lower-cased word set of a title (same tokens the old pairwise check used)"""
+    return frozenset((name or '').lower().split())
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def minhash_signatures(token_sets: List[frozenset]) -> np.ndarray:
+    """
+    (n x NUM_PERM) MinHash signatures. Every distinct token is hashed and
+    permuted once; signatures are a segmented min over the token rows.
+    Empty sets get an all-max signature (and are never matched).
+    """
+    vocab = {}
+    flat, starts = [], []
+    for tokens in token_sets:
+        starts.append(len(flat))
+        for t in tokens:
+            flat.append(vocab.setdefault(t, len(vocab)))
+
+    sig = np.full((len(token_sets), NUM_PERM), np.iinfo(np.uint64).max, dtype=np.uint64)
+    if not flat:
+        return sig
+
+    hashes = np.fromiter((_token_hash(t) for t in vocab), dtype=np.uint64, count=len(vocab))
+    permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _PRIME   # (vocab x NUM_PERM)
+    rows = permuted[np.asarray(flat)]
+
+    non_empty = np.asarray([len(t) > 0 for t in token_sets])
+    starts = np.asarray(starts)[non_empty]
+    sig[non_empty] = np.minimum.reduceat(rows, starts, axis=0)
+    return sig
+
+
+def _lsh_buckets(sig: np.ndarray, token_sets: List[frozenset]):
+    """Members (in input order) of every band bucket holding more than one product"""
+    buckets = {}
+    for band in range(NUM_BANDS):
+        cols = sig[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        for i, row in enumerate(cols):
+            if token_sets[i]:
+                buckets.setdefault((band, row.tobytes()), []).append(i)
+    return [m for m in buckets.values() if len(m) > 1]
+
+
+def _rank_key(product: Dict):
+    """Best duplicate first: lowest positive price, then highest rating"""
+    try:
+        price = float(product.get('price') or 0)
+    except (TypeError, ValueError):
+        price = 0.0
+    try:
+        rating = float(product.get('rating') or 0)
+    except (TypeError, ValueError):
+        rating = 0.0
+    return (price if price > 0 else float('inf'), -rating)
+
+
+def deduplicate(products: List[Dict], threshold: Optional[float] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Collapse near-duplicate products (title word-set Jaccard > threshold).
+
+    Returns (unique, clusters):
+      unique   one product per cluster - the best priced / highest rated -
+               in the position of the cluster's first member
+      clusters for every cluster with duplicates:
+               {'kept': index, 'members': [indexes], 'names': [...]}
+               (indexes into the input list)
+    """
+    threshold = DEDUP_THRESHOLD if threshold is None else threshold
+    n = len(products)
+    if n < 2:
+        return list(products), []
+
+    token_sets = [tokenize(p.get('name', '')) for p in products]
+    sig = minhash_signatures(token_sets)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # inside a bucket, each product is only compared with one representative
+    # per cluster seen so far, so big groups of copies stay linear
+    for members in _lsh_buckets(sig, token_sets):
+        reps = []
+        for i in members:
+            ri = find(i)
+            for r in reps:
+                rr = find(r)
+                if rr == ri:
+                    break
+                if jaccard(token_sets[r], token_sets[i]) > threshold:
+                    parent[max(rr, ri)] = min(rr, ri)
+                    break
+            else:
+                reps.append(i)
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+
+    unique, clusters = [], []
+    for root in sorted(groups):
+        members = groups[root]
+        best = min(members, key=lambda i: (_rank_key(products[i]), i))
+        unique.append(products[best])
+        if len(members) > 1:
+            clusters.append({
+                'kept': best,
+                'members': members,
+                'names': [products[i].get('name', '') for i in members],
+            })
+
+    return unique, clusters
@@ -0,0 +1,144 @@
+"""
+Fake Product Provider Server
+Local stand-in for the eBay Finding API and the RapidAPI product search, so
+ProductAggregator can be exercised offline (latency, timeouts, errors).
+
+Run:
+    python -m smart_shopping.fake_provider_server --port 8765 --ebay-delay 0.2 --rapidapi-delay 3
+
+Then point the clients at it (any non-default key enables the HTTP path):
+    EBAY_APP_ID=fake EBAY_API_BASE_URL=http://127.0.0.1:8765/ebay
+    RAPIDAPI_KEY=fake RAPIDAPI_BASE_URL=http://127.0.0.1:8765/rapidapi
+
+Per request, ?fake_delay=<seconds> / ?fake_status=<code> override the
+configured behaviour of the provider being called.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def _fake_items(query: str, count: int) -> List[Dict]:
+    return [
+        {'id': f'{abs(hash((query, i))) % 100000}', 'title': f'{query.title()} Model {i + 1}', 'price': round(10 + 7.5 * i, 2)}
+        for i in range(count)
+    ]
+
+
+def ebay_payload(query: str, count: int = 5) -> Dict:
+    """Response shaped like findItemsByKeywords (JSON)"""
+    items = []
+    for it in _fake_items(query, count):
+        items.append({
+            'itemId': [it['id']],
+            'title': [it['title']],
+            'sellingStatus': [{'currentPrice': [{'__value__': str(it['price']), '@currencyId': 'USD'}]}],
+            'galleryURL': [''],
+            'viewItemURL': [f"https://www.ebay.com/itm/{it['id']}"],
+            'primaryCategory': [{'categoryName': ['electronics']}],
+        })
+    return {'findItemsByKeywordsResponse': [{'searchResult': [{'item': items}]}]}
+
+
+def rapidapi_payload(query: str, count: int = 5) -> Dict:
+    """Response shaped like the RapidAPI Amazon product search"""
+    return {
+        'results': [
+            {
+                'asin': f"B0{it['id']}",
+                'title': f"{it['title']} (Amazon)",
+                'price': {'value': it['price'], 'currency': 'USD'},
+                'image': '',
+                'url': f"https://www.amazon.com/dp/B0{it['id']}",
+                'rating': 4.2,
+                'category': 'electronics',
+            }
+            for it in _fake_items(query, count)
+        ]
+    }
+
+
+class FakeProviderConfig:
+    """Behaviour of each fake provider: delay (seconds), error rate (0..1), items per response"""
+
+    def __init__(self, ebay_delay: float = 0.0, rapidapi_delay: float = 0.0, error_rate: float = 0.0, items: int = 5):
+        self.delays = {'ebay': ebay_delay, 'rapidapi': rapidapi_delay}
+        self.error_rate = error_rate
+        self.items = items
+
+
+def _make_handler(config: FakeProviderConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if url.path.startswith('/ebay'):
+                provider, query = 'ebay', params.get('keywords', '')
+            elif url.path.startswith('/rapidapi/search'):
+                provider, query = 'rapidapi', params.get('query', '')
+            else:
+                return self._send(404, {'error': 'unknown endpoint'})
+
+            time.sleep(float(params.get('fake_delay', config.delays[provider])))
+
+            status = int(params.get('fake_status', 200))
+            if status == 200 and random.random() < config.error_rate:
+                status = 503
+            if status != 200:
+                return self._send(status, {'error': f'fake {provider} failure'})
+
+            payload = ebay_payload(query, config.items) if provider == 'ebay' else rapidapi_payload(query, config.items)
+            self._send(200, payload)
+
+        def _send(self, status: int, body: Dict):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_provider_server(port: int = 0, config: Optional[FakeProviderConfig] = None):
+    """
+    Start the server on a background thread (port 0 = any free port).
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(config or FakeProviderConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake eBay / RapidAPI product providers')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ebay-delay', type=float, default=0.0)
+    parser.add_argument('--rapidapi-delay', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--items', type=int, default=5)
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(args.ebay_delay, args.rapidapi_delay, args.error_rate, args.items)
+    server, base_url = start_fake_provider_server(args.port, config)
+    print(f"Fake providers on {base_url}  (eBay: {base_url}/ebay, RapidAPI: {base_url}/rapidapi)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
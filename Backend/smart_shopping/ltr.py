@@ -0,0 +1,303 @@
+"""
+Learning-to-Rank
+Pairwise linear ranker trained from logged search impressions and clicks
+
+Every smart-shopping search logs the products it showed together with their
+ranking feature scores (ranking.SCORING_FEATURES, as computed when serving),
+and clicks are logged against the search. Training fits a logistic
+regression on feature differences of (clicked, not clicked) pairs from the
+same search, weighted against position bias, so the model is a weight per
+ranking feature: it plugs into ranking.rank_products as its weights and
+serving stays a dot product.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .ranking import SCORING_FEATURES
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CLICK_DB = os.getenv('SHOPPING_CLICK_DB', os.path.join(DATA_DIR, 'shopping_clicks.db'))
+LTR_MODEL_PATH = os.getenv('SHOPPING_LTR_MODEL', os.path.join(os.path.dirname(__file__), 'models', 'shopping_ranker.json'))
+
+LTR_FEATURES = list(SCORING_FEATURES)
+
+# non-clicked products paired with each click (the closest positions)
+MAX_NEGATIVES_PER_CLICK = 20
+
+
+class ClickLog:
+    """SQLite log of shown products (with their feature scores) and clicks"""
+
+    def __init__(self, db_path: str = CLICK_DB):
+        self.db_path = db_path
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._schema_ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS searches (
+                    search_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    query TEXT,
+                    features TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS impressions (
+                    search_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    product_id TEXT NOT NULL,
+                    features TEXT NOT NULL,
+                    PRIMARY KEY (search_id, position)
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS clicks (
+                    search_id TEXT NOT NULL,
+                    product_id TEXT NOT NULL,
+                    clicked_at TEXT NOT NULL
+                )"""
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_clicks_search ON clicks (search_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_searches_created ON searches (created_at)')
+            self._schema_ready = True
+        return conn
+
+    def log_impressions(self, user_id: str, query: str, products: List[Dict], X: np.ndarray,
+                        feature_names: Optional[List[str]] = None) -> str:
+        """Record a result list (in shown order) with its (products x features) scores; returns the search_id"""
+        search_id = uuid.uuid4().hex
+        now = datetime.datetime.utcnow().isoformat()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN')
+            conn.execute(
+                'INSERT INTO searches (search_id, user_id, query, features, created_at) VALUES (?, ?, ?, ?, ?)',
+                (search_id, user_id, query, json.dumps(feature_names or LTR_FEATURES), now),
+            )
+            conn.executemany(
+                'INSERT INTO impressions (search_id, position, product_id, features) VALUES (?, ?, ?, ?)',
+                [
+                    (search_id, pos, str(p.get('id', pos)), json.dumps([round(float(v), 6) for v in row]))
+                    for pos, (p, row) in enumerate(zip(products, X))
+                ],
+            )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        return search_id
+
+    def log_click(self, search_id: str, product_id: str) -> bool:
+        """Record a click; False if the product was not shown in that search"""
+        conn = self._connect()
+        try:
+            shown = conn.execute(
+                'SELECT 1 FROM impressions WHERE search_id = ? AND product_id = ?', (search_id, str(product_id))
+            ).fetchone()
+            if not shown:
+                return False
+            conn.execute(
+                'INSERT INTO clicks (search_id, product_id, clicked_at) VALUES (?, ?, ?)',
+                (search_id, str(product_id), datetime.datetime.utcnow().isoformat()),
+            )
+            return True
+        finally:
+            conn.close()
+
+    def sessions(self, since: Optional[str] = None) -> List[Dict]:
+        """
+        Searches with at least one click, oldest first:
+        {'search_id', 'created_at', 'X' (shown products x LTR_FEATURES), 'clicked' (bool per product)}
+        """
+        conn = self._connect()
+        try:
+            sql = ('SELECT s.search_id, s.created_at, s.features FROM searches s '
+                   'WHERE EXISTS (SELECT 1 FROM clicks c WHERE c.search_id = s.search_id)')
+            params = []
+            if since:
+                sql += ' AND s.created_at >= ?'
+                params.append(since)
+            sql += ' ORDER BY s.created_at'
+
+            out = []
+            for search_id, created_at, names in conn.execute(sql, params).fetchall():
+                names = json.loads(names)
+                rows = conn.execute(
+                    'SELECT product_id, features FROM impressions WHERE search_id = ? ORDER BY position', (search_id,)
+                ).fetchall()
+                clicked_ids = {r[0] for r in conn.execute('SELECT product_id FROM clicks WHERE search_id = ?', (search_id,))}
+                if len(rows) < 2:
+                    continue
+
+                logged = np.asarray([json.loads(r[1]) for r in rows], dtype=np.float64)
+                # features added after the search was logged count as 0
+                X = np.zeros((len(rows), len(LTR_FEATURES)))
+                for j, name in enumerate(LTR_FEATURES):
+                    if name in names:
+                        X[:, j] = logged[:, names.index(name)]
+
+                out.append({
+                    'search_id': search_id,
+                    'created_at': created_at,
+                    'X': X,
+                    'clicked': np.asarray([r[0] in clicked_ids for r in rows]),
+                })
+            return out
+        finally:
+            conn.close()
+
+
+# ------------------------------------------------------------------
+# Training / evaluation
+# ------------------------------------------------------------------
+def position_propensity(sessions: List[Dict], max_positions: int = 50) -> np.ndarray:
+    """
+    Examination propensity per shown position (1.0 at the top), estimated from
+    the click-through rate by position, kept non-increasing and >= 0.05.
+    """
+    shown = np.zeros(max_positions)
+    clicks = np.zeros(max_positions)
+    for s in sessions:
+        n = min(len(s['clicked']), max_positions)
+        shown[:n] += 1
+        clicks[:n] += s['clicked'][:n]
+
+    ctr = np.divide(clicks, shown, out=np.zeros(max_positions), where=shown > 0)
+    if ctr[0] <= 0:
+        return np.ones(max_positions)
+    return np.clip(np.minimum.accumulate(ctr / ctr[0]), 0.05, 1.0)
+
+
+def pairwise_data(sessions: List[Dict], propensity: Optional[np.ndarray] = None):
+    """
+    (X_diff, y, sample_weight): clicked - not clicked -> 1, the mirrored pair -> 0.
+
+    Products near the top get clicked just for being seen first, so each
+    click's pairs are weighted by 1 / propensity of its position (inverse
+    propensity weighting); otherwise the model mostly re-learns the ranking
+    that was shown.
+    """
+    if propensity is None:
+        propensity = position_propensity(sessions)
+
+    diffs, weights = [], []
+    for s in sessions:
+        X, clicked = s['X'], s['clicked']
+        neg = np.flatnonzero(~clicked)
+        if len(neg) == 0:
+            continue
+        for c in np.flatnonzero(clicked):
+            others = neg[np.argsort(np.abs(neg - c), kind='stable')][:MAX_NEGATIVES_PER_CLICK]
+            diffs.append(X[c][None, :] - X[others])
+            weights.append(np.full(len(others), 1.0 / propensity[min(c, len(propensity) - 1)]))
+
+    if not diffs:
+        return np.zeros((0, len(LTR_FEATURES))), np.zeros(0), np.zeros(0)
+    D = np.vstack(diffs)
+    w = np.concatenate(weights)
+    return np.vstack([D, -D]), np.concatenate([np.ones(len(D)), np.zeros(len(D))]), np.concatenate([w, w])
+
+
+def train_ranker(sessions: List[Dict], C: float = 1.0) -> Dict:
+    """Fit the pairwise model; returns the model dict (see save_model)"""
+    from sklearn.linear_model import LogisticRegression
+
+    propensity = position_propensity(sessions)
+    X, y, sample_weight = pairwise_data(sessions, propensity)
+    if len(X) == 0:
+        raise ValueError("No clicked searches with non-clicked alternatives to learn from")
+
+    clf = LogisticRegression(fit_intercept=False, C=C, max_iter=1000)
+    clf.fit(X, y, sample_weight=sample_weight)
+    return {
+        'features': LTR_FEATURES,
+        'weights': {name: round(float(w), 6) for name, w in zip(LTR_FEATURES, clf.coef_[0])},
+        'propensity': [round(float(p), 4) for p in propensity[:10]],
+        'trained_at': datetime.datetime.utcnow().isoformat(),
+        'sessions': len(sessions),
+        'pairs': int(len(X) // 2),
+    }
+
+
+def ndcg_at_k(relevance: np.ndarray, k: int = 10) -> float:
+    """NDCG@k of relevance values listed in ranked order"""
+    relevance = np.asarray(relevance, dtype=np.float64)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (relevance[:k] * discounts[:len(relevance[:k])]).sum()
+    ideal = np.sort(relevance)[::-1][:k]
+    idcg = (ideal * discounts[:len(ideal)]).sum()
+    return float(dcg / idcg) if idcg > 0 else 0.0
+
+
+def evaluate(sessions: List[Dict], rankers: Dict[str, Dict[str, float]], k: int = 10,
+             propensity: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """
+    Mean NDCG@k of each weight set re-ranking the logged results.
+    Relevance is s['relevance'] when given, else clicks / propensity of the
+    position they happened at (so the shown ranking is not rewarded for its
+    own position bias); propensity=None uses raw clicks.
+    """
+    out = {}
+    for name, weights in rankers.items():
+        w = np.asarray([weights.get(f, 0.0) for f in LTR_FEATURES])
+        scores = []
+        for s in sessions:
+            relevance = s.get('relevance')
+            if relevance is None:
+                relevance = s['clicked'].astype(np.float64)
+                if propensity is not None:
+                    pos = np.minimum(np.arange(len(relevance)), len(propensity) - 1)
+                    relevance = relevance / propensity[pos]
+            order = np.argsort(-(s['X'] @ w), kind='stable')
+            scores.append(ndcg_at_k(relevance[order], k))
+        out[name] = round(float(np.mean(scores)), 4) if scores else 0.0
+    return out
+
+
+def save_model(model: Dict, path: str = LTR_MODEL_PATH) -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(model, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+class LTRRanker:
+    """Learned ranking weights, reloaded when the model file changes"""
+
+    def __init__(self, path: str = LTR_MODEL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._weights = None
+
+    def weights(self) -> Optional[Dict[str, float]]:
+        """Weights per ranking feature, or None when no model has been trained"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, 'r') as f:
+                        model = json.load(f)
+                    self._weights = {k: float(v) for k, v in model['weights'].items() if k in SCORING_FEATURES}
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Ignoring unreadable ranking model {self.path}: {e}")
+                    self._weights = None
+                self._mtime = mtime
+            return self._weights
@@ -2,35 +2,79 @@
 Product API Integrations
 Fetches products from various e-commerce platforms using official APIs
 """
-import requests
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from integrations import http_client
+
+from .dedup import DEDUP_THRESHOLD, deduplicate
+
+# Global budget for one search_all_platforms call; providers that have not
+# answered by then contribute their mock products instead (partial results).
+SEARCH_DEADLINE_SECONDS = float(os.getenv('PRODUCT_SEARCH_DEADLINE', '5'))
+
+# Shared by all aggregators: at most this many provider calls in flight
+MAX_PROVIDER_WORKERS = 8
+
+# Latencies kept per provider for the percentile stats
+LATENCY_WINDOW = 500
+
 
 class ProductAPIClient:
     """Base class for product API clients"""
     
+    name = 'base'
+    
+    # per-request timeout (seconds) and one retry at most
+    timeout = 10.0
+    retries = 1
+    
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # shared pooled client (keep-alive, per-host limits, circuit breaker per provider)
+        self.http = http_client
+    
+    def search_products(self, query: str, filters: Optional[Dict] = None, raise_errors: bool = False,
+                        budget: Optional[float] = None) -> List[Dict]:
+        """
+        Search for products - to be implemented by subclasses.
+        API errors fall back to mock data, or are raised with raise_errors=True.
+        budget (seconds) caps the whole call, see request_budget.
+        """
+        raise NotImplementedError
     
-    def search_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
-        """Search for products - to be implemented by subclasses"""
+    def request_budget(self, budget: Optional[float] = None):
+        """
+        (timeout, retries) for one search: the timeout never exceeds the
+        budget and the retry is dropped when both attempts would not fit in it
+        """
+        if budget is None:
+            return self.timeout, self.retries
+        timeout = min(self.timeout, budget)
+        retries = self.retries if (self.retries + 1) * timeout <= budget else 0
+        return timeout, retries
+    
+    def mock_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
+        """Mock products used when the API is not configured or fails"""
         raise NotImplementedError
 
 
 class eBayAPIClient(ProductAPIClient):
     """eBay Finding API client"""
     
+    name = 'ebay'
+    
     def __init__(self):
         super().__init__()
         self.app_id = os.getenv('EBAY_APP_ID', 'YourAppID')
-        self.base_url = 'https://svcs.ebay.com/services/search/FindingService/v1'
+        self.base_url = os.getenv('EBAY_API_BASE_URL', 'https://svcs.ebay.com/services/search/FindingService/v1')
     
-    def search_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
+    def search_products(self, query: str, filters: Optional[Dict] = None, raise_errors: bool = False,
+                        budget: Optional[float] = None) -> List[Dict]:
         """
         Search eBay products using Finding API
         Falls back to mock data if API key not configured
@@ -59,7 +103,8 @@ class eBayAPIClient(ProductAPIClient):
                     params['itemFilter(1).name'] = 'MaxPrice'
                     params['itemFilter(1).value'] = max_price
             
-            response = self.session.get(self.base_url, params=params, timeout=10)
+            timeout, retries = self.request_budget(budget)
+            response = self.http.get(self.base_url, service=self.name, params=params, timeout=timeout, retries=retries)
             response.raise_for_status()
             data = response.json()
             
@@ -83,9 +128,14 @@ class eBayAPIClient(ProductAPIClient):
             return products if products else self._get_mock_ebay_products(query, filters)
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"eBay API Error: {str(e)}")
             return self._get_mock_ebay_products(query, filters)
     
+    def mock_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
+        return self._get_mock_ebay_products(query, filters)
+    
     def _get_mock_ebay_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
         """Generate mock eBay products based on query"""
         base_products = [
@@ -126,12 +176,15 @@ class eBayAPIClient(ProductAPIClient):
 class RapidAPIClient(ProductAPIClient):
     """RapidAPI product search client (Amazon, Walmart, etc.)"""
     
+    name = 'rapidapi'
+    
     def __init__(self):
         super().__init__()
         self.api_key = os.getenv('RAPIDAPI_KEY', '')
-        self.base_url = 'https://amazon-product-search1.p.rapidapi.com'
+        self.base_url = os.getenv('RAPIDAPI_BASE_URL', 'https://amazon-product-search1.p.rapidapi.com')
     
-    def search_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
+    def search_products(self, query: str, filters: Optional[Dict] = None, raise_errors: bool = False,
+                        budget: Optional[float] = None) -> List[Dict]:
         """
         Search products via RapidAPI
         Falls back to mock data if API key not configured
@@ -151,11 +204,14 @@ class RapidAPIClient(ProductAPIClient):
                 'country': 'us'
             }
             
-            response = self.session.get(
+            timeout, retries = self.request_budget(budget)
+            response = self.http.get(
                 f'{self.base_url}/search',
+                service=self.name,
                 headers=headers,
                 params=params,
-                timeout=10
+                timeout=timeout,
+                retries=retries
             )
             response.raise_for_status()
             data = response.json()
@@ -179,9 +235,14 @@ class RapidAPIClient(ProductAPIClient):
             return products if products else self._get_mock_rapidapi_products(query, filters)
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"RapidAPI Error: {str(e)}")
             return self._get_mock_rapidapi_products(query, filters)
     
+    def mock_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
+        return self._get_mock_rapidapi_products(query, filters)
+    
     def _get_mock_rapidapi_products(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
         """Generate mock RapidAPI products"""
         base_products = [
@@ -218,58 +279,114 @@ class RapidAPIClient(ProductAPIClient):
         return base_products
 
 
+class ProviderStats:
+    """Thread-safe call / error / timeout counters and recent latencies of one provider"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+    
+    def record(self, latency_ms: float, error: bool = False, timeout: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.timeouts += int(timeout)
+            self.latencies_ms.append(latency_ms)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+            calls, errors, timeouts = self.calls, self.errors, self.timeouts
+        
+        def pct(q):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1)
+        
+        return {
+            'calls': calls,
+            'errors': errors,
+            'timeouts': timeouts,
+            'error_rate': round(errors / calls, 4) if calls else 0.0,
+            'timeout_rate': round(timeouts / calls, 4) if calls else 0.0,
+            'latency_ms_p50': pct(0.50),
+            'latency_ms_p95': pct(0.95),
+        }
+
+
+_provider_pool = ThreadPoolExecutor(max_workers=MAX_PROVIDER_WORKERS, thread_name_prefix='product-provider')
+
+
 class ProductAggregator:
     """Aggregates products from multiple sources"""
     
-    def __init__(self):
+    def __init__(self, deadline: float = SEARCH_DEADLINE_SECONDS):
         self.ebay_client = eBayAPIClient()
         self.rapidapi_client = RapidAPIClient()
+        self.providers = [self.ebay_client, self.rapidapi_client]
+        self.deadline = deadline
+        self.dedup_threshold = DEDUP_THRESHOLD
+        self.stats = {p.name: ProviderStats() for p in self.providers}
     
-    def search_all_platforms(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
-        """Search across all platforms and combine results"""
-        all_products = []
-        
-        # Search eBay
-        ebay_products = self.ebay_client.search_products(query, filters)
-        all_products.extend(ebay_products)
+    def search_all_platforms(self, query: str, filters: Optional[Dict] = None, deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Search across all platforms concurrently and combine results.
+        Providers without an answer after `deadline` seconds contribute their
+        mock products; calls not started yet are cancelled, running ones are
+        bounded by the deadline (request_budget) and only recorded in the stats.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        futures = [
+            _provider_pool.submit(self._call_provider, provider, query, filters, deadline)
+            for provider in self.providers
+        ]
+        wait(futures, timeout=deadline)
         
-        # Search RapidAPI (Amazon, Walmart)
-        rapidapi_products = self.rapidapi_client.search_products(query, filters)
-        all_products.extend(rapidapi_products)
+        all_products = []
+        for provider, future in zip(self.providers, futures):
+            stats = self.stats[provider.name]
+            if future.done():
+                products, latency_ms, error = future.result()
+                stats.record(latency_ms, error=error)
+                all_products.extend(products)
+            else:
+                print(f"{provider.name} search exceeded {deadline}s deadline, returning partial results")
+                if future.cancel():
+                    # still queued behind other searches: never started
+                    stats.record(deadline * 1000, timeout=True)
+                else:
+                    future.add_done_callback(
+                        lambda f, stats=stats: stats.record(f.result()[1], error=f.result()[2], timeout=True)
+                    )
+                all_products.extend(provider.mock_products(query, filters))
         
         # Remove duplicates based on name similarity
         unique_products = self._deduplicate_products(all_products)
         
         return unique_products
     
+    def _call_provider(self, provider: ProductAPIClient, query: str, filters: Optional[Dict], budget: float):
+        """One provider call -> (products, latency_ms, error); errors fall back to its mock data"""
+        started = time.perf_counter()
+        try:
+            products = provider.search_products(query, filters, raise_errors=True, budget=budget)
+            error = False
+        except Exception as e:
+            print(f"{provider.name} API Error: {str(e)}")
+            products = provider.mock_products(query, filters)
+            error = True
+        return products, (time.perf_counter() - started) * 1000, error
+    
+    def provider_stats(self) -> Dict:
+        """Per-provider calls, error / timeout rates and latency percentiles"""
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+    
     def _deduplicate_products(self, products: List[Dict]) -> List[Dict]:
-        """Remove duplicate products based on name similarity"""
-        seen_names = set()
-        unique = []
-        
-        for product in products:
-            name_lower = product['name'].lower()
-            # Simple deduplication - check if similar name exists
-            is_duplicate = False
-            for seen in seen_names:
-                # If names are very similar (80% overlap), consider duplicate
-                if self._similarity(name_lower, seen) > 0.8:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                seen_names.add(name_lower)
-                unique.append(product)
-        
+        """Collapse near-duplicate titles, keeping the best priced / highest rated one"""
+        unique, clusters = deduplicate(products, self.dedup_threshold)
+        if clusters:
+            print(f"Merged {len(products) - len(unique)} duplicate products into {len(clusters)} clusters")
         return unique
-    
-    def _similarity(self, s1: str, s2: str) -> float:
-        """Calculate simple string similarity"""
-        words1 = set(s1.split())
-        words2 = set(s2.split())
-        if not words1 or not words2:
-            return 0.0
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        return len(intersection) / len(union) if union else 0.0
-
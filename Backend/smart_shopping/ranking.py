@@ -0,0 +1,216 @@
+"""
+Product Ranking
+Vectorized rule-based scoring of product lists with pluggable, weighted features
+"""
+import re
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# platform -> trust (0..1); platform_trust adds 10 * trust points
+PLATFORM_TRUST = {'eBay': 1.0, 'Amazon': 1.0, 'Walmart': 1.0}
+
+# Platforms named in the "from trusted platform" reason
+REASON_PLATFORMS = {'Amazon', 'eBay'}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductFeatures:
+    """Columns of a product list, extracted once"""
+
+    def __init__(self, products: List[Dict]):
+        self.products = products
+        self.rating = np.fromiter((_to_float(p.get('rating', 0)) for p in products), dtype=np.float64, count=len(products))
+        self.price = np.fromiter((_to_float(p.get('price', 0)) for p in products), dtype=np.float64, count=len(products))
+        # smart_shopping providers set 'availability' / 'platform', Google Shopping results 'inStock' / 'store'
+        self.in_stock = np.fromiter(
+            (
+                str(p.get('availability', '') or '').lower() == 'in stock' if 'availability' in p else bool(p.get('inStock'))
+                for p in products
+            ),
+            dtype=bool,
+            count=len(products),
+        )
+        self.platform = [p.get('platform', p.get('store', '')) for p in products]
+        self.category = [p.get('category', '') for p in products]
+        self._name_tokens = None
+
+    @property
+    def name_tokens(self) -> List[set]:
+        if self._name_tokens is None:
+            self._name_tokens = [set(_WORD_RE.findall(str(p.get('name', '')).lower())) for p in self.products]
+        return self._name_tokens
+
+    def __len__(self):
+        return len(self.products)
+
+
+class RankingContext:
+    """Per-request inputs of the scoring features"""
+
+    def __init__(self, budget: Optional[float] = None, user_preferences: Optional[Dict] = None,
+                 search_history: Optional[List[str]] = None, platform_trust: Optional[Dict[str, float]] = None):
+        self.budget = budget
+        self.user_preferences = user_preferences or {}
+        self.search_history = search_history or []
+        self.platform_trust = PLATFORM_TRUST if platform_trust is None else platform_trust
+
+
+# ------------------------------------------------------------------
+# Scoring features: (features, context) -> score array (one value per product)
+# ------------------------------------------------------------------
+def rating_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """0-40 points"""
+    return f.rating * 8
+
+
+def budget_fit_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """Within budget: up to 30 points (cheaper is better), over budget: -10.
+    Without a budget: 20 points up to 1.2x the average price."""
+    if ctx.budget:
+        return np.where(f.price <= ctx.budget, 30 * (1 - f.price / ctx.budget), -10.0)
+    avg_price = f.price.mean() if len(f) else 0.0
+    return np.where(f.price <= avg_price * 1.2, 20.0, 0.0)
+
+
+def platform_trust_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """0-10 points"""
+    trust = ctx.platform_trust
+    return 10 * np.fromiter((trust.get(p, 0.0) for p in f.platform), dtype=np.float64, count=len(f))
+
+
+def availability_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """0-10 points"""
+    return np.where(f.in_stock, 10.0, 0.0)
+
+
+def category_match_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """0-10 points"""
+    if 'category' not in ctx.user_preferences:
+        return np.zeros(len(f))
+    wanted = ctx.user_preferences['category']
+    return 10 * np.fromiter((c == wanted for c in f.category), dtype=np.float64, count=len(f))
+
+
+def history_affinity_score(f: ProductFeatures, ctx: RankingContext) -> np.ndarray:
+    """0-10 points: share of a product's name words that appear in recent searches"""
+    history_words = set()
+    for q in ctx.search_history[-20:]:
+        history_words.update(_WORD_RE.findall(str(q).lower()))
+    if not history_words:
+        return np.zeros(len(f))
+    return 10 * np.fromiter(
+        (len(t & history_words) / len(t) if t else 0.0 for t in f.name_tokens), dtype=np.float64, count=len(f)
+    )
+
+
+SCORING_FEATURES: Dict[str, Callable[[ProductFeatures, RankingContext], np.ndarray]] = {
+    'rating': rating_score,
+    'budget_fit': budget_fit_score,
+    'platform_trust': platform_trust_score,
+    'availability': availability_score,
+    'category_match': category_match_score,
+    'history_affinity': history_affinity_score,
+}
+
+DEFAULT_WEIGHTS = {name: 1.0 for name in SCORING_FEATURES}
+
+
+def score_products(features: ProductFeatures, ctx: RankingContext, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Weighted sum of the scoring features (features with weight 0 are not computed)"""
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    total = np.zeros(len(features))
+    for name, weight in weights.items():
+        if weight:
+            total += weight * SCORING_FEATURES[name](features, ctx)
+    return total
+
+
+def feature_matrix(features: ProductFeatures, ctx: RankingContext, names: Optional[List[str]] = None) -> np.ndarray:
+    """(products x features) unweighted feature scores, columns in `names` order"""
+    names = list(SCORING_FEATURES) if names is None else names
+    if not len(features):
+        return np.zeros((0, len(names)))
+    return np.column_stack([SCORING_FEATURES[name](features, ctx) for name in names])
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first (ties keep input order)"""
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        # everything scoring at least the k-th best, so ties at the cut are kept in input order
+        kth = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def _reason(rating: float, price: float, platform: str, budget: Optional[float]) -> str:
+    reasons = []
+    if rating >= 4.5:
+        reasons.append("highly rated")
+    if price <= (budget or 100) * 0.7:
+        reasons.append("great value")
+    if platform in REASON_PLATFORMS:
+        reasons.append(f"from trusted platform {platform}")
+    return f"Recommended because it's {', '.join(reasons) if reasons else 'a good option based on your search'}"
+
+
+def rank_products(
+    products: List[Dict],
+    top_k: int = 10,
+    budget: Optional[float] = None,
+    user_preferences: Optional[Dict] = None,
+    search_history: Optional[List[str]] = None,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[Dict]:
+    """
+    Top-k products by rule-based score, each a copy with
+    'recommendation_score' and 'aiReason' added (only the top-k are copied).
+    """
+    return rank_with_features(products, top_k, budget, user_preferences, search_history, weights)[0]
+
+
+def rank_with_features(
+    products: List[Dict],
+    top_k: int = 10,
+    budget: Optional[float] = None,
+    user_preferences: Optional[Dict] = None,
+    search_history: Optional[List[str]] = None,
+    weights: Optional[Dict[str, float]] = None,
+):
+    """
+    rank_products + the (top-k x SCORING_FEATURES) unweighted feature scores
+    of the returned products, in the same order (for click logging).
+    """
+    if not products:
+        return [], np.zeros((0, len(SCORING_FEATURES)))
+
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    features = ProductFeatures(products)
+    ctx = RankingContext(budget=budget, user_preferences=user_preferences, search_history=search_history)
+    X = feature_matrix(features, ctx)
+    w = np.asarray([weights.get(name, 0.0) for name in SCORING_FEATURES])
+    scores = X @ w
+
+    top = top_k_indices(scores, top_k)
+    ranked = []
+    for i in top:
+        product = products[i].copy()
+        product['recommendation_score'] = float(scores[i])
+        product['aiReason'] = _reason(features.rating[i], features.price[i], features.platform[i], budget)
+        ranked.append(product)
+    return ranked, X[top]
@@ -0,0 +1,167 @@
+"""
+Exchange Rate Table
+One rate vector per refresh interval, kept in memory and on disk, for
+batch price conversion without per-product rate lookups
+
+Rates are stored as units of each currency per 1 unit of the base currency
+(USD), so any pair is rates[to] / rates[from]. The table is refreshed in the
+background once it is older than the refresh interval; callers always get
+the current table immediately. If no table can be fetched or loaded, the
+built-in approximate rates are used. Failed refreshes are retried after
+RATE_TABLE_RETRY seconds, doubling up to the refresh interval.
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+RATE_TABLE_FILE = os.getenv('CURRENCY_RATE_FILE', os.path.join(DATA_DIR, 'currency_rates.json'))
+RATE_TABLE_REFRESH = float(os.getenv('CURRENCY_RATE_REFRESH', '3600'))   # seconds
+RATE_TABLE_RETRY = 60.0   # first retry after a failed refresh (seconds)
+RATE_BASE = 'USD'
+
+# Approximate units per 1 USD, used when no rates could be fetched
+FALLBACK_RATES = {'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'INR': 83.0, 'LKR': 325.0}
+
+# Decimal places of each currency's smallest unit (2 if not listed)
+CURRENCY_DECIMALS = {'JPY': 0, 'KRW': 0, 'ISK': 0, 'HUF': 0, 'KWD': 3, 'BHD': 3, 'OMR': 3}
+
+
+def round_money(amounts: np.ndarray, currency: str) -> np.ndarray:
+    """Round half away from zero to the currency's minor unit (not float round-half-even)"""
+    scale = 10.0 ** CURRENCY_DECIMALS.get(currency, 2)
+    scaled = np.asarray(amounts, dtype=np.float64) * scale
+    # 1e-9 absorbs binary representation error, e.g. 1.005 * 100 = 100.49999999999999
+    return np.sign(scaled) * np.floor(np.abs(scaled) + 0.5 + 1e-9) / scale
+
+
+class RateTable:
+    """Immutable snapshot of rates against RATE_BASE"""
+
+    def __init__(self, rates: Dict[str, float], fetched_at: float, source: str):
+        rates = {code.upper(): float(r) for code, r in rates.items() if r and float(r) > 0}
+        rates[RATE_BASE] = 1.0
+        self.codes = sorted(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.per_base = np.asarray([rates[c] for c in self.codes], dtype=np.float64)
+        self.fetched_at = fetched_at
+        self.source = source
+
+    def rates(self, from_currencies: List[str], to_currency: str) -> np.ndarray:
+        """
+        Rate from each currency in from_currencies to to_currency.
+        Pairs with an unknown currency get 1.0 (the price is left as is).
+        """
+        from_idx = np.fromiter((self.index.get(c, -1) for c in from_currencies), dtype=np.int64,
+                               count=len(from_currencies))
+        to_idx = self.index.get(to_currency, -1)
+        out = np.ones(len(from_idx))
+        known = from_idx >= 0
+        if to_idx >= 0:
+            out[known] = self.per_base[to_idx] / self.per_base[from_idx[known]]
+        else:
+            out[:] = 1.0
+        out[np.asarray(from_currencies, dtype=object) == to_currency] = 1.0
+        return out
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        return float(self.rates([from_currency], to_currency)[0])
+
+    def to_dict(self) -> Dict:
+        return {
+            'base': RATE_BASE,
+            'fetched_at': self.fetched_at,
+            'source': self.source,
+            'rates': dict(zip(self.codes, self.per_base.tolist())),
+        }
+
+
+class RateTableService:
+    """
+    Current RateTable, refreshed from fetch(base) -> {code: units per base}
+    in the background once older than `refresh` seconds. Construction never
+    fetches: without a table on disk the fallback rates are served until the
+    first background refresh lands.
+    """
+
+    def __init__(self, fetch: Optional[Callable[[str], Dict[str, float]]] = None,
+                 refresh: float = RATE_TABLE_REFRESH, persist_path: Optional[str] = RATE_TABLE_FILE):
+        self.fetch = fetch
+        self.refresh = refresh
+        self.persist_path = persist_path or None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.stats = {'fetches': 0, 'fetch_errors': 0}
+
+        self._table = self._load() or RateTable(FALLBACK_RATES, 0.0, 'fallback')
+        # when the next refresh may start; pushed back with growing delays after failures
+        self._next_attempt = self._table.fetched_at + self.refresh
+        self._retry_delay = min(self.refresh, RATE_TABLE_RETRY)
+        # nothing usable on disk: starts fetching now, in the background
+        self.table()
+
+    def table(self) -> RateTable:
+        """The current table (never blocks on the network)"""
+        with self._lock:
+            table = self._table
+            if self.fetch and not self._refreshing and time.time() >= self._next_attempt:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+        return table
+
+    def _refresh(self):
+        try:
+            self.stats['fetches'] += 1
+            table = RateTable(self.fetch(RATE_BASE), time.time(), 'live')
+        except Exception as e:
+            self.stats['fetch_errors'] += 1
+            print(f"Exchange rate refresh failed: {str(e)}")
+            table = None
+        with self._lock:
+            if table is not None:
+                self._table = table
+                self._next_attempt = table.fetched_at + self.refresh
+                self._retry_delay = min(self.refresh, RATE_TABLE_RETRY)
+            else:
+                self._next_attempt = time.time() + self._retry_delay
+                self._retry_delay = min(self._retry_delay * 2, self.refresh)
+            self._refreshing = False
+        if table is not None and self.persist_path:
+            self._save(table)
+
+    def info(self) -> Dict:
+        table = self._table
+        return {
+            'source': table.source,
+            'currencies': len(table.codes),
+            'age_seconds': round(time.time() - table.fetched_at) if table.fetched_at else None,
+            **self.stats,
+        }
+
+    # ------------------------------------------------------------------
+    def _load(self) -> Optional[RateTable]:
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return None
+        try:
+            with open(self.persist_path, 'r') as f:
+                data = json.load(f)
+            if data.get('base') != RATE_BASE:
+                return None
+            return RateTable(data['rates'], float(data.get('fetched_at', 0)), data.get('source', 'file'))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable rate table {self.persist_path}: {str(e)}")
+            return None
+
+    def _save(self, table: RateTable):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp = f"{self.persist_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(table.to_dict(), f, indent=2)
+            os.replace(tmp, self.persist_path)
+        except OSError as e:
+            print(f"Could not persist rate table: {str(e)}")
@@ -1,24 +1,42 @@
 """
 AI-Powered Product Recommendation Engine
-Uses OpenAI and ML to provide personalized product recommendations
+Ranks products locally (rule-based or learned weights, see ranking.py / ltr.py)
+and optionally asks OpenAI for per-product explanations in the background
 """
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
-from openai import OpenAI
 import json
 
+from integrations import guarded_call, openai_client
+
+from .ltr import LTRRanker
+from .ranking import DEFAULT_WEIGHTS, rank_with_features
+
+# LLM explanations are off the request path and opt-in
+LLM_EXPLANATIONS = os.getenv('SHOPPING_LLM_EXPLANATIONS', '').strip().lower() in ('1', 'true', 'yes')
+
+# explanations kept per search_id
+MAX_EXPLANATIONS = 256
+
 
 class RecommendationEngine:
-    """AI-powered recommendation engine"""
+    """Local ranking + optional async AI explanations"""
     
-    def __init__(self):
+    def __init__(self, ranking_weights: Optional[Dict[str, float]] = None):
         self.openai_client = None
-        api_key = os.getenv('OPENAI_API_KEY', '')
-        if api_key:
-            try:
-                self.openai_client = OpenAI(api_key=api_key)
-            except Exception as e:
-                print(f"OpenAI initialization error: {str(e)}")
+        self.ranking_weights = dict(DEFAULT_WEIGHTS, **(ranking_weights or {}))
+        self.ltr_ranker = LTRRanker()
+        self.explanations = OrderedDict()   # search_id -> {'status': 'pending'|'ready'|'failed', 'reasons': {...}}
+        self._explanations_lock = threading.Lock()
+        self._explain_pool = None
+        try:
+            # shared per-process client (None without OPENAI_API_KEY)
+            self.openai_client = openai_client()
+        except Exception as e:
+            print(f"OpenAI initialization error: {str(e)}")
     
     def generate_recommendations(
         self,
@@ -28,165 +46,136 @@ class RecommendationEngine:
         budget: Optional[float] = None
     ) -> List[Dict]:
         """
-        Generate AI-powered recommendations from product list
+        Top 10 products for the user, ranked in-process
         """
-        if not products:
-            return []
-        
-        # If OpenAI is available, use it for intelligent recommendations
-        if self.openai_client:
-            return self._ai_recommend(products, user_preferences, search_history, budget)
-        else:
-            # Fallback to rule-based recommendations
-            return self._rule_based_recommend(products, user_preferences, budget)
+        return self.rank(products, user_preferences, search_history, budget)[0]
     
-    def _ai_recommend(
+    def rank(
         self,
         products: List[Dict],
-        user_preferences: Optional[Dict],
-        search_history: Optional[List[str]],
-        budget: Optional[float]
-    ) -> List[Dict]:
-        """Use OpenAI to generate intelligent recommendations"""
+        user_preferences: Optional[Dict] = None,
+        search_history: Optional[List[str]] = None,
+        budget: Optional[float] = None
+    ):
+        """
+        (top 10 products, their feature scores) - learned weights when a
+        ranking model has been trained, the configured rule weights otherwise
+        """
+        weights = self.ltr_ranker.weights() or self.ranking_weights
+        return rank_with_features(
+            products,
+            top_k=10,
+            budget=budget,
+            user_preferences=user_preferences,
+            search_history=search_history,
+            weights=weights
+        )
+    
+    # ------------------------------------------------------------------
+    # Optional AI explanations (background)
+    # ------------------------------------------------------------------
+    def explain_async(
+        self,
+        search_id: str,
+        products: List[Dict],
+        user_preferences: Optional[Dict] = None,
+        search_history: Optional[List[str]] = None,
+        budget: Optional[float] = None
+    ) -> bool:
+        """
+        Queue AI explanations for an already ranked list; fetch them later with
+        get_explanations(search_id). False when explanations are disabled.
+        """
+        if not (LLM_EXPLANATIONS and self.openai_client and products):
+            return False
+        
+        with self._explanations_lock:
+            if self._explain_pool is None:
+                self._explain_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ai-explain')
+            self._store_explanation(search_id, {'status': 'pending', 'reasons': {}})
+        
+        self._explain_pool.submit(self._explain, search_id, products, user_preferences, search_history, budget)
+        return True
+    
+    def get_explanations(self, search_id: str) -> Optional[Dict]:
+        with self._explanations_lock:
+            entry = self.explanations.get(search_id)
+            return dict(entry) if entry else None
+    
+    def _store_explanation(self, search_id: str, entry: Dict):
+        self.explanations[search_id] = entry
+        self.explanations.move_to_end(search_id)
+        while len(self.explanations) > MAX_EXPLANATIONS:
+            self.explanations.popitem(last=False)
+    
+    def _explain(self, search_id, products, user_preferences, search_history, budget):
         try:
-            # Prepare context
-            product_summary = []
-            for p in products[:10]:  # Limit to top 10 for context
-                product_summary.append({
-                    'name': p.get('name', ''),
-                    'price': p.get('price', 0),
-                    'rating': p.get('rating', 0),
-                    'category': p.get('category', ''),
-                    'platform': p.get('platform', '')
-                })
-            
-            context = f"""
-            User is searching for products. Here are available products:
-            {json.dumps(product_summary, indent=2)}
-            
-            User preferences: {json.dumps(user_preferences or {})}
-            Recent searches: {', '.join(search_history[-5:]) if search_history else 'None'}
-            Budget: ${budget if budget else 'Not specified'}
-            
-            Analyze these products and recommend the top 5-8 best options considering:
-            1. Value for money (price vs rating)
-            2. User preferences and search history
-            3. Budget constraints
-            4. Product quality indicators
-            
-            Return a JSON array with product recommendations, each with:
-            - product_index: index in original list
-            - ai_reason: brief explanation why this product is recommended
-            - score: recommendation score (0-100)
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert shopping assistant. Provide product recommendations in JSON format."},
-                    {"role": "user", "content": context}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            # Parse AI response
-            content = response.choices[0].message.content
-            # Try to extract JSON from response
-            try:
-                # Find JSON in response
-                json_start = content.find('[')
-                json_end = content.rfind(']') + 1
-                if json_start >= 0 and json_end > json_start:
-                    recommendations = json.loads(content[json_start:json_end])
-                    
-                    # Apply recommendations to products
-                    recommended_products = []
-                    for rec in recommendations[:8]:
-                        idx = rec.get('product_index', 0)
-                        if 0 <= idx < len(products):
-                            product = products[idx].copy()
-                            product['aiReason'] = rec.get('ai_reason', 'AI recommended based on your preferences')
-                            product['recommendation_score'] = rec.get('score', 75)
-                            recommended_products.append(product)
-                    
-                    # Sort by recommendation score
-                    recommended_products.sort(key=lambda x: x.get('recommendation_score', 0), reverse=True)
-                    return recommended_products
-            except:
-                pass
-            
-            # Fallback if JSON parsing fails
-            return self._rule_based_recommend(products, user_preferences, budget)
-            
+            reasons = self._ai_explain(products, user_preferences, search_history, budget)
+            entry = {'status': 'ready', 'reasons': reasons}
         except Exception as e:
-            print(f"OpenAI recommendation error: {str(e)}")
-            return self._rule_based_recommend(products, user_preferences, budget)
+            print(f"OpenAI explanation error: {str(e)}")
+            entry = {'status': 'failed', 'reasons': {}}
+        with self._explanations_lock:
+            self._store_explanation(search_id, entry)
     
-    def _rule_based_recommend(
+    def _ai_explain(
         self,
         products: List[Dict],
         user_preferences: Optional[Dict],
+        search_history: Optional[List[str]],
         budget: Optional[float]
-    ) -> List[Dict]:
-        """Rule-based recommendation system (fallback)"""
-        if not products:
-            return []
+    ) -> Dict[str, str]:
+        """Ask OpenAI why each (already ranked) product fits the user -> {product id: reason}"""
+        # Prepare context
+        product_summary = []
+        for i, p in enumerate(products[:10]):  # Limit to top 10 for context
+            product_summary.append({
+                'product_index': i,
+                'name': p.get('name', ''),
+                'price': p.get('price', 0),
+                'rating': p.get('rating', 0),
+                'category': p.get('category', ''),
+                'platform': p.get('platform', '')
+            })
         
-        # Score products
-        scored_products = []
-        for product in products:
-            score = 0
-            
-            # Rating score (0-40 points)
-            rating = product.get('rating', 0)
-            score += rating * 8
-            
-            # Price score (0-30 points) - lower price gets higher score if within budget
-            price = product.get('price', 0)
-            if budget:
-                if price <= budget:
-                    score += 30 * (1 - (price / budget))
-                else:
-                    score -= 10  # Penalty for over budget
-            else:
-                # If no budget, prefer mid-range prices
-                avg_price = sum(p.get('price', 0) for p in products) / len(products)
-                if price <= avg_price * 1.2:
-                    score += 20
-            
-            # Platform diversity (0-10 points)
-            platform = product.get('platform', '')
-            if platform in ['eBay', 'Amazon', 'Walmart']:
-                score += 10
-            
-            # Availability (0-10 points)
-            if product.get('availability', '').lower() == 'in stock':
-                score += 10
-            
-            # Category match (0-10 points)
-            if user_preferences and 'category' in user_preferences:
-                if product.get('category', '') == user_preferences['category']:
-                    score += 10
-            
-            product_copy = product.copy()
-            product_copy['recommendation_score'] = score
-            
-            # Generate AI reason
-            reasons = []
-            if rating >= 4.5:
-                reasons.append("highly rated")
-            if price <= (budget or 100) * 0.7:
-                reasons.append("great value")
-            if platform in ['Amazon', 'eBay']:
-                reasons.append(f"from trusted platform {platform}")
-            
-            product_copy['aiReason'] = f"Recommended because it's {', '.join(reasons) if reasons else 'a good option based on your search'}"
-            scored_products.append(product_copy)
+        context = f"""
+        These products were recommended to a user, best first:
+        {json.dumps(product_summary, indent=2)}
         
-        # Sort by score and return top products
-        scored_products.sort(key=lambda x: x.get('recommendation_score', 0), reverse=True)
+        User preferences: {json.dumps(user_preferences or {})}
+        Recent searches: {', '.join(search_history[-5:]) if search_history else 'None'}
+        Budget: ${budget if budget else 'Not specified'}
         
-        # Add recommendation reasons to top products
-        return scored_products[:10]  # Return top 10
-
+        For each product, explain briefly why it is a good pick considering
+        value for money, the user's preferences and search history, and the budget.
+        
+        Return a JSON array, each item with:
+        - product_index: index in the list above
+        - ai_reason: brief explanation
+        """
+        
+        response = guarded_call(
+            'openai',
+            self.openai_client.chat.completions.create,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are an expert shopping assistant. Provide product explanations in JSON format."},
+                {"role": "user", "content": context}
+            ],
+            temperature=0.7,
+            max_tokens=1000
+        )
+        
+        # Find JSON in response
+        content = response.choices[0].message.content
+        json_start = content.find('[')
+        json_end = content.rfind(']') + 1
+        if json_start < 0 or json_end <= json_start:
+            raise ValueError("no JSON array in response")
+        
+        reasons = {}
+        for rec in json.loads(content[json_start:json_end]):
+            idx = rec.get('product_index', -1)
+            if isinstance(idx, int) and 0 <= idx < len(products) and rec.get('ai_reason'):
+                reasons[str(products[idx].get('id', idx))] = rec['ai_reason']
+        return reasons
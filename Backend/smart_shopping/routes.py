@@ -8,6 +8,7 @@ from .recommendation_engine import RecommendationEngine
 from .currency_converter import CurrencyConverter
 from .chat_assistant import ChatAssistant
 from .history_manager import HistoryManager
+from .ltr import ClickLog
 from datetime import datetime
 
 smart_shopping_bp = Blueprint('smart_shopping', __name__)
@@ -18,6 +19,7 @@ nlp_processor = NLPProcessor()
 recommendation_engine = RecommendationEngine()
 currency_converter = CurrencyConverter()
 chat_assistant = ChatAssistant()
+click_log = ClickLog()
 
 # History manager will be initialized with mongo_db
 history_manager = None
@@ -65,11 +67,24 @@ def search_products():
             history = history_manager.get_history(user_id, limit=10)
             search_history = [h.get('query', '') for h in history]
         
-        recommended_products = recommendation_engine.generate_recommendations(
+        budget = combined_filters.get('priceRange', [0, 1000])[1] if combined_filters.get('priceRange') else None
+        recommended_products, features = recommendation_engine.rank(
             products,
             user_preferences=combined_filters,
             search_history=search_history,
-            budget=combined_filters.get('priceRange', [0, 1000])[1] if combined_filters.get('priceRange') else None
+            budget=budget
+        )
+        
+        # Log what was shown (training data for the local ranker, see POST /click)
+        search_id = None
+        try:
+            search_id = click_log.log_impressions(user_id, query, recommended_products, features)
+        except Exception as e:
+            print(f"Click log error: {str(e)}")
+        
+        # Optional AI explanations, generated in the background (GET /explanations/<search_id>)
+        explanations_pending = bool(search_id) and recommendation_engine.explain_async(
+            search_id, recommended_products, combined_filters, search_history, budget
         )
         
         # Save to history
@@ -86,6 +101,8 @@ def search_products():
             'data': {
                 'products': recommended_products,
                 'total': len(recommended_products),
+                'search_id': search_id,
+                'explanations_pending': explanations_pending,
                 'query': query,
                 'nlp_analysis': nlp_result,
                 'filters_applied': combined_filters
@@ -318,6 +335,48 @@ def convert_currency():
         }), 500
 
 
+@smart_shopping_bp.route('/click', methods=['POST'])
+def log_click():
+    """Record a click on a search result (trains the local ranker)"""
+    try:
+        data = request.get_json() or {}
+        search_id = data.get('search_id')
+        product_id = data.get('product_id')
+        
+        if not search_id or product_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'search_id and product_id are required'
+            }), 400
+        
+        if not click_log.log_click(search_id, product_id):
+            return jsonify({
+                'status': 'error',
+                'message': 'Product was not shown in this search'
+            }), 404
+        
+        return jsonify({'status': 'success'}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@smart_shopping_bp.route('/explanations/<search_id>', methods=['GET'])
+def get_explanations(search_id):
+    """AI explanations for a search's results (status: pending / ready / failed)"""
+    entry = recommendation_engine.get_explanations(search_id)
+    if entry is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'No explanations for this search'
+        }), 404
+    
+    return jsonify({'status': 'success', 'data': entry}), 200
+
+
 @smart_shopping_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -331,6 +390,8 @@ def health_check():
             'currency_converter': 'active',
             'chat_assistant': 'active',
             'history_manager': 'active' if history_manager else 'inactive'
-        }
+        },
+        'product_providers': product_aggregator.provider_stats(),
+        'exchange_rates': currency_converter.rate_service.info()
     }), 200
 
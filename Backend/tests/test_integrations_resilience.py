@@ -0,0 +1,97 @@
+"""
+Circuit breaker half-open trial handling in HttpClient.request and guarded_call
+
+Run from Backend/: python -m pytest -q tests
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from integrations import ConcurrencyLimitError, HttpClient, configure_service, guarded_call  # noqa: E402
+
+RESET = 0.05
+# port out of range: requests raises InvalidURL before touching the network
+BAD_URL = 'http://127.0.0.1:99999/'
+
+
+def _open_circuit_http(client, service):
+    state = configure_service(service, failure_threshold=1, reset_timeout=RESET)
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get(BAD_URL, service=service, retries=0)
+    assert state.breaker.state == 'open'
+    time.sleep(RESET * 2)
+    return state
+
+
+def test_http_invalid_url_is_recorded_and_trial_released():
+    client = HttpClient(max_per_host=1)
+    state = _open_circuit_http(client, 'test-http-invalid')
+
+    # the half-open trial fails with a non-transport error: it must re-open, not stick
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get(BAD_URL, service='test-http-invalid', retries=0)
+    assert state.breaker.state == 'open'
+
+    time.sleep(RESET * 2)
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get(BAD_URL, service='test-http-invalid', retries=0)
+
+
+def test_http_refused_slot_does_not_take_trial():
+    client = HttpClient(max_per_host=1)
+    state = _open_circuit_http(client, 'test-http-slot')
+
+    slots = client._slots('127.0.0.1:99999')
+    slots.acquire()
+    try:
+        with pytest.raises(ConcurrencyLimitError):
+            client.get(BAD_URL, service='test-http-slot', timeout=0.05, retries=0)
+    finally:
+        slots.release()
+
+    # the refused call never reached the breaker, so the next one is the trial
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get(BAD_URL, service='test-http-slot', retries=0)
+    assert state.breaker.state == 'open'
+
+
+def _fail():
+    raise ValueError('boom')
+
+
+def test_guarded_call_refused_slot_does_not_take_trial():
+    state = configure_service('test-guarded-slot', failure_threshold=1, reset_timeout=RESET, max_concurrency=1)
+    with pytest.raises(ValueError):
+        guarded_call('test-guarded-slot', _fail)
+    assert state.breaker.state == 'open'
+    time.sleep(RESET * 2)
+
+    state.slots.acquire()
+    try:
+        with pytest.raises(ConcurrencyLimitError):
+            guarded_call('test-guarded-slot', lambda: 'ok', slot_timeout=0.05)
+    finally:
+        state.slots.release()
+
+    assert guarded_call('test-guarded-slot', lambda: 'ok') == 'ok'
+    assert state.breaker.state == 'closed'
+
+
+def test_guarded_call_interrupted_trial_is_abandoned():
+    state = configure_service('test-guarded-abandon', failure_threshold=1, reset_timeout=RESET)
+    with pytest.raises(ValueError):
+        guarded_call('test-guarded-abandon', _fail)
+    time.sleep(RESET * 2)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        guarded_call('test-guarded-abandon', interrupted)
+    assert guarded_call('test-guarded-abandon', lambda: 'ok') == 'ok'
+    assert state.breaker.state == 'closed'
@@ -0,0 +1,109 @@
+"""
+LLMCache coalescing, expiry and None / error handling, against the local
+stub model (LLM_STUB=1)
+
+Run from Backend/: python -m pytest -q tests
+"""
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from integrations import gemini_model  # noqa: E402
+from integrations.stub_llm import StubGenerativeModel  # noqa: E402
+from shopping.llm_cache import CachePolicy, LLMCache  # noqa: E402
+
+TTL = 0.3
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv('LLM_STUB', '1')
+    monkeypatch.setenv('LLM_STUB_DELAY', '0.2')
+    monkeypatch.setattr(StubGenerativeModel, 'calls', 0)
+    return StubGenerativeModel
+
+
+@pytest.fixture
+def cache():
+    return LLMCache(policies={'analyze-product': CachePolicy(ttl=TTL)}, enabled=True)
+
+
+def analyze(product_name):
+    response = gemini_model().generate_content(f"Analyze '{product_name}', keys: shelf_life, storage_tip")
+    return json.loads(response.text)
+
+
+def test_concurrent_misses_share_one_call(stub, cache):
+    results = []
+
+    def request():
+        results.append(cache.get('analyze-product', 'Fresh Milk', lambda: analyze('Fresh Milk')))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert stub.calls == 1
+    assert len(results) == 8 and all(r['shelf_life'] == '5-7 Days' for r in results)
+    assert cache.stats()['analyze-product']['coalesced'] == 7
+
+    # normalized key: case / punctuation variants are hits
+    cache.get('analyze-product', 'fresh milk!', lambda: analyze('fresh milk'))
+    assert stub.calls == 1
+
+
+def test_expired_entry_recomputes(stub, cache):
+    cache.get('analyze-product', 'Bread', lambda: analyze('Bread'))
+    cache.get('analyze-product', 'Bread', lambda: analyze('Bread'))
+    assert stub.calls == 1
+
+    time.sleep(TTL + 0.05)
+    cache.get('analyze-product', 'Bread', lambda: analyze('Bread'))
+    assert stub.calls == 2
+
+
+def test_none_is_not_cached(stub, cache):
+    computed = []
+
+    def no_answer():
+        computed.append(1)
+        return None
+
+    assert cache.get('analyze-product', 'Eggs', no_answer) is None
+    assert cache.get('analyze-product', 'Eggs', no_answer) is None
+    assert len(computed) == 2
+    assert cache.stats()['analyze-product']['entries'] == 0
+
+
+def test_waiters_share_the_leaders_exception(stub, cache):
+    calls = []
+    errors = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError('model unavailable')
+
+    def request():
+        try:
+            cache.get('analyze-product', 'Cheese', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 4 and all(str(e) == 'model unavailable' for e in errors)
+    assert cache.stats()['analyze-product']['errors'] == 1
@@ -0,0 +1,85 @@
+"""
+ProductAggregator search deadline: partial results with mock products for
+late providers, and cancellation of provider calls still queued
+
+Run from Backend/: python -m pytest -q tests
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from smart_shopping import product_apis  # noqa: E402
+from smart_shopping.product_apis import ProductAggregator, ProductAPIClient, ProviderStats  # noqa: E402
+
+DEADLINE = 0.3
+
+
+class StubClient(ProductAPIClient):
+    def __init__(self, name, delay=0.0):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+
+    def search_products(self, query, filters=None, raise_errors=False, budget=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [self._product(query, 'live')]
+
+    def mock_products(self, query, filters=None):
+        return [self._product(query, 'mock')]
+
+    def _product(self, query, kind):
+        return {'id': f'{self.name}-{kind}', 'name': f'{self.name} {kind} {query}', 'price': 10.0,
+                'rating': 4.0, 'platform': self.name}
+
+
+def aggregator(*providers):
+    agg = ProductAggregator(deadline=DEADLINE)
+    agg.providers = list(providers)
+    agg.stats = {p.name: ProviderStats() for p in providers}
+    return agg
+
+
+def test_slow_provider_falls_back_to_mock_at_deadline():
+    fast, slow = StubClient('fast'), StubClient('slow', delay=DEADLINE * 4)
+    agg = aggregator(fast, slow)
+
+    started = time.perf_counter()
+    products = agg.search_all_platforms('kettle')
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < DEADLINE + 0.2
+    ids = {p['id'] for p in products}
+    assert ids == {'fast-live', 'slow-mock'}
+
+    stats = agg.provider_stats()
+    assert stats['fast']['calls'] == 1 and stats['fast']['timeouts'] == 0
+    # the late call is recorded once it finishes
+    time.sleep(DEADLINE * 4)
+    assert agg.provider_stats()['slow']['timeouts'] == 1
+
+
+def test_queued_provider_calls_are_cancelled():
+    release = threading.Event()
+    blockers = [product_apis._provider_pool.submit(release.wait, 5)
+                for _ in range(product_apis.MAX_PROVIDER_WORKERS)]
+    try:
+        queued = StubClient('queued')
+        agg = aggregator(queued)
+
+        started = time.perf_counter()
+        products = agg.search_all_platforms('kettle')
+        assert time.perf_counter() - started < DEADLINE + 0.2
+        assert [p['id'] for p in products] == ['queued-mock']
+        assert agg.provider_stats()['queued']['timeouts'] == 1
+    finally:
+        release.set()
+        for b in blockers:
+            b.result()
+
+    time.sleep(0.1)
+    assert queued.calls == 0